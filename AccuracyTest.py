@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+import numpy
+
+import Orbit
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+# 比較に使う衛星と期間。ALOSは__testALOS()の軌道要素をTLEの書式にしたもの、Landsat-8は__testLandsat8()のTLE
+CASES = {
+    'ALOS' : {
+        'tle'   :   'ALOS\n'
+                    '1 28931U 06002A   06120.72277529  .00000232  00000-0  00000-0 0  9998\n'
+                    '2 28931  98.2104 195.1270 0001679  14.7699 345.3549 14.59544429 10004\n',
+        'begin' :   datetime.datetime(2006, 5, 15, 2, 0, 0, 0, datetime.timezone.utc),
+        },
+    'LANDSAT 8' : {
+        'tle'   :   'LANDSAT 8\n'
+                    '1 39084U 13008A   20046.06823367  .00000004  00000-0  10818-4 0  9999\n'
+                    '2 39084  98.1977 117.6514 0001223  88.0107 272.1236 14.57115290372734\n',
+        'begin' :   datetime.datetime(2020, 3, 1, 0, 0, 0, 0, datetime.timezone.utc),
+        },
+    }
+PERIOD = 1.0                # 比較する期間 [day]
+STEP = 240.0                # 比較する日時の間隔 [sec]
+TRACKER_STEP = 10.0         # 'incremental'の刻み幅 [sec]（STEPを割り切る値）
+EARTH_RADIUS = 6378.137     # 地表面の距離を求める球の半径 [km]
+
+DEFAULT_REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AccuracyTest_reference.json')
+
+
+###################################################################################################
+# 関数定義（計算方法）
+###################################################################################################
+
+# 計算方法は、TLEと基準日時からの経過日数の配列を受け取り、(緯度, 経度) の配列を返す関数とする。
+
+def __vectorized(tle: Orbit.TwoLineElements, days: numpy.ndarray) -> tuple:
+    return Orbit.tleToLatLon_array(tle, days)
+
+
+def __float32(tle: Orbit.TwoLineElements, days: numpy.ndarray) -> tuple:
+    return Orbit.tleToLatLon_array(tle, days, dtype=numpy.float32)
+
+
+def __interpolated(tle: Orbit.TwoLineElements, days: numpy.ndarray) -> tuple:
+    import OrbitEphemeris
+    ephemeris = OrbitEphemeris.InterpolatedEphemeris(tle, days[0], days[-1])
+    return ephemeris.latLon(days)
+
+
+def __interpolatedSGP4(tle: Orbit.TwoLineElements, days: numpy.ndarray) -> tuple:
+    import OrbitEphemeris
+    ephemeris = OrbitEphemeris.InterpolatedEphemeris(tle, days[0], days[-1], backend='sgp4')
+    return ephemeris.latLon(days)
+
+
+def __jit(tle: Orbit.TwoLineElements, days: numpy.ndarray) -> tuple:
+    import OrbitJIT
+    return tuple(numpy.array([OrbitJIT.tleToLatLon_jit(tle, t) for t in days.tolist()]).T)
+
+
+def __incremental(tle: Orbit.TwoLineElements, days: numpy.ndarray) -> tuple:
+    import OrbitTracker
+    ticks = int(round(STEP / TRACKER_STEP))
+    tracker = OrbitTracker.RealTimeTracker([tle], days[0], step=TRACKER_STEP)
+    lat, lon = numpy.empty(len(days)), numpy.empty(len(days))
+    lat[0], lon[0] = (value[0] for value in tracker.latLon())
+    for k in range(1, len(days)):
+        for _ in range(ticks):
+            phi, lam = tracker.tick()
+        lat[k], lon[k] = phi[0], lam[0]
+    return (lat, lon)
+
+
+def __sgp4(tle: Orbit.TwoLineElements, days: numpy.ndarray) -> tuple:
+    import OrbitSGP4
+    phi, lam = OrbitSGP4.SGP4Propagator([tle]).latLon(days)
+    return (phi[0], lam[0])
+
+
+def __incrementalTicks(tle: Orbit.TwoLineElements, days: numpy.ndarray) -> list:
+    import OrbitTracker
+    tracker = OrbitTracker.RealTimeTracker([tle], days[0], step=TRACKER_STEP)
+    seconds = []
+    for _ in range(int(round((days[-1] - days[0]) * 86400 / TRACKER_STEP))):
+        t = time.perf_counter()
+        tracker.tick()
+        seconds.append(time.perf_counter() - t)
+    return seconds
+
+
+# 計算方法の名前 → (計算方法, 比較する基準, 許容誤差 [km])。許容誤差がNoneの方法は誤差を表示するだけとする
+#   'meanMotion'    :   Orbit.orbitalElementToLatLon()を1点ずつ計算した結果
+#   'sgp4'          :   sgp4パッケージ（Vallado版SGP4）の位置
+#   'pyorbital'     :   pyorbitalの位置
+MODES = {
+    'vectorized'        :   (__vectorized, 'meanMotion', 1.0e-6),
+    'float32'           :   (__float32, 'meanMotion', 0.01),
+    'interpolated'      :   (__interpolated, 'meanMotion', 0.01),
+    'interpolated.sgp4' :   (__interpolatedSGP4, 'sgp4', 0.01),
+    'jit'               :   (__jit, 'meanMotion', 1.0e-6),
+    'incremental'       :   (__incremental, 'meanMotion', 0.001),
+    'sgp4'              :   (__sgp4, 'sgp4', 0.001),
+    'sgp4.pyorbital'    :   (__sgp4, 'pyorbital', 1.0),
+    'meanMotion.sgp4'   :   (__vectorized, 'sgp4', None),
+    }
+
+# 計算方法の名前 → 1回の更新の時間を計測する関数。計算方法と同じ引数を受け取り、更新ごとの時間 [sec] のリストを返す。
+# 無い方法は、1点あたりの時間（points/secの逆数）を1回の更新の時間とする
+UPDATES = {
+    'incremental'       :   __incrementalTicks,
+    }
+
+
+###################################################################################################
+# 関数定義（基準）
+###################################################################################################
+
+def caseDays(case: dict) -> numpy.ndarray:
+    """比較する日時（基準日時からの経過日数）を求める。"""
+    n = int(round(PERIOD * 86400 / STEP)) + 1
+    return Orbit.datetimeToDays(case['begin']) + STEP / 86400 * numpy.arange(n)
+
+
+def createReference() -> dict:
+    """基準の結果を求める。
+
+    'meanMotion'はOrbit.orbitalElementToLatLon()の経緯度、'sgp4'・'pyorbital'は各パッケージの
+    TEME座標系の位置 [km] とする。パッケージがインストールされていなければ、その基準は作らない。
+    Returns:
+        (dict)  :   衛星名 → {'days': 経過日数, 基準の名前: 結果} の辞書
+    """
+    try:
+        from sgp4.api import Satrec
+    except ImportError:
+        Satrec = None
+        logger.warning('sgp4 is not installed; skipped the sgp4 reference')
+    try:
+        from pyorbital.orbital import Orbital
+    except ImportError:
+        Orbital = None
+        logger.warning('pyorbital is not installed; skipped the pyorbital reference')
+
+    reference = {}
+    for name, case in CASES.items():
+        tle = Orbit.TwoLineElements(case['tle'])
+        days = caseDays(case)
+        lines = case['tle'].splitlines()
+        results = {'days': days.tolist()}
+        results['meanMotion'] = numpy.array([Orbit.orbitalElementToLatLon(
+            tle.epoch_datetime, tle.argumentOfPerigee_float, tle.inclination_float, tle.raan_float,
+            tle.eccentricity_float, tle.meanAnomaly_float, tle.meanMotion_float, tle.firstDerivativeMeanMotion_float,
+            t) for t in days.tolist()]).T.tolist()
+        if Satrec is not None:
+            satellite = Satrec.twoline2rv(lines[1], lines[2])
+            day0 = numpy.floor(days)
+            error, r, _ = satellite.sgp4_array(Orbit.REFERENCE_JD + day0, days - day0)
+            if numpy.any(error):
+                raise RuntimeError('sgp4 failed for {}'.format(name))
+            results['sgp4'] = r.T.tolist()
+        if Orbital is not None:
+            orbital = Orbital(name, line1=lines[1], line2=lines[2])
+            r, _ = orbital.get_position(Orbit.daysToDatetime64(days).astype('datetime64[us]').astype(datetime.datetime), normalize=False)
+            results['pyorbital'] = numpy.asarray(r).tolist()
+        reference[name] = results
+    return reference
+
+
+def referenceLatLon(results: dict, key: str) -> tuple:
+    """基準の結果を経緯度にする（位置はOrbit.xyzToLatLon_array()で変換する）。"""
+    values = numpy.asarray(results[key])
+    if key == 'meanMotion':
+        return (values[0], values[1])
+    return Orbit.xyzToLatLon_array(values.T, numpy.asarray(results['days']))
+
+
+###################################################################################################
+# 関数定義
+###################################################################################################
+
+def groundDistance(lat1, lon1, lat2, lon2) -> numpy.ndarray:
+    """2点の経緯度の間の、球面上の距離を求める（haversine）。
+
+    Returns:
+        (ndarray)   :   距離 [km]
+    """
+    lat1, lon1, lat2, lon2 = (numpy.radians(numpy.asarray(value, dtype=numpy.float64)) for value in (lat1, lon1, lat2, lon2))
+    h = numpy.sin((lat2 - lat1) / 2) ** 2 + numpy.cos(lat1) * numpy.cos(lat2) * numpy.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * numpy.arcsin(numpy.sqrt(numpy.minimum(h, 1.0)))
+
+
+def evaluate(mode: str, reference: dict) -> dict:
+    """計算方法の誤差と処理速度を求める。
+
+    Args:
+        mode        (str)   :   MODESの名前
+        reference   (dict)  :   createReference()の結果
+    Returns:
+        (dict)  :   'p50'・'p95'・'p99'・'max'（誤差 [km]）、'pointsPerSec'、'secondsPerUpdate' の辞書。
+                    基準が無ければNone
+    """
+    function, key, _ = MODES[mode]
+    errors = []
+    points, seconds = 0, 0.0
+    updates = []
+    for name, case in CASES.items():
+        results = reference.get(name, {})
+        if key not in results:
+            return None
+        tle = Orbit.TwoLineElements(case['tle'])
+        days = numpy.asarray(results['days'])
+        function(tle, days[:2])     # コンパイル・読み込みの時間を処理速度に含めない
+        t = time.perf_counter()
+        lat, lon = function(tle, days)
+        seconds += time.perf_counter() - t
+        points += len(days)
+        errors.append(groundDistance(lat, lon, *referenceLatLon(results, key)))
+        if mode in UPDATES:
+            updates.extend(UPDATES[mode](tle, days))
+    errors = numpy.concatenate(errors)
+    p50, p95, p99 = numpy.percentile(errors, (50, 95, 99))
+    # 逐次更新する方法のpoints/secは、比較する日時の間の更新・状態の求め直し・配列の準備を含むので、
+    # 1回の更新の時間は更新ごとに計測した時間の中央値（状態を求め直す更新を除いた定常の時間）とする
+    secondsPerUpdate = float(numpy.median(updates)) if updates else seconds / points
+    return {'p50': p50, 'p95': p95, 'p99': p99, 'max': errors.max(), 'pointsPerSec': points / seconds,
+        'secondsPerUpdate': secondsPerUpdate}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='高速化した計算方法の精度を、保存した基準の結果と比べる')
+    parser.add_argument('modes', nargs='*', default=list(MODES), help='比較する計算方法（省略時は全て）')
+    parser.add_argument('--reference', default=DEFAULT_REFERENCE, help='基準の結果のJSONファイル')
+    parser.add_argument('--save', action='store_true', help='基準の結果を求めて保存する')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.save:
+        reference = createReference()
+        with open(args.reference, mode='w') as file:
+            json.dump(reference, file)
+        logger.info('saved reference to {}'.format(args.reference))
+        return
+
+    with open(args.reference) as file:
+        reference = json.load(file)
+
+    failures = 0
+    print('{:18s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s} {:>14s} {:>12s}  {}'.format(
+        'mode', 'reference', 'p50 km', 'p95 km', 'p99 km', 'max km', 'points/sec', 'sec/update', 'tolerance'))
+    for mode in args.modes:
+        if mode not in MODES:
+            parser.error('unknown mode: {}'.format(mode))
+        _, key, tolerance = MODES[mode]
+        try:
+            result = evaluate(mode, reference)
+        except ImportError as e:
+            logger.warning('{}: skipped ({})'.format(mode, e))
+            continue
+        if result is None:
+            logger.warning('{}: skipped (no {} reference)'.format(mode, key))
+            continue
+        if tolerance is None:
+            status = '-'
+        elif result['max'] <= tolerance:
+            status = 'ok (<= {:g})'.format(tolerance)
+        else:
+            status = 'FAILED (> {:g})'.format(tolerance)
+            failures += 1
+        print('{:18s} {:>10s} {:10.3g} {:10.3g} {:10.3g} {:10.3g} {:14.4g} {:12.3g}  {}'.format(
+            mode, key, result['p50'], result['p95'], result['p99'], result['max'], result['pointsPerSec'],
+            result['secondsPerUpdate'], status))
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+import gc
+import os
+import sys
+import json
+import time
+import math
+import logging
+import argparse
+import datetime
+import platform
+import tempfile
+import tracemalloc
+import numpy
+
+import Orbit
+import OrbitExport
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+# __testLandsat8()と同じTLE
+LANDSAT8 = '''LANDSAT 8
+1 39084U 13008A   20046.06823367  .00000004  00000-0  10818-4 0  9999
+2 39084  98.1977 117.6514 0001223  88.0107 272.1236 14.57115290372734
+'''
+BEGIN_DATE = datetime.datetime(2020, 3, 1, 0, 0, 0, 0, datetime.timezone.utc)
+STEP = 10.0 / 86400     # 地上軌跡の時間間隔 [day]
+
+ARRAY_SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)     # 配列版の点数
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BenchmarkTest_baseline.json')
+DEFAULT_THRESHOLD = 0.25    # ベースラインからこの割合を超えて遅く（メモリが多く）なったら失敗とする
+DEFAULT_REPEAT = 7          # 時間を計測する回数（中央値を使う）
+MIN_SAMPLE_SECONDS = 0.2    # 1回の計測の最短の時間 [sec]。短い処理はこの時間を超えるまで繰り返して1回とする
+
+
+###################################################################################################
+# 関数定義（計測対象）
+###################################################################################################
+
+# 計測対象は、準備（計測しない）を行い、計測する処理を返す関数とする。
+# 計測する処理は、処理した点数（TLEの数・日時の数）を返す。
+
+def __parseSingle(n: int):
+    def run():
+        for _ in range(n):
+            Orbit.TwoLineElements(LANDSAT8)
+        return n
+    return run
+
+
+def __parseBulk(n: int):
+    text = LANDSAT8 * n
+
+    def run():
+        return len(Orbit.readTLEs(text))
+    return run
+
+
+def __latLonScalar(n: int):
+    tle = Orbit.TwoLineElements(LANDSAT8)
+    days = Orbit.datetimeToDays(BEGIN_DATE) + STEP * numpy.arange(n)
+    elements = (tle.epoch_datetime, tle.argumentOfPerigee_float, tle.inclination_float, tle.raan_float,
+        tle.eccentricity_float, tle.meanAnomaly_float, tle.meanMotion_float, tle.firstDerivativeMeanMotion_float)
+
+    def run():
+        for t in days.tolist():
+            Orbit.orbitalElementToLatLon(*elements, t)
+        return n
+    return run
+
+
+def __latLonArray(n: int):
+    tle = Orbit.TwoLineElements(LANDSAT8)
+    days = Orbit.datetimeToDays(BEGIN_DATE) + STEP * numpy.arange(n)
+
+    def run():
+        Orbit.tleToLatLon_array(tle, days)
+        return n
+    return run
+
+
+def __siderealTimeScalar(n: int):
+    days = (Orbit.datetimeToDays(BEGIN_DATE) + STEP * numpy.arange(n)).tolist()
+
+    def run():
+        for t in days:
+            Orbit.siderealTime(t)
+        return n
+    return run
+
+
+def __siderealTimeArray(n: int):
+    days = Orbit.datetimeToDays(BEGIN_DATE) + STEP * numpy.arange(n)
+
+    def run():
+        Orbit.siderealTime_array(days)
+        return n
+    return run
+
+
+def __julianDayScalar(n: int):
+    dates = [BEGIN_DATE + datetime.timedelta(days=STEP * k) for k in range(n)]
+
+    def run():
+        for d in dates:
+            Orbit.julianDay(d.year, d.month, d.day, d.hour, d.minute, d.second)
+        return n
+    return run
+
+
+def __julianDayArray(n: int):
+    k = numpy.arange(n)
+    y, m, d = 2000 + k % 100, 1 + k % 12, 1 + k % 28
+    h, i, s = k % 24, k % 60, (k % 600) / 10.0
+
+    def run():
+        Orbit.julianDay_array(y, m, d, h, i, s)
+        return n
+    return run
+
+
+def __track(n: int) -> tuple:
+    """出力の計測に使う地上軌跡 (日時, 緯度, 経度) を求める。"""
+    tle = Orbit.TwoLineElements(LANDSAT8)
+    days = Orbit.datetimeToDays(BEGIN_DATE) + STEP * numpy.arange(n)
+    phi, lam = Orbit.tleToLatLon_array(tle, days)
+    return (days, phi, lam)
+
+
+def __exportCSV(n: int):
+    days, phi, lam = __track(n)
+    filepath = os.path.join(tempfile.gettempdir(), 'BenchmarkTest.csv')
+
+    # Orbit.py trackコマンドのCSV出力と同じ書式
+    def run():
+        labels = Orbit.formatTimestamps(days, unit='ms')
+        with open(filepath, mode='w') as file:
+            file.write('satelliteNumber,time,lat,lon\n')
+            file.write(''.join(map('{},{},{:.6f},{:.6f}\n'.format, [39084] * n, labels.tolist(), phi.tolist(), lam.tolist())))
+        return n
+    return run
+
+
+def __formatTimestamps(n: int):
+    days = Orbit.datetimeToDays(BEGIN_DATE) + STEP * numpy.arange(n)
+
+    def run():
+        Orbit.formatTimestamps(days, unit='ms')
+        return n
+    return run
+
+
+def __exportNPZ(n: int):
+    days, phi, lam = __track(n)
+    filepath = os.path.join(tempfile.gettempdir(), 'BenchmarkTest.npz')
+
+    def run():
+        OrbitExport.writeNPZ(filepath, Orbit.daysToDatetime64(days), phi, lam, [39084])
+        return n
+    return run
+
+
+def __exportParquet(n: int):
+    import pyarrow     # pyarrowが無い環境ではImportErrorで計測を飛ばす
+    days, phi, lam = __track(n)
+    filepath = os.path.join(tempfile.gettempdir(), 'BenchmarkTest.parquet')
+
+    def run():
+        OrbitExport.writeParquet(filepath, Orbit.daysToDatetime64(days), phi, lam, [39084])
+        return n
+    return run
+
+
+def benchmarks(maxSize: int) -> list:
+    """計測する項目の一覧を作る。
+
+    Args:
+        maxSize     (int)   :   配列版の最大の点数
+    Returns:
+        (list)  :   (名前, 準備の関数, 点数) のリスト
+    """
+    cases = [
+        ('parse.single', __parseSingle, 10 ** 4),
+        ('parse.bulk', __parseBulk, 10 ** 4),
+        ('latLon.scalar', __latLonScalar, 10 ** 3),
+        ('siderealTime.scalar', __siderealTimeScalar, 10 ** 5),
+        ('julianDay.scalar', __julianDayScalar, 10 ** 5),
+        ('siderealTime.array', __siderealTimeArray, 10 ** 6),
+        ('julianDay.array', __julianDayArray, 10 ** 6),
+        ('formatTimestamps.array', __formatTimestamps, 10 ** 6),
+        ('export.csv', __exportCSV, 10 ** 5),
+        ('export.npz', __exportNPZ, 10 ** 6),
+        ('export.parquet', __exportParquet, 10 ** 6),
+        ]
+    for n in ARRAY_SIZES:
+        if n <= maxSize:
+            cases.append(('latLon.array.{:.0e}'.format(n), __latLonArray, n))
+    return cases
+
+
+###################################################################################################
+# 関数定義
+###################################################################################################
+
+def measure(setup, n: int, repeat: int = DEFAULT_REPEAT) -> dict:
+    """処理時間（中央値）と、処理中に確保したメモリのピークを計測する。
+
+    1回目の実行（計測しない）の時間から、1回の計測がMIN_SAMPLE_SECONDSを超える実行回数を決め、
+    ガベージコレクションを止めてrepeat回計測した1実行あたりの時間の中央値を使う
+    （最良値や短い計測は、同じ環境で続けて実行しても揺らぎが大きい）。
+    計測ごとの揺らぎは、中央値に対する四分位範囲の割合（'spread'）として返し、compare()で許す低下に加える。
+    メモリはtracemalloc（numpyの配列の確保も含む）で計測する。tracemallocは処理を遅くするので、
+    時間の計測とは別に1回だけ実行する。
+    Args:
+        setup           :   計測対象の準備の関数
+        n       (int)   :   点数
+        repeat  (int)   :   時間を計測する回数
+    Returns:
+        (dict)  :   'points'、'seconds'、'pointsPerSec'、'spread'、'peakBytes' の辞書
+    """
+    run = setup(n)
+    t = time.perf_counter()
+    points = run()
+    loops = max(1, int(math.ceil(MIN_SAMPLE_SECONDS / max(time.perf_counter() - t, 1e-9))))
+
+    seconds = []
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            t = time.perf_counter()
+            for _ in range(loops):
+                run()
+            seconds.append((time.perf_counter() - t) / loops)
+    finally:
+        if enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    median = float(numpy.median(seconds))
+    q1, q3 = numpy.percentile(seconds, [25, 75])
+    return {'points': points, 'seconds': median, 'pointsPerSec': points / median,
+        'spread': float(q3 - q1) / median, 'peakBytes': peak}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """ベースラインと比べて、処理速度の低下またはメモリの増加が閾値を超えた項目を求める。
+
+    処理速度は、閾値に今回とベースラインの計測の揺らぎ（measure()の'spread'）を加えた割合を超えて
+    遅くなった場合に低下とする（揺らぎの大きい環境で、同じコードを続けて計測して失敗しないように）。
+    Args:
+        results     (dict)  :   今回の計測結果（名前 → measure()の結果）
+        baseline    (dict)  :   ベースラインの計測結果
+        threshold   (float) :   許す低下・増加の割合
+    Returns:
+        (list)  :   (名前, 理由) のリスト
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        allowed = threshold + result['spread'] + base.get('spread', 0.0)
+        if result['seconds'] > base['seconds'] * (1 + allowed):
+            regressions.append((name, 'points/sec {:.3g} -> {:.3g} (allowed {:.0%} slower)'.format(
+                base['pointsPerSec'], result['pointsPerSec'], allowed)))
+        # 小さな確保（1 MiB未満）の揺らぎは無視する
+        if result['peakBytes'] > max(base['peakBytes'] * (1 + threshold), base['peakBytes'] + 2 ** 20):
+            regressions.append((name, 'peak memory {:.1f} -> {:.1f} MiB'.format(base['peakBytes'] / 2 ** 20, result['peakBytes'] / 2 ** 20)))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='TLEの解析・軌道計算・時刻変換・出力の処理速度とメモリを計測する')
+    parser.add_argument('patterns', nargs='*', help='名前にこの文字列を含む項目だけを計測する')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='比較するベースラインのJSONファイル（計測した環境に固有。--saveで作成する）')
+    parser.add_argument('--save', action='store_true', help='今回の結果をベースラインとして保存する')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='失敗とする低下・増加の割合')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='時間を計測する回数（中央値を使う）')
+    parser.add_argument('--max-size', type=float, default=1e7, help='配列版の最大の点数')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    results = {}
+    print('{:24s} {:>10s} {:>10s} {:>14s} {:>8s} {:>10s}'.format('name', 'points', 'sec', 'points/sec', 'spread', 'peak MiB'))
+    for name, setup, n in benchmarks(int(args.max_size)):
+        if args.patterns and not any(p in name for p in args.patterns):
+            continue
+        try:
+            result = measure(setup, n, args.repeat)
+        except ImportError as e:
+            logger.warning('{}: skipped ({})'.format(name, e))
+            continue
+        results[name] = result
+        print('{:24s} {:10d} {:10.4f} {:14.4g} {:8.1%} {:10.1f}'.format(
+            name, result['points'], result['seconds'], result['pointsPerSec'], result['spread'], result['peakBytes'] / 2 ** 20))
+
+    if args.save:
+        # 既存のベースラインのうち、今回計測しなかった項目は残す
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)['results']
+        baseline.update(results)
+        with open(args.baseline, mode='w') as file:
+            json.dump({'python': sys.version.split()[0], 'numpy': numpy.__version__, 'machine': platform.machine(),
+                'results': baseline}, file, indent=2, sort_keys=True)
+        logger.info('saved baseline to {}'.format(args.baseline))
+        return
+
+    # ベースラインは計測した環境に依存するので、リポジトリには含めない。無ければ比較できないので失敗とする
+    if not os.path.exists(args.baseline):
+        logger.error('no baseline at {} (run with --save on this machine to create one)'.format(args.baseline))
+        sys.exit(1)
+    with open(args.baseline) as file:
+        regressions = compare(results, json.load(file)['results'], args.threshold)
+    for name, reason in regressions:
+        print('REGRESSION {}: {}'.format(name, reason))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import sys
+import json
+import logging
+import argparse
+import statistics
+import subprocess
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+MODULES = (
+    'Orbit',
+    'OrbitCache',
+    'OrbitChunked',
+    'OrbitCoverage',
+    'OrbitEclipse',
+    'OrbitEphemeris',
+    'OrbitExport',
+    'OrbitJIT',
+    'OrbitSGP4',
+    'OrbitSchedule',
+    'OrbitService',
+    'OrbitSharedCatalog',
+    'OrbitStation',
+    'OrbitTileStore',
+    'OrbitTracker',
+    'JulianDayTest',
+    'postJulianDayRequest',
+)
+
+# 読み込んだだけでは読み込まれてはならない、重い任意の依存パッケージ（そのパッケージ専用のモジュールを除く）
+HEAVY_PACKAGES = ('pandas', 'matplotlib', 'requests', 'bs4', 'pyarrow', 'sgp4', 'numba', 'pyorbital')
+OWN_PACKAGES = {'OrbitSGP4': ('sgp4',), 'OrbitJIT': ('numba',)}
+
+# 子プロセスで、numpyを読み込んだ後にモジュールを読み込み、時間と副作用をJSONで返す
+__CHILD = '''
+import sys, json, time, logging
+import numpy
+before = (logging.getLogger().level, len(logging.getLogger().handlers), set(sys.modules))
+t = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t
+handlers = [name for name, obj in logging.Logger.manager.loggerDict.items()
+            if isinstance(obj, logging.Logger) and obj.handlers]
+print(json.dumps({{
+    'elapsed': elapsed,
+    'rootChanged': (logging.getLogger().level, len(logging.getLogger().handlers)) != before[:2],
+    'handlers': handlers,
+    'modules': sorted(name.split('.')[0] for name in set(sys.modules) - before[2]),
+}}))
+'''
+
+
+###################################################################################################
+# 関数定義
+###################################################################################################
+
+def measureImport(module: str, repeat: int = 5) -> dict:
+    """新しいプロセスでモジュールを読み込み、numpyの読み込み後に増える時間と副作用を計測する。
+
+    Args:
+        module  (str)   :   モジュール名
+        repeat  (int)   :   計測の回数（中央値を使う）
+    Returns:
+        (dict)  :   'elapsed'（秒の中央値）、'rootChanged'、'handlers'、'modules' の辞書
+    """
+    results = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', __CHILD.format(module=module)], capture_output=True, text=True)
+        if out.returncode != 0:
+            raise RuntimeError('import {} failed: {}'.format(module, out.stderr.strip().splitlines()[-1:]))
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    result = results[0]
+    result['elapsed'] = statistics.median(r['elapsed'] for r in results)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='各モジュールの読み込み時間と、読み込みの副作用を確認する')
+    parser.add_argument('modules', nargs='*', default=MODULES, help='確認するモジュール（省略時は全て）')
+    parser.add_argument('--repeat', type=int, default=5, help='モジュールごとの計測の回数')
+    parser.add_argument('--budget', type=float, default=50.0, help='numpyの読み込み後に許す時間 [msec]')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    failures = 0
+    for module in args.modules:
+        try:
+            result = measureImport(module, args.repeat)
+        except RuntimeError as e:
+            # 依存パッケージが無い環境では確認できない
+            logger.warning(str(e))
+            continue
+        problems = []
+        if result['elapsed'] * 1000 > args.budget:
+            problems.append('over budget')
+        if result['rootChanged'] or result['handlers']:
+            problems.append('configures logging {}'.format(result['handlers']))
+        heavy = sorted(set(result['modules']) & set(HEAVY_PACKAGES) - set(OWN_PACKAGES.get(module, ())))
+        if heavy:
+            problems.append('imports {}'.format(', '.join(heavy)))
+        print('{:24s} {:8.1f} msec  {}'.format(module, result['elapsed'] * 1000, '; '.join(problems) or 'ok'))
+        failures += bool(problems)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,32 @@
+import os
+import csv
 import math
 import datetime
 import numpy as np
-import matplotlib
-import matplotlib.ticker as ticker
-import matplotlib.pyplot as plt
-import pandas as pd
 import logging
 
+import Orbit
+
+# pandas・matplotlibは読み込みに時間がかかるので、使う関数の中で読み込む
+
 
 ###################################################################################################
 # ログ設定
 ###################################################################################################
 
-logLevel = logging.DEBUG
-ch = logging.StreamHandler()
-ch.setLevel(logLevel)
-ch.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+# ハンドラーはmain()で設定する（読み込んだだけではログの設定を変えない）
 logger = logging.getLogger(__name__)
-logger.setLevel(logLevel)
-logger.addHandler(ch)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+CSV_CHUNK_ROWS = 1 << 17    # __toCSV()で1回に文字列にして書き込む行数
+
+# データ（国立天文台のユリウス日のCSV、比較結果のCSV・グラフ）を置くディレクトリ。環境変数で変更できる
+DATA_DIR = os.environ.get('JULIANDAY_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+NAOJ_CSV_PATH = os.path.join(DATA_DIR, 'JulianDay_by_NAOJ_all.csv')     # postJulianDayRequest.pyの出力
 
 
 ###################################################################################################
@@ -28,21 +36,56 @@ logger.addHandler(ch)
 class NAOJ_JulianDay:
     """国立天文台のWebページで算出したユリウス日を返す。
 
-    別途用意したプログラムで、国立天文台のWebページでユリウス日を算出してCSVファイルに保存しておく。
+    別途用意したプログラム（postJulianDayRequest.py）で、国立天文台のWebページでユリウス日を算出して
+    CSVファイルに保存しておく。CSVファイルは作成時に1回だけ読み込み、年月日を整数にした索引を作る。
     """
 
-    __FILE_PATH = 'D:/GitHub/misc/data/JulianDay_by_NAOJ_all.csv'
-    
+    def __init__(self, filepath: str = None):
+        """CSVファイルを読み込み、年月日の索引を作る。
+
+        同じ年月日の行が複数ある場合は、最初の行のユリウス日を使う。
+        Args:
+            filepath    (str)   :   CSVファイルのパス。Noneの場合はNAOJ_CSV_PATH
+        """
+        self.__filepath = NAOJ_CSV_PATH if filepath is None else filepath
+        with open(self.__filepath, newline='', encoding='utf-8') as file:
+            rows = list(csv.DictReader(file))
+        ymd = np.array([[int(v) for v in row['年月日'].strip().split('/')] for row in rows], dtype=np.int64).reshape(-1, 3)
+        jd = np.array([float(row['ユリウス日']) for row in rows], dtype=np.float64)
+
+        # 年月日を1つの整数にし、重複を除いて並べる（np.uniqueは最初に現れた行の番号を返す）
+        keys, first = np.unique(self.__key(ymd[:, 0], ymd[:, 1], ymd[:, 2]), return_index=True)
+        self.__keys = keys
+        self.__jd = jd[first]
+        logger.debug('NAOJ_JulianDay: {} rows, {} dates ({})'.format(len(rows), len(keys), self.__filepath))
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def filepath(self) -> str:
+        return self.__filepath
+
+    @property
+    def dateNum(self) -> int:
+        return len(self.__keys)
+
+
+    ###############################################################################################
+    # メソッド
+    ###############################################################################################
+
+    @staticmethod
+    def __key(y, m, d):
+        """年月日を、大小関係を保つ1つの整数にする（月・日は2桁に収まる）。"""
+        return (np.asarray(y, dtype=np.int64) * 100 + np.asarray(m, dtype=np.int64)) * 100 + np.asarray(d, dtype=np.int64)
 
-    def __init__(self):
-        self.df = pd.read_csv(self.__FILE_PATH, index_col='年月日')
-        logger.debug(self.df)
-    
 
     def julianDay(self, y: int, m: int, d: int) -> float:
         """国立天文台のWebページで算出したユリウス日を返す。
 
-        別途用意したプログラムで、国立天文台のWebページでユリウス日を算出してCSVファイルに保存しておく。
         引数で指定された年月日のユリウス日がすでに算出されてCSV内に保存されていれば、そのユリウス日を返し、
         CSV内にまだ保存されていなければ、Noneを返す。
         Args:
@@ -53,17 +96,24 @@ class NAOJ_JulianDay:
             jd  (float) :   ユリウス日（ユリウス通日）。
                             ただしユリウス日を別途用意したプログラムで未算出の場合（所定のCSVファイル内に未保存の場合）にはNoneを返す。
         """
-        key = '{:04}/{:02}/{:02}'.format(y, m, d)
-        try:
-            jd = self.df.at[key, 'ユリウス日']
-            if type(jd) is np.float64:      # 該当するデータが1つの場合
-                return jd
-            elif type(jd) is np.ndarray:    # 該当するデータが複数の場合、1つ目のデータを返す
-                return jd[0]
-            else:
-                raise ValueError('想定外の型: {}'.format(type(jd)))
-        except KeyError:
-            return None
+        jd = float(self.julianDay_array(y, m, d))
+        return None if math.isnan(jd) else jd
+
+
+    def julianDay_array(self, y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+        """julianDay()の配列版。CSV内に無い日付はNaNとする。
+
+        索引を二分探索（np.searchsorted）してまとめて引く。
+        Args:
+            y, m, d (ndarray)   :   年・月・日
+        Returns:
+            (ndarray)   :   ユリウス日（float64）
+        """
+        keys = self.__key(y, m, d)
+        if len(self.__keys) == 0:
+            return np.full(keys.shape, np.nan)
+        i = np.minimum(np.searchsorted(self.__keys, keys), len(self.__keys) - 1)
+        return np.where(self.__keys[i] == keys, self.__jd[i], np.nan)
 
 
 ###################################################################################################
@@ -307,43 +357,184 @@ def julianDay_pyorbital(y: int, m: int, d: int) -> float:
     return JD
 
 
+###################################################################################################
+# 関数定義（ユリウス日計算の各アルゴリズム・配列版）
+###################################################################################################
+
+# 上の各アルゴリズムと同じ計算を、年・月・日の配列に対してまとめて行う。
+# 整数の演算（//、%）はPythonと同じく負の無限大方向への切り捨て、int()は0方向への切り捨て（np.trunc）とする。
+# 結果の型は元の関数にそろえる（整数を返すアルゴリズムはint64、それ以外はfloat64）。
+
+def julianDay_wikipedia_array(y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """julianDay_wikipedia()の配列版。"""
+    y, m, d = (np.asarray(v, dtype=np.int64) for v in (y, m, d))
+    M = np.where(m <= 2, m + 12, m)
+    Y = np.where(m <= 2, y - 1, y)
+    return  np.floor(365.25 * Y) + np.floor(Y / 400) - np.floor(Y / 100) \
+        + np.floor(30.59 * (M - 2)) \
+        + d + 1721088.5
+
+
+def julianDay_Fliegel_array(y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """julianDay_Fliegel()の配列版。"""
+    y, m, d = (np.asarray(v, dtype=np.int64) for v in (y, m, d))
+    return d - 32075 \
+        + 1461 * (y + 4800 + (m - 14) // 12) // 4 \
+        + 367 * (m - 2 - (m - 14) // 12 * 12) // 12 \
+        - 3 * ((y + 4900 + (m - 14) // 12) // 100) // 4
+
+
+def julianDay_Hatcher_array(y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """julianDay_Hatcher()の配列版。"""
+    y, m, d = (np.asarray(v, dtype=np.int64) for v in (y, m, d))
+    Y = y + 4716 - __intAbs((14 - m) / 12)
+    M = (m - 3) % 12
+    D = d - 1
+    return  __intAbs(1461 * Y / 4) + __intAbs((153 * M + 2) / 5) + D \
+        - (1401 + __intAbs(__intAbs((Y + 184) / 100) * 3 / 4) - 38)
+
+
+def julianDay_Meeus_array(y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """julianDay_Meeus()の配列版。"""
+    y, m, d = (np.asarray(v, dtype=np.int64) for v in (y, m, d))
+    A = np.floor(y / 100)
+    B = 2 - A + np.floor(A / 4)
+    return  np.floor(365.25 * (y + 4716)) + np.floor(30.6001 * (m + 1)) + d + B - 1524.5
+
+
+def julianDay_Vallado_array(y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """julianDay_Vallado()の配列版。"""
+    y, m, d = (np.asarray(v, dtype=np.int64) for v in (y, m, d))
+    return  367.0 * y - \
+        np.floor((7 * (y + np.floor((m + 9) / 12.0))) * 0.25) + \
+        np.floor(275 * m / 9.0) + d + 1721013.5
+
+
+def julianDay_Curtis2020_array(y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """julianDay_Curtis2020()の配列版。"""
+    y, m, d = (np.asarray(v, dtype=np.int64) for v in (y, m, d))
+    return  367 * y - np.trunc((7 * y + np.trunc((m + 9) / 12)) / 4) + np.trunc(275 * m / 9) + d + 1721013.5
+
+
+def julianDay_Curtis2014_array(y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """julianDay_Curtis2014()の配列版。"""
+    y, m, d = (np.asarray(v, dtype=np.int64) for v in (y, m, d))
+    return  367 * y - np.trunc(7 * (y + np.trunc((m + 9) / 12)) / 4) + np.trunc(275 * m / 9) + d + 1721013.5
+
+
+def julianDay_boost_array(y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """julianDay_boost()の配列版。"""
+    y, m, d = (np.asarray(v, dtype=np.int64) for v in (y, m, d))
+    a = np.trunc((14 - m) / 12).astype(np.int64)
+    Y = y + 4800 - a
+    M = m + 12 * a - 3
+    return np.trunc(d + ((153 * M + 2) / 5) + 365 * Y + (Y / 4) - (Y / 100) + (Y / 400) - 32045).astype(np.int64)
+
+
+def julianDay_php_array(y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """julianDay_php()の配列版。"""
+    y, m, d = (np.asarray(v, dtype=np.int64) for v in (y, m, d))
+    Y = np.where(y < 0, y + 4801, y + 4800)
+    Y = np.where(m > 2, Y, Y - 1)
+    M = np.where(m > 2, m - 3, m + 9)
+    return  ((Y // 100) * 146097) // 4 \
+        + ((Y % 100) * 1461) // 4 \
+        + (M * 153 + 2) // 5 \
+        + d \
+        - 32045
+
+
+def julianDay_pyorbital_array(y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """julianDay_pyorbital()の配列版。
+
+    年・月・日の配列からdatetime64[D]の配列を作る（年は天文学的な通し番号で、0年を含む）。
+    """
+    y, m, d = (np.asarray(v, dtype=np.int64) for v in (y, m, d))
+    dt2np = (y - 1970).astype('datetime64[Y]').astype('datetime64[M]') + (m - 1).astype('timedelta64[M]')
+    dt2np = dt2np.astype('datetime64[D]') + (d - 1).astype('timedelta64[D]')
+    jdays2000 = (dt2np - np.datetime64('2000-01-01T12:00')) / np.timedelta64(1, 'D')
+    return jdays2000 + 2451545
+
+
+def __intAbs(x: np.ndarray) -> np.ndarray:
+    """int(abs(x))の配列版。"""
+    return np.trunc(np.abs(x)).astype(np.int64)
+
+
 ###################################################################################################
 # 関数定義（main関数用）
 ###################################################################################################
 
+def dateGrid(yearRange, monthRange, dayRange) -> tuple:
+    """年・月・日の範囲の全ての組み合わせを、年・月・日の順に並べた配列にする。
+
+    Args:
+        yearRange   :   年の範囲（rangeまたはリスト）
+        monthRange  :   月の範囲
+        dayRange    :   日の範囲
+    Returns:
+        y, m, d     (ndarray)   :   年・月・日（int64）
+    """
+    y, m, d = np.meshgrid(
+        np.asarray(list(yearRange), dtype=np.int64),
+        np.asarray(list(monthRange), dtype=np.int64),
+        np.asarray(list(dayRange), dtype=np.int64),
+        indexing='ij')
+    return (y.ravel(), m.ravel(), d.ravel())
+
+
+def compareJulianDays(funcs: dict, y: np.ndarray, m: np.ndarray, d: np.ndarray) -> dict:
+    """各アルゴリズムのユリウス日を求め、日付ごとに最小値・最大値とそのアルゴリズムを求める。
+
+    NaN（参照表に無い日付）は最小値・最大値の特定から除く。
+    Args:
+        funcs   (dict)      :   アルゴリズムの名前 → 配列版の関数
+        y, m, d (ndarray)   :   年・月・日
+    Returns:
+        (dict)  :   'values'（名前 → ユリウス日の配列）、'argmin'・'argmax'（funcsの中の番号）、
+                    'min'・'max'・'spread'（最大値 - 最小値）の辞書
+    """
+    values = {name: func(y, m, d) for name, func in funcs.items()}
+    table = np.stack([np.asarray(v, dtype=np.float64) for v in values.values()])
+    valid = ~np.isnan(table)
+    argmin = np.where(valid, table, np.inf).argmin(axis=0)
+    argmax = np.where(valid, table, -np.inf).argmax(axis=0)
+    columns = np.arange(table.shape[1])
+    jdMin = table[argmin, columns]
+    jdMax = table[argmax, columns]
+    return {'values': values, 'argmin': argmin, 'argmax': argmax, 'min': jdMin, 'max': jdMax, 'spread': jdMax - jdMin}
+
+
 def __toCSV(funcs: dict, yearRange: range, monthRange: range, dayRange: range, filepath: str):
     """グレゴリオ暦の各日時に対応するユリウス日をCSVに出力する。
+
+    全ての日付を配列にして各アルゴリズムでまとめて計算し、CSV_CHUNK_ROWS行ずつ列ごとに文字列にして書き込む。
+    日付の列はOrbit.formatDate_array()でまとめて文字列にする。
     """
+    y, m, d = dateGrid(yearRange, monthRange, dayRange)
+    result = compareJulianDays(funcs, y, m, d)
+    names = np.array(list(funcs.keys()), dtype=object)
+
     with open(filepath, mode='w') as file:
-        # 見出し行を出力
-        file.write('Gregorian')
-        for name in funcs.keys():
-            file.write(',{}'.format(name))
-        file.write(',{},{},{},{},{}'.format('minName', 'minJD', 'maxName', 'maxJD', 'max-min'))
-        file.write('\n')
-
-        # グレゴリオ暦の日時を進めながら、その時点その時点のユリウス日を出力していく
-        for y in yearRange:
-            for m in monthRange:
-                for d in dayRange:
-                    file.write('{:04}/{:02}/{:02}'.format(y, m, d)) # グレゴリオ暦
-                    name_jd = {}    # 最小値・最大値特定用
-                    for name, func in funcs.items():  # 各アルゴリズムによるユリウス日を出力
-                        jd = func(y, m, d)
-                        if jd is None:
-                            jd = math.nan
-                        file.write(',{}'.format(jd))
-                        name_jd[name] = jd
-                    # 最大のユリウス日・最小のユリウス日を算出したアルゴリズムを特定する
-                    minName, minJD = min(name_jd.items(), key=lambda x: x[1])
-                    maxName, maxJD = max(name_jd.items(), key=lambda x: x[1])
-                    file.write(',{},{},{},{},{}'.format(minName, minJD, maxName, maxJD, maxJD - minJD))
-                    file.write('\n')
-
-
-def __configPlot1(df: pd.DataFrame, ax: matplotlib.axes.Axes):
+        file.write(','.join(['Gregorian'] + list(funcs.keys()) + ['minName', 'minJD', 'maxName', 'maxJD', 'max-min']) + '\n')
+        for begin in range(0, len(y), CSV_CHUNK_ROWS):
+            part = slice(begin, begin + CSV_CHUNK_ROWS)
+            # 値の書式は元の型（intまたはfloat）のstr()と同じ
+            table = np.array([list(map(str, v[part].tolist())) for v in result['values'].values()], dtype=object)
+            index = np.arange(table.shape[1])
+            argmin, argmax = result['argmin'][part], result['argmax'][part]
+            gregorian = Orbit.formatDate_array(y[part], m[part], d[part], separator='/').tolist()
+            columns = [gregorian] + list(table) + [
+                names[argmin], table[argmin, index], names[argmax], table[argmax, index],
+                map(str, result['spread'][part].tolist()),
+                ]
+            file.write(''.join(','.join(row) + '\n' for row in zip(*columns)))
+
+
+def __configPlot1(df: 'pandas.DataFrame', ax: 'matplotlib.axes.Axes'):
     """グラフの描画設定を行う。
     """
+    import matplotlib.ticker as ticker
     ax.get_xaxis().set_major_locator(ticker.MaxNLocator(integer=True))
     ax.get_yaxis().set_major_locator(ticker.MaxNLocator(integer=True))
     ax.ticklabel_format(style='plain', axis='both', useOffset=False, useMathText=False)
@@ -352,9 +543,10 @@ def __configPlot1(df: pd.DataFrame, ax: matplotlib.axes.Axes):
     ax.set_xticklabels([df.at[i, 'Gregorian'] for i in range(0, 80000 + 1, 2000)], rotation=30)
 
 
-def __configPlot2(df: pd.DataFrame, ax: matplotlib.axes.Axes):
+def __configPlot2(df: 'pandas.DataFrame', ax: 'matplotlib.axes.Axes'):
     """グラフの描画設定を行う。
     """
+    import matplotlib.ticker as ticker
     ax.get_xaxis().set_major_locator(ticker.MaxNLocator(integer=True))
     ax.get_yaxis().set_major_locator(ticker.MaxNLocator(integer=True))
     ax.ticklabel_format(style='plain', axis='both', useOffset=False, useMathText=False)
@@ -369,24 +561,26 @@ def __configPlot2(df: pd.DataFrame, ax: matplotlib.axes.Axes):
 
 def main():
 
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
     naoj = NAOJ_JulianDay()
 
     # 計算対象のアルゴリズム
     FUNCS = {
-        'wikipedia':    julianDay_wikipedia,
-        'Fliegel':      julianDay_Fliegel,
-        'Hatcher':      julianDay_Hatcher,
-        'Meeus':        julianDay_Meeus,
-        'Vallado':      julianDay_Vallado,
-        'Curtis2020':   julianDay_Curtis2020,
-        'Curtis2014':   julianDay_Curtis2014,
-        'boost':        julianDay_boost,
-        'php':          julianDay_php,
-        'pyorbital':    julianDay_pyorbital,
-        'NAOJ':         naoj.julianDay
+        'wikipedia':    julianDay_wikipedia_array,
+        'Fliegel':      julianDay_Fliegel_array,
+        'Hatcher':      julianDay_Hatcher_array,
+        'Meeus':        julianDay_Meeus_array,
+        'Vallado':      julianDay_Vallado_array,
+        'Curtis2020':   julianDay_Curtis2020_array,
+        'Curtis2014':   julianDay_Curtis2014_array,
+        'boost':        julianDay_boost_array,
+        'php':          julianDay_php_array,
+        'pyorbital':    julianDay_pyorbital_array,
+        'NAOJ':         naoj.julianDay_array
     }
 
-    DIR = 'D:/GitHub/misc/data/'
+    DIR = DATA_DIR + '/'
     PREFIX = 'JulianDayCompare_'
     
     # -4713/01/01～2000/12/01（1ヶ月間隔（各月の1日））
@@ -402,6 +596,8 @@ def main():
     __toCSV(FUNCS, range(1582, 1582 + 1), range(10, 10 + 1), range(1, 31 + 1), DIR + PREFIX + '15821001_15821031.csv')
 
     # CSVを読み込みグラフ化する
+    import pandas as pd
+    import matplotlib.pyplot as plt
 
     nameBase = DIR + PREFIX + '-47130101_20001201'
     df = pd.read_csv(nameBase + '.csv')
@@ -8,13 +8,8 @@ import numpy
 # ログ設定
 ###################################################################################################
 
-logLevel = logging.INFO
-ch = logging.StreamHandler()
-ch.setLevel(logLevel)
-ch.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+# ハンドラーは利用する側（コマンドラインではmain()）で設定する。読み込んだだけではログの設定を変えない
 logger = logging.getLogger(__name__)
-logger.setLevel(logLevel)
-logger.addHandler(ch)
 
 
 ###################################################################################################
@@ -326,8 +321,9 @@ class TwoLineElements:
         if type(val) is str:
             m = re.fullmatch(r'([\+|\-| ][0-9]{1,5})([\+|\-| ][0-9])', val)
             if m:
+                # 仮数部は小数点が省略された小数（例： ' 12345-5' は 0.12345e-5）
                 self.__secondDerivativeMeanMotion = val
-                self.__secondDerivativeMeanMotion_float = float(m.group(1) + 'e' + m.group(2))
+                self.__secondDerivativeMeanMotion_float = float('{}.{}e{}'.format(m.group(1)[0], m.group(1)[1:], m.group(2)).replace(' ', ''))
         elif type(val) is float:
             self.__secondDerivativeMeanMotion =  '{:e}'.format(val)
             self.__secondDerivativeMeanMotion_float = val
@@ -345,8 +341,9 @@ class TwoLineElements:
         if type(val) is str:
             m = re.fullmatch(r'([\+|\-| ][0-9]{1,5})([\+|\-| ][0-9])', val)
             if m:
+                # 仮数部は小数点が省略された小数（例： ' 10818-4' は 0.10818e-4）
                 self.__bstar = val
-                self.__bstar_float = float(m.group(1) + 'e' + m.group(2))
+                self.__bstar_float = float('{}.{}e{}'.format(m.group(1)[0], m.group(1)[1:], m.group(2)).replace(' ', ''))
         elif type(val) is float:
             self.__bstar =  '{:e}'.format(val)
             self.__bstar_float = val
@@ -501,7 +498,9 @@ class TwoLineElements:
     
     @property
     def epoch_datetime(self) -> datetime.datetime:
-        return datetime.datetime(2000 + self.__epochYear_int, 1, 1, 0, 0, 0, 0, datetime.timezone.utc) \
+        # 元期の年は下2桁で、57～99は1900年代、00～56は2000年代を表す
+        year = self.__epochYear_int + (1900 if self.__epochYear_int >= 57 else 2000)
+        return datetime.datetime(year, 1, 1, 0, 0, 0, 0, datetime.timezone.utc) \
             + datetime.timedelta(days=self.__epochDay_float - 1)
     
     @property
@@ -538,6 +537,256 @@ class TwoLineElements:
         }
 
 
+def readTLEs(text: str) -> list:
+    """複数のTLEを並べた文字列（CelesTrakなどのカタログ）から、TwoLineElementsのリストを作る。
+
+    3行形式（衛星名の行がある）と2行形式のどちらも読める。2行形式の衛星名は空とする。
+    Args:
+        text    (str)   :   TLEを並べた文字列
+    Returns:
+        (list)  :   TwoLineElementsのリスト
+    """
+    lines = [line.rstrip() for line in text.splitlines()]
+    tles = []
+    i = 0
+    while i < len(lines) - 1:
+        if lines[i].startswith('1 ') and lines[i + 1].startswith('2 '):
+            name = lines[i - 1] if i > 0 and lines[i - 1] and not lines[i - 1].startswith(('1 ', '2 ')) else ''
+            tles.append(TwoLineElements('{}\n{}\n{}'.format(name, lines[i], lines[i + 1])))
+            i += 2
+        else:
+            i += 1
+    return tles
+
+
+###################################################################################################
+# 関数定義（時刻）
+###################################################################################################
+
+# 伝搬計算の内部では、日時を基準日時からの経過日数（float64）で表す。
+# datetime・datetime64との変換は入出力の境界だけで行う。
+REFERENCE_DATE = datetime.datetime(2000, 1, 1, 0, 0, 0, 0, datetime.timezone.utc)   # 基準日時（UTC）
+REFERENCE_JD = 2451544.5    # 基準日時のユリウス日
+__REFERENCE_DATETIME64 = numpy.datetime64('2000-01-01T00:00:00', 'ns')
+
+
+def datetimeToDays(date: datetime.datetime) -> float:
+    """datetimeを基準日時からの経過日数へ変換する。
+
+    タイムゾーン情報を持たないdatetimeはUTCとみなす。
+    Args:
+        date    (datetime)  :   変換対象の日時
+    Returns:
+        (float) :   基準日時からの経過日数 [day]
+    """
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return (date - REFERENCE_DATE) / datetime.timedelta(days=1)
+
+
+def datetime64ToDays(dates: numpy.ndarray) -> numpy.ndarray:
+    """datetime64（UTC）を基準日時からの経過日数へ変換する（配列版）。
+
+    Args:
+        dates   (ndarray)   :   日時（UTC、datetime64）
+    Returns:
+        (ndarray)   :   基準日時からの経過日数 [day]
+    """
+    return (numpy.asarray(dates, dtype='datetime64[ns]') - __REFERENCE_DATETIME64).astype(numpy.int64) / 8.64e13
+
+
+def daysToDatetime64(days: numpy.ndarray) -> numpy.ndarray:
+    """基準日時からの経過日数をdatetime64[ns]（UTC）へ変換する（配列版）。
+
+    Args:
+        days    (ndarray)   :   基準日時からの経過日数 [day]
+    Returns:
+        (ndarray)   :   日時（UTC、datetime64[ns]）
+    """
+    return __REFERENCE_DATETIME64 + numpy.round(numpy.asarray(days, dtype=numpy.float64) * 8.64e13).astype('timedelta64[ns]')
+
+
+def asDays(dates):
+    """日時を基準日時からの経過日数にそろえる。
+
+    datetimeはfloatに、datetime64はfloat64の配列に変換し、数値はすでに経過日数とみなしてそのまま返す。
+    Args:
+        dates   :   datetime、datetime64（スカラーまたは配列）、または経過日数 [day]
+    Returns:
+        基準日時からの経過日数 [day]（float または ndarray）
+    """
+    if isinstance(dates, datetime.datetime):
+        return datetimeToDays(dates)
+    if isinstance(dates, (int, float)):
+        return float(dates)
+    dates = numpy.asarray(dates)
+    if numpy.issubdtype(dates.dtype, numpy.datetime64):
+        return datetime64ToDays(dates)
+    return dates.astype(numpy.float64, copy=False)
+
+
+# 時刻の単位 → 1日あたりの数（daysToCalendar_array()・formatTimestamps()の単位）
+__UNITS_PER_DAY = {'D': 1, 's': 86400, 'ms': 86400 * 10 ** 3, 'us': 86400 * 10 ** 6}
+
+
+def __splitDays(days, unit: str) -> tuple:
+    """経過日数を日と日内の残り（単位の整数）に分け、グレゴリオ暦（先発グレゴリオ暦、0年を含む）の年月日を求める。
+
+    日内の時刻はナノ秒に丸めた後、単位未満を切り捨てる（daysToDatetime64()とnumpy.datetime_as_string()の組み合わせと同じ）。
+    年月日は H. Hinnant の civil_from_days（整数の切り捨て除算だけで負の日付も扱える）で求める。
+    NaT・NaN（・無限大）の日時は0として計算し、その位置をmissingで返す。
+    """
+    if unit not in __UNITS_PER_DAY:
+        raise ValueError('unit must be one of {}'.format(', '.join(__UNITS_PER_DAY)))
+    perDay = __UNITS_PER_DAY[unit]
+    days = numpy.asarray(datetimeToDays(days) if isinstance(days, datetime.datetime) else days)
+    if numpy.issubdtype(days.dtype, numpy.datetime64):
+        missing = numpy.isnat(days)
+        days = numpy.where(missing, numpy.zeros((), dtype=days.dtype), days)
+        date = days.astype('datetime64[D]')
+        day = (date - __REFERENCE_DATETIME64.astype('datetime64[D]')).astype(numpy.int64)
+        nanoseconds = (days - date).astype('timedelta64[ns]').astype(numpy.int64)
+    else:
+        days = days.astype(numpy.float64)
+        missing = ~numpy.isfinite(days)
+        days = numpy.where(missing, 0.0, days)
+        if days.size == 0 or numpy.abs(days).max() < 9.0e4:
+            # datetime64[ns]で表せる範囲は、daysToDatetime64()と同じ丸めにする
+            day, nanoseconds = numpy.divmod(numpy.round(days * 8.64e13).astype(numpy.int64), 86400 * 10 ** 9)
+        else:
+            floor = numpy.floor(days)
+            day = floor.astype(numpy.int64)
+            nanoseconds = numpy.round((days - floor) * 8.64e13).astype(numpy.int64)
+            # 丸めで1日になった時刻は翌日の0時とする
+            carry = nanoseconds >= 86400 * 10 ** 9
+            day, nanoseconds = day + carry, numpy.where(carry, 0, nanoseconds)
+    rest = nanoseconds // (86400 * 10 ** 9 // perDay)
+
+    z = day + 730425        # 0000-03-01からの日数（2000-01-01は730425日目）
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    d = doy - (153 * mp + 2) // 5 + 1
+    m = numpy.where(mp < 10, mp + 3, mp - 9)
+    y = yoe + era * 400 + (m <= 2)
+    return (y, m, d, rest, perDay // 86400 if unit != 'D' else 0, missing)
+
+
+def daysToCalendar_array(days: numpy.ndarray, unit: str = 'us') -> tuple:
+    """基準日時からの経過日数を、グレゴリオ暦の年・月・日・時・分・秒へ変換する（配列版）。
+
+    単位（'D'、's'、'ms'、'us'）未満は切り捨てる。年は0年を含む通し番号（紀元前1年が0年）。
+    NaT・NaNの日時は、秒をNaNとする（年・月・日・時・分の値は意味を持たない）。
+    Args:
+        days    (ndarray)   :   基準日時からの経過日数 [day]。datetime64も可
+        unit    (str)       :   時刻の単位
+    Returns:
+        y, m, d, h, i   (ndarray)   :   年・月・日・時・分（int64）
+        s               (ndarray)   :   秒（float64）
+    """
+    y, m, d, rest, perSecond, missing = __splitDays(days, unit)
+    if perSecond == 0:
+        zero = numpy.zeros_like(y)
+        return (y, m, d, zero, zero, numpy.where(missing, numpy.nan, 0.0))
+    seconds, fraction = numpy.divmod(rest, perSecond)
+    return (y, m, d, seconds // 3600, seconds // 60 % 60, numpy.where(missing, numpy.nan, seconds % 60 + fraction / perSecond))
+
+
+def julianDayToCalendar_array(jd: numpy.ndarray, unit: str = 'us') -> tuple:
+    """ユリウス日を、グレゴリオ暦の年・月・日・時・分・秒へ変換する（julianDay_array()の逆変換）。
+
+    Args:
+        jd      (ndarray)   :   ユリウス日（ユリウス通日）
+        unit    (str)       :   daysToCalendar_array()と同じ
+    Returns:
+        daysToCalendar_array()と同じ
+    """
+    return daysToCalendar_array(numpy.asarray(jd, dtype=numpy.float64) - REFERENCE_JD, unit)
+
+
+# '00'～'99'の文字コード（形状は (100, 2)）。文字列の配列はUCS4（numpyの'U'型）の文字コードを並べて作る
+__PAIRS = numpy.array([[ord(c) for c in '{:02}'.format(k)] for k in range(100)], dtype=numpy.uint32)
+
+
+def __text(columns: list, n: int) -> numpy.ndarray:
+    """列を横に並べ、行ごとの文字列の配列（'U'型）にする。
+
+    各列は定数の文字列（ASCII）、または (0以上の整数の配列, 桁数) とし、整数は0埋めして2桁ずつ表で引く。
+    """
+    widths = [len(column) if isinstance(column, str) else column[1] for column in columns]
+    matrix = numpy.empty((n, max(sum(widths), 1)), dtype=numpy.uint32)
+    end = 0
+    for column, width in zip(columns, widths):
+        begin, end = end, end + width
+        if isinstance(column, str):
+            matrix[:, begin:end] = [ord(c) for c in column]
+            continue
+        values = numpy.asarray(column[0], dtype=numpy.int64).reshape(-1)
+        while end - begin >= 2:
+            values, pair = numpy.divmod(values, 100)
+            matrix[:, end - 2:end] = __PAIRS[pair]
+            end -= 2
+        if end > begin:
+            matrix[:, begin] = values % 10 + ord('0')
+        end = begin + width
+    return matrix.view('U{}'.format(matrix.shape[1])).reshape(n)
+
+
+def __withYears(y: numpy.ndarray, columns: list) -> numpy.ndarray:
+    """年の文字列（'{:04}'の書式）と、それ以降の列をつないだ文字列の配列にする。"""
+    if len(y) == 0 or (y.min() >= 0 and y.max() <= 9999):
+        return __text([(y, 4)] + columns, len(y))
+    # 負の年・5桁の年は幅が変わるので、年ごとに1回だけ文字列にしてつなぐ
+    years, inverse = numpy.unique(y, return_inverse=True)
+    labels = numpy.array(['{:04}'.format(year) for year in years.tolist()])
+    return numpy.char.add(labels[inverse.reshape(-1)], __text(columns, len(y)))
+
+
+def formatDate_array(y: numpy.ndarray, m: numpy.ndarray, d: numpy.ndarray, separator: str = '-') -> numpy.ndarray:
+    """年・月・日から、'YYYY-MM-DD'の書式の文字列の配列をまとめて作る。
+
+    '{:04}{sep}{:02}{sep}{:02}'.format(y, m, d) と同じ文字列になる（負の年は'-001'、'-4713'など）。
+    Args:
+        y, m, d     (ndarray)   :   年・月・日
+        separator   (str)       :   区切り文字（ASCII）
+    Returns:
+        (ndarray)   :   文字列の配列
+    """
+    y, m, d = (numpy.asarray(v, dtype=numpy.int64).reshape(-1) for v in (y, m, d))
+    return __withYears(y, [separator, (m, 2), separator, (d, 2)])
+
+
+def formatTimestamps(dates: numpy.ndarray, unit: str = 'ms', dateSeparator: str = '-', timeSeparator: str = 'T') -> numpy.ndarray:
+    """日時から、'YYYY-MM-DDThh:mm:ss.fff'の書式の文字列の配列をまとめて作る。
+
+    行ごとに文字列を組み立てず、各桁の文字コードを配列で求めて並べる。
+    datetime64の配列はnumpy.datetime_as_string()と同じ文字列になる（単位未満は切り捨てる）。
+    NaT・NaNの日時は、numpy.datetime_as_string()と同じく'NaT'とする。
+    Args:
+        dates           (ndarray)   :   日時（UTC、datetime64）または基準日時からの経過日数 [day]
+        unit            (str)       :   'D'（日付だけ）、's'、'ms'、'us'
+        dateSeparator   (str)       :   年月日の区切り文字（ASCII）
+        timeSeparator   (str)       :   日付と時刻の区切り文字（ASCII）
+    Returns:
+        (ndarray)   :   文字列の配列、形状はdatesと同じ
+    """
+    shape = numpy.shape(dates)
+    y, m, d, rest, perSecond, missing = __splitDays(dates, unit)
+    y, m, d, rest = (v.reshape(-1) for v in (y, m, d, rest))
+    columns = [dateSeparator, (m, 2), dateSeparator, (d, 2)]
+    if unit != 'D':
+        seconds, fraction = numpy.divmod(rest, perSecond)
+        columns += [timeSeparator, (seconds // 3600, 2), ':', (seconds // 60 % 60, 2), ':', (seconds % 60, 2)]
+        if perSecond > 1:
+            columns += ['.', (fraction, len(str(perSecond)) - 1)]
+    labels = __withYears(y, columns)
+    if missing.any():
+        labels = numpy.where(missing.reshape(-1), 'NaT', labels)
+    return labels.reshape(shape)
+
+
 ###################################################################################################
 # 関数定義
 ###################################################################################################
@@ -576,16 +825,15 @@ def siderealTime(date: datetime.datetime) -> float:
         Howard D. Curtis, in Orbital Mechanics for Engineering Students (Third Edition), 2014
         Howard D. Curtis, in Orbital Mechanics for Engineering Students (Second Edition), 2010
     Args:
-        date    (datetime)  :   グリニッジ恒星時を求める対象の時刻（UTC）
+        date    (datetime)  :   グリニッジ恒星時を求める対象の時刻（UTC）。基準日時からの経過日数 [day] も可
     Returns:
         theta_G (float)     :   dateで指定した日時におけるグリニッジ恒星時 [deg]
     """
-    y = date.year
-    m = date.month
-    d = date.day
+    days = asDays(date)
+    day0 = math.floor(days)
 
     # ユリウス通日（0 h UT における）  J0
-    J0 = julianDay(y, m, d, 0, 0, 0)
+    J0 = REFERENCE_JD + day0
     
     # ユリウス世紀数（0 h UT における）    T0
     T0 = (J0 - 2451545) / 36525.0
@@ -597,7 +845,7 @@ def siderealTime(date: datetime.datetime) -> float:
         theta_G0 += 360
     
     # グリニッジ恒星時（指定した時刻における）  θ_G
-    UT = date.hour + date.minute / 60.0 + date.second / 3600.0
+    UT = (days - day0) * 24.0
     theta_G = theta_G0 + 360.98564724 * UT / 24.0
     theta_G -= 360.0 * int(theta_G / 360.0)
     if theta_G < 0:
@@ -648,6 +896,8 @@ def orbitalElementToLatLon(
         人工衛星位置推算の実際（最終版）
         http://www.infra.kochi-tech.ac.jp/takagi/Geomatics/5Estimation2.pdf
 
+    日時は datetime のほか、基準日時からの経過日数 [day] でも指定できる。
+
     Args:
         orb_ET      (datetime)  :   元期ET (Epoch Time) [day]
         orb_omega0  (float)     :   近地点引数ω0 (Argument of perigee) [deg]
@@ -667,13 +917,14 @@ def orbitalElementToLatLon(
     orb_r = 6378.137  # 地球の半径r [km] 「GCS WGS 1984」の赤道半径
     #orb_r = 6371.0087714   # 「GCS Sphere GRS 1980 Mean Radius」の赤道半径と極半径
     EPSILON = 1.0e-10  # ニュートン・ラフソン法の収束判定の閾値
-    theta_0_date = datetime.datetime(2006, 1, 1, 0, 0, 0, 0, datetime.timezone.utc)  # ある時刻
-    theta_0 = 0.276444444  # ある時刻のグリニッジ恒星時 [rev]
+
+    # 日時を基準日時からの経過日数にそろえる
+    date = asDays(date)
+    orb_ET = asDays(orb_ET)
 
     # 軌道長半径aの計算
     orb_GM = 2.975537 * (10 ** 15)  # [km^3 / day^2]
-    delta_t = (date - orb_ET).total_seconds() / (60 * 60 * 24)  # 元期からの経過日数Δt [day]
-    logger.debug('date - orb_ET = {}, total_seconds = {}'.format(date - orb_ET, (date - orb_ET).total_seconds()))
+    delta_t = date - orb_ET  # 元期からの経過日数Δt [day]
     orb_Mm = orb_M1 + orb_M2 * delta_t  # [rev / day]
     orb_a = (orb_GM / (4.0 * (math.pi ** 2) * (orb_Mm ** 2))) ** (1.0 / 3.0)   # [km]
     logger.debug('Δt = {} [day], Mm = {} [rev / day], a = {} [km]'.format(delta_t, orb_Mm, orb_a))
@@ -682,14 +933,7 @@ def orbitalElementToLatLon(
     tmp_M = (orb_M0 / 360) + (orb_M1 * delta_t) + (0.5 * orb_M2 * (delta_t ** 2))    # 観測時刻の平均近点角M [rev]
     orb_M = (tmp_M - int(tmp_M)) * 360  # 観測時刻の平均近点角M [deg]
     logger.debug('M = {} [rev]'.format(orb_M))
-    orb_E = 0
-    fx = orb_E - orb_e * math.sin(math.radians(orb_E)) - orb_M
-    dfx = 0
-    while abs(fx) > EPSILON:    # ニュートン・ラフソン法
-        fx = orb_E - orb_e * math.sin(math.radians(orb_E)) - orb_M  # f(x)
-        dfx = 1 - orb_e * math.cos(math.radians(orb_E))             # f'(x)
-        logger.debug('fx = {}, orb_E = {}'.format(fx, orb_E))
-        orb_E -= fx / dfx
+    orb_E = float(solveKepler_array(orb_M, orb_e, epsilon=EPSILON))    # ニュートン・ラフソン法
     logger.debug('E = {} [degree]'.format(orb_E))
 
     # 地球を中心とする人工衛星の三次元座標計算
@@ -723,12 +967,6 @@ def orbitalElementToLatLon(
     logger.debug('(x, y, z) = {}'.format(mat_xyz))
 
     # 観測時刻におけるグリニッジ子午線の赤経計算
-    
-    delta_T = (date - theta_0_date).total_seconds() / (60 * 60 * 24)    # その時刻から観測時刻までの日数 [day]
-    tmp_theta_G = theta_0 + 1.002737909 * delta_T   # [rev]
-    theta_G = (tmp_theta_G - int(tmp_theta_G)) * 360  # 観測時刻のグリニッジ恒星時 [deg]
-    logger.debug('θG = {} [deg]'.format(theta_G))
-    
     theta_G = siderealTime(date)
     logger.debug('θG = {} [deg]'.format(theta_G))
 
@@ -759,6 +997,608 @@ def orbitalElementToLatLon(
     return (phi, lam)
 
 
+###################################################################################################
+# 関数定義（配列版）
+###################################################################################################
+
+def solveKepler_array(orb_M, orb_e, initial=None, epsilon: float = 1.0e-10, maxIterations: int = 50) -> numpy.ndarray:
+    """度で書いたケプラー方程式 E - e sinE = M（E・Mは [deg]）を、離心近点角Eについてニュートン・ラフソン法で解く（配列版）。
+
+    反復はラジアンに直した式 E - (π/180) e sinE = M で行い（f'(E) = 1 - (π/180) e cosE）、初期値は平均近点角M（またはinitial）とする。
+    maxIterations回で収束しない点（入力がNaNの点を含む）はNaNとし、どの軌道要素でも計算が終わるようにする。
+    Args:
+        orb_M           (ndarray)   :   平均近点角M [deg]
+        orb_e           (ndarray)   :   離心率e [無次元]
+        initial         (ndarray)   :   初期値 [deg]（前回の解など）。NaNの点はMから始める
+        epsilon         (float)     :   収束判定の閾値 [deg]
+        maxIterations   (int)       :   反復の上限
+    Returns:
+        orb_E   (ndarray)   :   離心近点角E [deg]、形状はMとeをブロードキャストした形状
+    """
+    M = numpy.radians(numpy.asarray(orb_M, dtype=numpy.float64))
+    e = math.radians(1) * numpy.asarray(orb_e, dtype=numpy.float64)
+    shape = numpy.broadcast(M, e).shape
+    E = numpy.array(numpy.broadcast_to(M if initial is None else numpy.radians(initial), shape), dtype=numpy.float64)
+    E = numpy.array(numpy.where(numpy.isnan(E), M, E))
+    tolerance = math.radians(epsilon)
+    fx = E - e * numpy.sin(E) - M
+    for _ in range(maxIterations):
+        if not numpy.any(numpy.abs(fx) > tolerance):
+            break
+        E -= fx / (1 - e * numpy.cos(E))
+        fx = E - e * numpy.sin(E) - M
+    E[~(numpy.abs(fx) <= tolerance)] = numpy.nan
+    return numpy.degrees(E)
+
+
+def datetimeToDatetime64(date: datetime.datetime) -> numpy.datetime64:
+    """datetimeをUTCのnumpy.datetime64[ns]へ変換する。
+
+    タイムゾーン情報を持たないdatetimeはUTCとみなす。
+    Args:
+        date    (datetime)          :   変換対象の日時
+    Returns:
+        (numpy.datetime64)          :   UTCの日時 [ns]
+    """
+    if date.tzinfo is not None:
+        date = date.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return numpy.datetime64(date, 'ns')
+
+
+def prepareOutput(shape: tuple, dtype, out: numpy.ndarray = None) -> numpy.ndarray:
+    """配列版の関数の出力先の配列を用意する。
+
+    outが指定された場合は形状を確認してそのまま使い（型はoutの型になる）、指定されない場合はdtypeで確保する。
+    繰り返し同じ形状の計算をする場合は、呼び出し側で確保した配列をoutに渡して使い回すことで確保をなくせる。
+    Args:
+        shape   (tuple)     :   出力の形状
+        dtype               :   出力の型（numpy.float64 または numpy.float32）
+        out     (ndarray)   :   呼び出し側で確保した出力先の配列
+    Returns:
+        (ndarray)   :   出力先の配列
+    """
+    shape = tuple(shape)
+    if out is None:
+        return numpy.empty(shape, dtype=dtype)
+    if out.shape != shape:
+        raise ValueError('out must have shape {}'.format(shape))
+    return out
+
+
+def julianDay_array(
+    y   : numpy.ndarray,
+    m   : numpy.ndarray,
+    d   : numpy.ndarray,
+    h   : numpy.ndarray,
+    i   : numpy.ndarray,
+    s   : numpy.ndarray
+    ) -> numpy.ndarray:
+    """グレゴリオ暦からユリウス日を求める（配列版）。
+
+    julianDay()と同じ計算を配列に対してまとめて行う。
+    Args:
+        y   (ndarray)   :   年
+        m   (ndarray)   :   月
+        d   (ndarray)   :   日
+        h   (ndarray)   :   時
+        i   (ndarray)   :   分
+        s   (ndarray)   :   秒
+    Returns:
+        (ndarray)   :   ユリウス日（ユリウス通日）
+    """
+    y = numpy.asarray(y, dtype=numpy.float64)
+    m = numpy.asarray(m, dtype=numpy.float64)
+    return  367.0 * y - \
+        numpy.floor((7 * (y + numpy.floor((m + 9) / 12.0))) * 0.25) + \
+        numpy.floor(275 * m / 9.0) + d + 1721013.5 \
+        + ((numpy.asarray(s, dtype=numpy.float64) / 60.0 + i) / 60.0 + h) / 24.0
+
+
+def datetime64ToJulianDay(dates: numpy.ndarray) -> numpy.ndarray:
+    """日時からユリウス日を求める（配列版）。
+
+    Args:
+        dates   (ndarray)   :   日時（UTC、datetime64）。基準日時からの経過日数 [day] も可
+    Returns:
+        (ndarray)   :   ユリウス日（ユリウス通日）
+    """
+    return REFERENCE_JD + asDays(dates)
+
+
+def siderealTime_array(dates: numpy.ndarray) -> numpy.ndarray:
+    """指定した日時におけるグリニッジ恒星時を求める（配列版）。
+
+    siderealTime()と同じ計算を配列に対してまとめて行う。
+    Args:
+        dates   (ndarray)   :   グリニッジ恒星時を求める対象の時刻（UTC、datetime64）。基準日時からの経過日数 [day] も可
+    Returns:
+        theta_G (ndarray)   :   各時刻におけるグリニッジ恒星時 [deg]
+    """
+    days = asDays(dates)
+    day0 = numpy.floor(days)
+
+    # ユリウス通日・ユリウス世紀数（0 h UT における）
+    J0 = REFERENCE_JD + day0
+    T0 = (J0 - 2451545) / 36525.0
+
+    # グリニッジ恒星時（0 h UT における）  θ_G0
+    theta_G0 = 100.4606184 + 36000.77004 * T0 + 0.000387933 * (T0 ** 2) - (2.58310 ** (-8)) * (T0 ** 3)
+    theta_G0 -= 360.0 * numpy.trunc(theta_G0 / 360.0)
+    theta_G0 = numpy.where(theta_G0 < 0, theta_G0 + 360, theta_G0)
+
+    # グリニッジ恒星時（指定した時刻における）  θ_G
+    UT = (days - day0) * 24.0
+    theta_G = theta_G0 + 360.98564724 * UT / 24.0
+    theta_G -= 360.0 * numpy.trunc(theta_G / 360.0)
+    theta_G = numpy.where(theta_G < 0, theta_G + 360, theta_G)
+    return theta_G
+
+
+def orbitalElementToXYZ_array(
+    orb_ET      : datetime.datetime,
+    orb_omega0  : float,
+    orb_i       : float,
+    orb_OMEGA0  : float,
+    orb_e       : float,
+    orb_M0      : float,
+    orb_M1      : float,
+    orb_M2      : float,
+    dates       : numpy.ndarray,
+    dtype               = numpy.float64,
+    out         : numpy.ndarray = None
+    ) -> numpy.ndarray:
+    """軌道要素から、各日時における地球中心の衛星の三次元座標（赤道座標系）を求める（配列版）。
+
+    orbitalElementToLatLon()の前半と同じ計算を配列に対してまとめて行う。
+    軌道要素にも配列を指定でき、日時とブロードキャストして複数の衛星をまとめて計算する
+    （例：軌道要素を (衛星数, 1)、日時を (点数,) の形状にすると、結果は (衛星数, 点数, 3)）。
+    Args:
+        orb_ET～orb_M2      :   orbitalElementToLatLon()と同じ。配列も可（orb_ETは基準日時からの経過日数 [day]）
+        dates   (ndarray)   :   この日時の衛星の位置を求める（UTC、datetime64）。基準日時からの経過日数 [day] も可
+        dtype               :   出力の型。途中の計算は常にfloat64で行う
+        out     (ndarray)   :   出力先の配列（prepareOutput()を参照）
+    Returns:
+        xyz     (ndarray)   :   衛星の三次元座標 (x, y, z) [km]、形状は軌道要素と日時をブロードキャストした形状 + (3,)
+    """
+
+    # 定数
+    orb_r = 6378.137  # 地球の半径r [km] 「GCS WGS 1984」の赤道半径
+    orb_GM = 2.975537 * (10 ** 15)  # [km^3 / day^2]
+
+    # 軌道長半径aの計算
+    days = numpy.asarray(asDays(dates))
+    delta_t = days - asDays(orb_ET)   # 元期からの経過日数Δt [day]
+    orb_Mm = orb_M1 + orb_M2 * delta_t  # [rev / day]
+    orb_a = (orb_GM / (4.0 * (math.pi ** 2) * (orb_Mm ** 2))) ** (1.0 / 3.0)   # [km]
+
+    # 離心近点角Eの計算（ニュートン・ラフソン法）
+    tmp_M = (orb_M0 / 360) + (orb_M1 * delta_t) + (0.5 * orb_M2 * (delta_t ** 2))    # 観測時刻の平均近点角M [rev]
+    orb_M = (tmp_M - numpy.trunc(tmp_M)) * 360  # 観測時刻の平均近点角M [deg]
+    orb_E = solveKepler_array(orb_M, orb_e)
+
+    # 人工衛星の軌道面上の座標(U, V)
+    orb_U = orb_a * numpy.cos(numpy.radians(orb_E)) - orb_a * orb_e             # [km]
+    orb_V = orb_a * numpy.sqrt(1 - orb_e ** 2) * numpy.sin(numpy.radians(orb_E)) # [km]
+    orb_omega = orb_omega0 + (180 * 0.174 * (2 - 2.5 * (numpy.sin(numpy.radians(orb_i)) ** 2))) / (math.pi * ((orb_a / orb_r) ** 3.5)) * delta_t
+    orb_OMEGA = orb_OMEGA0 - (180 * 0.174 * numpy.cos(numpy.radians(orb_i))) / (math.pi * ((orb_a / orb_r) ** 3.5)) * delta_t
+
+    # 回転行列 mat1 * mat2 * mat3 を展開して適用する
+    cos_omega = numpy.cos(numpy.radians(orb_omega))
+    sin_omega = numpy.sin(numpy.radians(orb_omega))
+    cos_OMEGA = numpy.cos(numpy.radians(orb_OMEGA))
+    sin_OMEGA = numpy.sin(numpy.radians(orb_OMEGA))
+    cos_i = numpy.cos(numpy.radians(orb_i))
+    sin_i = numpy.sin(numpy.radians(orb_i))
+    p = orb_U * cos_omega - orb_V * sin_omega
+    q = orb_U * sin_omega + orb_V * cos_omega
+    xyz = prepareOutput(numpy.broadcast(p, q, cos_OMEGA, cos_i).shape + (3,), dtype, out)
+    xyz[..., 0] = p * cos_OMEGA - q * cos_i * sin_OMEGA
+    xyz[..., 1] = p * sin_OMEGA + q * cos_i * cos_OMEGA
+    xyz[..., 2] = q * sin_i
+    return xyz
+
+
+def orbitalElementToXYZVelocity_array(
+    orb_ET      : datetime.datetime,
+    orb_omega0  : float,
+    orb_i       : float,
+    orb_OMEGA0  : float,
+    orb_e       : float,
+    orb_M0      : float,
+    orb_M1      : float,
+    orb_M2      : float,
+    dates       : numpy.ndarray,
+    dtype               = numpy.float64,
+    out         : tuple = None
+    ) -> tuple:
+    """軌道要素から、各日時における地球中心の衛星の三次元座標と速度（赤道座標系）を求める（配列版）。
+
+    座標はorbitalElementToXYZ_array()と同じ。速度は軌道面上の座標(U, V)を離心近点角Eで微分し
+    （ケプラー方程式を度で解いているので dE/dt = n / (1 - (π/180) e cosE)）、近地点引数・昇交点赤経の永年変化による回転を加えて解析的に求める。
+    軌道長半径の変化による項は小さいので省く。
+    Args:
+        orb_ET～dates       :   orbitalElementToXYZ_array()と同じ
+        dtype               :   出力の型。途中の計算は常にfloat64で行う
+        out     (tuple)     :   出力先の配列 (xyz, velocity)（prepareOutput()を参照）
+    Returns:
+        xyz         (ndarray)   :   衛星の三次元座標 (x, y, z) [km]、形状は軌道要素と日時をブロードキャストした形状 + (3,)
+        velocity    (ndarray)   :   衛星の速度 (vx, vy, vz) [km/s]、形状はxyzと同じ
+    """
+
+    # 定数
+    orb_r = 6378.137  # 地球の半径r [km] 「GCS WGS 1984」の赤道半径
+    orb_GM = 2.975537 * (10 ** 15)  # [km^3 / day^2]
+
+    # 軌道長半径aの計算
+    days = numpy.asarray(asDays(dates))
+    delta_t = days - asDays(orb_ET)   # 元期からの経過日数Δt [day]
+    orb_Mm = orb_M1 + orb_M2 * delta_t  # [rev / day]
+    orb_a = (orb_GM / (4.0 * (math.pi ** 2) * (orb_Mm ** 2))) ** (1.0 / 3.0)   # [km]
+
+    # 離心近点角Eの計算（ニュートン・ラフソン法）
+    tmp_M = (orb_M0 / 360) + (orb_M1 * delta_t) + (0.5 * orb_M2 * (delta_t ** 2))    # 観測時刻の平均近点角M [rev]
+    orb_M = (tmp_M - numpy.trunc(tmp_M)) * 360  # 観測時刻の平均近点角M [deg]
+    orb_E = solveKepler_array(orb_M, orb_e)
+
+    # 人工衛星の軌道面上の座標(U, V)とその時間微分
+    cos_E = numpy.cos(numpy.radians(orb_E))
+    sin_E = numpy.sin(numpy.radians(orb_E))
+    sqrt1me2 = numpy.sqrt(1 - orb_e ** 2)
+    orb_U = orb_a * cos_E - orb_a * orb_e   # [km]
+    orb_V = orb_a * sqrt1me2 * sin_E        # [km]
+    dEdt = 2 * math.pi * orb_Mm / (1 - math.radians(1) * orb_e * cos_E) / 86400.0    # [rad / s]
+    orb_dU = -orb_a * sin_E * dEdt              # [km / s]
+    orb_dV = orb_a * sqrt1me2 * cos_E * dEdt    # [km / s]
+    rate_omega = (180 * 0.174 * (2 - 2.5 * (numpy.sin(numpy.radians(orb_i)) ** 2))) / (math.pi * ((orb_a / orb_r) ** 3.5))  # [deg / day]
+    rate_OMEGA = -(180 * 0.174 * numpy.cos(numpy.radians(orb_i))) / (math.pi * ((orb_a / orb_r) ** 3.5))                   # [deg / day]
+    orb_omega = orb_omega0 + rate_omega * delta_t
+    orb_OMEGA = orb_OMEGA0 + rate_OMEGA * delta_t
+    dOmega = numpy.radians(rate_omega) / 86400.0    # [rad / s]
+    dOMEGA = numpy.radians(rate_OMEGA) / 86400.0    # [rad / s]
+
+    # 回転行列 mat1 * mat2 * mat3 を展開して、座標と速度に適用する
+    cos_omega = numpy.cos(numpy.radians(orb_omega))
+    sin_omega = numpy.sin(numpy.radians(orb_omega))
+    cos_OMEGA = numpy.cos(numpy.radians(orb_OMEGA))
+    sin_OMEGA = numpy.sin(numpy.radians(orb_OMEGA))
+    cos_i = numpy.cos(numpy.radians(orb_i))
+    sin_i = numpy.sin(numpy.radians(orb_i))
+    xyz, velocity = (None, None) if out is None else out
+    shape = numpy.broadcast(orb_U, cos_omega, cos_OMEGA, cos_i).shape + (3,)
+    xyz = prepareOutput(shape, dtype, xyz)
+    velocity = prepareOutput(shape, dtype, velocity)
+    p = orb_U * cos_omega - orb_V * sin_omega
+    q = orb_U * sin_omega + orb_V * cos_omega
+    x = p * cos_OMEGA - q * cos_i * sin_OMEGA
+    y = p * sin_OMEGA + q * cos_i * cos_OMEGA
+    xyz[..., 0] = x
+    xyz[..., 1] = y
+    xyz[..., 2] = q * sin_i
+
+    # 速度：軌道面上の速度に、近地点引数の変化（(p, q)の回転）と昇交点赤経の変化（z軸回りの回転）を加える
+    dp = orb_dU * cos_omega - orb_dV * sin_omega - dOmega * q
+    dq = orb_dU * sin_omega + orb_dV * cos_omega + dOmega * p
+    velocity[..., 0] = dp * cos_OMEGA - dq * cos_i * sin_OMEGA - dOMEGA * y
+    velocity[..., 1] = dp * sin_OMEGA + dq * cos_i * cos_OMEGA + dOMEGA * x
+    velocity[..., 2] = dq * sin_i
+    return (xyz, velocity)
+
+
+def orbitalElementToLatLon_array(
+    orb_ET      : datetime.datetime,
+    orb_omega0  : float,
+    orb_i       : float,
+    orb_OMEGA0  : float,
+    orb_e       : float,
+    orb_M0      : float,
+    orb_M1      : float,
+    orb_M2      : float,
+    dates       : numpy.ndarray,
+    dtype               = numpy.float64,
+    out         : tuple = None
+    ) -> tuple:
+    """軌道要素から、各日時における衛星位置の経緯度を求める（配列版）。
+
+    orbitalElementToLatLon()と同じ計算を配列に対してまとめて行う。
+    Args:
+        orb_ET～orb_M2      :   orbitalElementToLatLon()と同じ
+        dates   (ndarray)   :   この日時の衛星の経緯度を求める（UTC、datetime64）
+        dtype               :   xyzToLatLon_array()と同じ
+        out     (tuple)     :   xyzToLatLon_array()と同じ
+    Returns:
+        phi     (ndarray)   :   緯度 [deg]
+        lam     (ndarray)   :   経度 [deg]
+    """
+    xyz = orbitalElementToXYZ_array(orb_ET, orb_omega0, orb_i, orb_OMEGA0, orb_e, orb_M0, orb_M1, orb_M2, dates)
+    return xyzToLatLon_array(xyz, dates, dtype, out)
+
+
+def xyzToLatLon_array(xyz: numpy.ndarray, dates: numpy.ndarray, dtype=numpy.float64, out: tuple = None) -> tuple:
+    """地球中心の衛星の三次元座標（赤道座標系）から、衛星位置の経緯度を求める（配列版）。
+
+    Args:
+        xyz     (ndarray)   :   衛星の三次元座標 (x, y, z) [km]、形状は (..., len(dates), 3)
+        dates   (ndarray)   :   各座標の日時（UTC、datetime64）。基準日時からの経過日数 [day] も可
+        dtype               :   出力の型。途中の計算は常にfloat64で行う
+        out     (tuple)     :   出力先の配列 (phi, lam)（prepareOutput()を参照）
+    Returns:
+        phi     (ndarray)   :   緯度 [deg]
+        lam     (ndarray)   :   経度 [deg]
+    """
+    # 観測時刻のグリニッジ恒星時で地球に固定した座標系へ回転する（mat5）
+    theta_G = numpy.radians(siderealTime_array(dates))
+    cos_G = numpy.cos(theta_G)
+    sin_G = numpy.sin(theta_G)
+    X = xyz[..., 0] * cos_G + xyz[..., 1] * sin_G
+    Y = -xyz[..., 0] * sin_G + xyz[..., 1] * cos_G
+    Z = xyz[..., 2]
+    phi, lam = (None, None) if out is None else out
+    phi = numpy.degrees(numpy.arcsin(Z / numpy.sqrt(X ** 2 + Y ** 2 + Z ** 2)), out=prepareOutput(X.shape, dtype, phi))
+    lam = numpy.degrees(numpy.arctan2(Y, X), out=prepareOutput(X.shape, dtype, lam))
+    return (phi, lam)
+
+
+def tleToXYZ_array(tle: TwoLineElements, dates: numpy.ndarray, dtype=numpy.float64, out: numpy.ndarray = None) -> numpy.ndarray:
+    """TLEから、各日時における地球中心の衛星の三次元座標（赤道座標系）を求める（配列版）。
+
+    Args:
+        tle     (TwoLineElements)   :   TLE
+        dates   (ndarray)           :   この日時の衛星の位置を求める（UTC、datetime64）。基準日時からの経過日数 [day] も可
+        dtype                       :   orbitalElementToXYZ_array()と同じ
+        out     (ndarray)           :   orbitalElementToXYZ_array()と同じ
+    Returns:
+        xyz     (ndarray)           :   衛星の三次元座標 (x, y, z) [km]、形状は (len(dates), 3)
+    """
+    return orbitalElementToXYZ_array(
+        orb_ET      = tle.epoch_datetime,
+        orb_omega0  = tle.argumentOfPerigee_float,
+        orb_i       = tle.inclination_float,
+        orb_OMEGA0  = tle.raan_float,
+        orb_e       = tle.eccentricity_float,
+        orb_M0      = tle.meanAnomaly_float,
+        orb_M1      = tle.meanMotion_float,
+        orb_M2      = tle.firstDerivativeMeanMotion_float,
+        dates       = dates,
+        dtype       = dtype,
+        out         = out
+        )
+
+
+def tleToLatLon_array(tle: TwoLineElements, dates: numpy.ndarray, dtype=numpy.float64, out: tuple = None) -> tuple:
+    """TLEから、各日時における衛星位置の経緯度を求める（配列版）。
+
+    Args:
+        tle     (TwoLineElements)   :   TLE
+        dates   (ndarray)           :   この日時の衛星の経緯度を求める（UTC、datetime64）。基準日時からの経過日数 [day] も可
+        dtype                       :   xyzToLatLon_array()と同じ
+        out     (tuple)             :   xyzToLatLon_array()と同じ
+    Returns:
+        phi     (ndarray)           :   緯度 [deg]
+        lam     (ndarray)           :   経度 [deg]
+    """
+    return orbitalElementToLatLon_array(
+        orb_ET      = tle.epoch_datetime,
+        orb_omega0  = tle.argumentOfPerigee_float,
+        orb_i       = tle.inclination_float,
+        orb_OMEGA0  = tle.raan_float,
+        orb_e       = tle.eccentricity_float,
+        orb_M0      = tle.meanAnomaly_float,
+        orb_M1      = tle.meanMotion_float,
+        orb_M2      = tle.firstDerivativeMeanMotion_float,
+        dates       = dates,
+        dtype       = dtype,
+        out         = out
+        )
+
+
+def groundTrack_adaptive(
+    tle         : TwoLineElements,
+    beginDate   : datetime.datetime,
+    endDate     : datetime.datetime,
+    tolerance   : float = 1.0,
+    minStep     : float = 1.0,
+    maxStep     : float = 600.0,
+    backend     : str = 'meanMotion'
+    ) -> tuple:
+    """許容誤差を満たすように刻み幅を自動調整して、地上軌跡（グラウンドトラック）を求める。
+
+    地上軌跡を経緯度上の折れ線として描いたときの弦の誤差（区間の中点における、折れ線と実際の位置との距離）が
+    許容誤差以下になるまで区間を二分していく。
+    直線に近い区間は粗いまま残り、高緯度の折り返しでは細かくなる。
+    日付変更線（経度±180度）をまたぐ区間は、最小刻み幅まで二分して横断位置を詰める。
+    Args:
+        tle         (TwoLineElements)   :   TLE
+        beginDate   (datetime)          :   開始日時（UTC）
+        endDate     (datetime)          :   終了日時（UTC）
+        tolerance   (float)             :   弦の許容誤差 [km]
+        minStep     (float)             :   最小刻み幅 [sec]
+        maxStep     (float)             :   最大刻み幅（初期分割の刻み幅） [sec]
+        backend     (str)               :   伝搬計算のバックエンド（createPropagator()を参照）
+    Returns:
+        dates       (ndarray)           :   日時（UTC、datetime64[ns]）
+        phi         (ndarray)           :   緯度 [deg]
+        lam         (ndarray)           :   経度 [deg]
+    """
+    orb_r = 6378.137  # 地球の半径r [km]
+    begin = asDays(beginDate)
+    period = (asDays(endDate) - begin) * 86400.0    # [sec]
+    if period <= 0:
+        raise ValueError('endDate must be later than beginDate')
+
+    propagator = createPropagator([tle], backend)
+
+    def propagate(sec: numpy.ndarray) -> tuple:
+        phi, lam = propagator.latLon(begin + sec / 86400.0)
+        return (phi[0], lam[0])
+
+    # 最大刻み幅で初期分割する
+    sec = numpy.linspace(0, period, int(math.ceil(period / maxStep)) + 1)
+    phi, lam = propagate(sec)
+    secList, phiList, lamList = [sec], [phi], [lam]
+    t0, t1 = sec[:-1], sec[1:]
+    phi0, phi1, lam0, lam1 = phi[:-1], phi[1:], lam[:-1], lam[1:]
+
+    while len(t0) > 0:
+        # 各区間の中点を一括で求める
+        tm = (t0 + t1) / 2
+        phim, lamm = propagate(tm)
+
+        # 折れ線上の中点（日付変更線をまたぐ場合は経度差を補正する）
+        dlam = lam1 - lam0
+        crossing = numpy.abs(dlam) > 180
+        dlam = numpy.where(crossing, dlam - 360 * numpy.sign(dlam), dlam)
+        phic = (phi0 + phi1) / 2
+        lamc = lam0 + dlam / 2
+        dlamm = (lamm - lamc + 180) % 360 - 180
+
+        # 折れ線上の中点と実際の位置との距離（正距円筒近似） [km]
+        error = orb_r * numpy.radians(numpy.hypot(phim - phic, dlamm * numpy.cos(numpy.radians(phim))))
+        split = ((error > tolerance) | crossing) & ((t1 - t0) / 2 >= minStep)
+
+        secList.append(tm[split])
+        phiList.append(phim[split])
+        lamList.append(lamm[split])
+        t0, t1 = numpy.concatenate((t0[split], tm[split])), numpy.concatenate((tm[split], t1[split]))
+        phi0, phi1 = numpy.concatenate((phi0[split], phim[split])), numpy.concatenate((phim[split], phi1[split]))
+        lam0, lam1 = numpy.concatenate((lam0[split], lamm[split])), numpy.concatenate((lamm[split], lam1[split]))
+
+    sec = numpy.concatenate(secList)
+    order = numpy.argsort(sec, kind='stable')
+    dates = daysToDatetime64(begin + sec[order] / 86400.0)
+    logger.debug('groundTrack_adaptive: {} points'.format(len(dates)))
+    return (dates, numpy.concatenate(phiList)[order], numpy.concatenate(lamList)[order])
+
+
+###################################################################################################
+# クラス定義（伝搬計算のバックエンド）
+###################################################################################################
+
+class Propagator:
+    """複数の衛星の位置を配列でまとめて求める、伝搬計算のバックエンドの基底クラス。
+
+    派生クラスはxyz()を実装する。全衛星・全日時の位置を1回の呼び出しで求め、
+    結果の形状は (衛星数,) + 日時の形状 + (3,) とする。
+    """
+
+    def __init__(self, tles: list):
+        """バックエンドを作成する。
+
+        Args:
+            tles    (list)  :   TwoLineElementsのリスト
+        """
+        self.__tles = list(tles)
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def tles(self) -> list:
+        return self.__tles
+    @property
+    def satelliteNum(self) -> int:
+        return len(self.__tles)
+
+
+    ###############################################################################################
+    # メソッド
+    ###############################################################################################
+
+    def xyz(self, dates: numpy.ndarray, dtype=numpy.float64, out: numpy.ndarray = None) -> numpy.ndarray:
+        """各衛星・各日時における地球中心の衛星の三次元座標（赤道座標系）を求める。
+
+        Args:
+            dates   (ndarray)   :   日時（UTC、datetime64）または基準日時からの経過日数 [day]
+            dtype               :   出力の型。途中の計算は常にfloat64で行う
+            out     (ndarray)   :   出力先の配列（prepareOutput()を参照）
+        Returns:
+            (ndarray)   :   衛星の三次元座標 (x, y, z) [km]、形状は (衛星数,) + dates.shape + (3,)
+        """
+        raise NotImplementedError()
+
+
+    def xyzVelocity(self, dates: numpy.ndarray, dtype=numpy.float64, out: tuple = None) -> tuple:
+        """各衛星・各日時における地球中心の衛星の三次元座標と速度（赤道座標系）を求める。
+
+        Args:
+            dates   (ndarray)   :   日時（UTC、datetime64）または基準日時からの経過日数 [day]
+            dtype               :   出力の型。途中の計算は常にfloat64で行う
+            out     (tuple)     :   出力先の配列 (xyz, velocity)（prepareOutput()を参照）
+        Returns:
+            xyz         (ndarray)   :   衛星の三次元座標 (x, y, z) [km]、形状は (衛星数,) + dates.shape + (3,)
+            velocity    (ndarray)   :   衛星の速度 (vx, vy, vz) [km/s]、形状はxyzと同じ
+        """
+        raise NotImplementedError()
+
+
+    def latLon(self, dates: numpy.ndarray, dtype=numpy.float64, out: tuple = None) -> tuple:
+        """各衛星・各日時における衛星位置の経緯度を求める。
+
+        Args:
+            dates   (ndarray)   :   日時（UTC、datetime64）または基準日時からの経過日数 [day]
+            dtype               :   出力の型。途中の計算は常にfloat64で行う
+            out     (tuple)     :   出力先の配列 (phi, lam)（prepareOutput()を参照）
+        Returns:
+            phi     (ndarray)   :   緯度 [deg]、形状は (衛星数,) + dates.shape
+            lam     (ndarray)   :   経度 [deg]、形状は (衛星数,) + dates.shape
+        """
+        days = asDays(dates)
+        return xyzToLatLon_array(self.xyz(days), days, dtype, out)
+
+
+class MeanMotionPropagator(Propagator):
+    """平均運動と平均運動変化係数による簡易な軌道モデル（orbitalElementToXYZ_array()）のバックエンド。
+    """
+
+    def __init__(self, tles: list):
+        """バックエンドを作成し、全衛星の軌道要素を配列にまとめておく。
+
+        Args:
+            tles    (list)  :   TwoLineElementsのリスト
+        """
+        super().__init__(tles)
+        self.__elements = numpy.array([[
+            datetimeToDays(tle.epoch_datetime),
+            tle.argumentOfPerigee_float,
+            tle.inclination_float,
+            tle.raan_float,
+            tle.eccentricity_float,
+            tle.meanAnomaly_float,
+            tle.meanMotion_float,
+            tle.firstDerivativeMeanMotion_float
+            ] for tle in self.tles]).reshape(-1, 8)
+
+
+    def xyz(self, dates: numpy.ndarray, dtype=numpy.float64, out: numpy.ndarray = None) -> numpy.ndarray:
+        days = numpy.asarray(asDays(dates))
+        # 軌道要素を (衛星数, 1, ...) の形状にして日時とブロードキャストする
+        columns = self.__elements.T.reshape((8, len(self.__elements)) + (1,) * days.ndim)
+        return orbitalElementToXYZ_array(*columns, dates=days, dtype=dtype, out=out)
+
+
+    def xyzVelocity(self, dates: numpy.ndarray, dtype=numpy.float64, out: tuple = None) -> tuple:
+        days = numpy.asarray(asDays(dates))
+        columns = self.__elements.T.reshape((8, len(self.__elements)) + (1,) * days.ndim)
+        return orbitalElementToXYZVelocity_array(*columns, dates=days, dtype=dtype, out=out)
+
+
+def createPropagator(tles: list, backend: str = 'meanMotion') -> Propagator:
+    """伝搬計算のバックエンドを作成する。
+
+    Args:
+        tles    (list)  :   TwoLineElementsのリスト
+        backend (str)   :   'meanMotion'（簡易な軌道モデル）または 'sgp4'（SGP4/SDP4、OrbitSGP4モジュール）
+    Returns:
+        (Propagator)    :   バックエンド
+    """
+    if backend == 'meanMotion':
+        return MeanMotionPropagator(tles)
+    if backend == 'sgp4':
+        import OrbitSGP4
+        return OrbitSGP4.SGP4Propagator(tles)
+    raise ValueError('backend must be meanMotion or sgp4')
+
 
 ###################################################################################################
 # テスト用関数
@@ -806,30 +1646,28 @@ def __testALOS_list():
     logger.info('TLE = {}'.format(s))
     tle = TwoLineElements(s)
 
-    timeLatLonList = []
-    for count in range(0, pointNum):
-        t = beginDate + step * count
-        latlon = orbitalElementToLatLon(
-                orb_ET      = datetime.datetime(2006, 1, 1, 0, 0, 0, 0, datetime.timezone.utc) + datetime.timedelta(days = 120.72277529 - 1),
-                orb_omega0  = 14.7699,
-                orb_i       = 98.2104,
-                orb_OMEGA0  = 195.1270,
-                orb_e       = 0.0001679,
-                orb_M0      = 345.3549,
-                orb_M1      = 14.59544429,
-                orb_M2      = 0.00000232,
-                date        = t
-            )
-        timeLatLonList.append([t, latlon[0], latlon[1]])
-        logger.debug('t = {}, lat = {}, lon = {}'.format(t, latlon[0], latlon[1]))
+    # 日時は基準日時からの経過日数で進め、文字列への変換は出力時だけ行う
+    days = datetimeToDays(beginDate) + (period / datetime.timedelta(days=1)) * numpy.arange(pointNum) / pointNum
+    lat, lon = orbitalElementToLatLon_array(
+            orb_ET      = datetime.datetime(2006, 1, 1, 0, 0, 0, 0, datetime.timezone.utc) + datetime.timedelta(days = 120.72277529 - 1),
+            orb_omega0  = 14.7699,
+            orb_i       = 98.2104,
+            orb_OMEGA0  = 195.1270,
+            orb_e       = 0.0001679,
+            orb_M0      = 345.3549,
+            orb_M1      = 14.59544429,
+            orb_M2      = 0.00000232,
+            dates       = days
+        )
+    labels = formatTimestamps(days, unit='s', dateSeparator='/', timeSeparator=' ')
 
     filepath = 'D:/GIS/ArcGIS_Project/衛星軌道の描画/軌道.csv'
     with open(filepath, mode='w') as file:
-        for i in range(0, len(timeLatLonList) - 1):
+        for i in range(0, len(days) - 1):
             file.write('{},{},{},{},{}\n'.format(
-                timeLatLonList[i][0].strftime('%Y/%m/%d %H:%M:%S'),
-                timeLatLonList[i][1], timeLatLonList[i][2],
-                timeLatLonList[i + 1][1], timeLatLonList[i + 1][2]))
+                labels[i],
+                lat[i], lon[i],
+                lat[i + 1], lon[i + 1]))
 
 
 def __testLandsat8():
@@ -940,57 +1778,212 @@ def __testTLE():
 # main関数
 ###################################################################################################
 
-def main():
-
-    __testTLE()
-
-    #__testALOS()
+def __parseDate(text: str) -> datetime.datetime:
+    """コマンドラインの日時（ISO 8601、'now'は現在日時）をUTCのdatetimeにする。タイムゾーンがなければUTCとみなす。"""
+    if text == 'now':
+        return datetime.datetime.now(datetime.timezone.utc)
+    date = datetime.datetime.fromisoformat(text)
+    if date.tzinfo is None:
+        return date.replace(tzinfo=datetime.timezone.utc)
+    return date.astimezone(datetime.timezone.utc)
+
+
+def __readTLESources(sources: list) -> list:
+    """TLEのファイル（'-'は標準入力）を読み込む。"""
+    import sys
+    tles = []
+    for source in sources:
+        if source == '-':
+            tles.extend(readTLEs(sys.stdin.read()))
+        else:
+            with open(source, encoding='utf-8') as file:
+                tles.extend(readTLEs(file.read()))
+    if len(tles) == 0:
+        raise ValueError('no TLE was found in {}'.format(', '.join(sources)))
+    return tles
 
-    #__testALOS_list()
 
-    __testLandsat8()
+def __openOutput(path: str):
+    """出力先を開く（'-'は標準出力）。"""
+    import sys
+    import contextlib
+    if path == '-':
+        return contextlib.nullcontext(sys.stdout)
+    return open(path, mode='w', encoding='utf-8', newline='')
 
-    exit()
 
-    #beginDate = datetime.datetime(2020, 1, 1, 9, 0, 0, 0, datetime.timezone(datetime.timedelta(hours=+9))).astimezone(datetime.timezone.utc)
-    beginDate = datetime.datetime.now(datetime.timezone.utc)
-    endDate = beginDate + datetime.timedelta(days = 16)
-    pointNum = 10000
-    period = endDate - beginDate
-    step = period / pointNum
-    logger.info('beginDate = {}, endDate = {}, period = {}, step = {}'.format(beginDate, endDate, period, step))
-
-    with open('D:/GIS/ArcGIS_Project/衛星軌道の描画/tle.txt') as file:
-        s = file.read()
-        logger.info('TLE = {}'.format(s))
+def __latLonWorker(tles: list, days: numpy.ndarray, backend: str) -> tuple:
+    """ワーカーのプロセスで、一部の衛星の経緯度を求める。"""
+    return createPropagator(tles, backend).latLon(days)
 
-    tle = TwoLineElements(s)
 
-    timeLatLonList = []
-    for count in range(0, pointNum):
-        t = beginDate + step * count
-        lat, lon = orbitalElementToLatLon(
-            orb_ET      = tle.epoch_datetime,
-            orb_omega0  = tle.argumentOfPerigee_float,
-            orb_i       = tle.inclination_float,
-            orb_OMEGA0  = tle.raan_float,
-            orb_e       = tle.eccentricity_float,
-            orb_M0      = tle.meanAnomaly_float,
-            orb_M1      = tle.meanMotion_float,
-            orb_M2      = tle.firstDerivativeMeanMotion_float,
-            date        = t
-            )
-        timeLatLonList.append([t, lat, lon])
-        logger.debug('t = {}, lat = {}, lon = {}'.format(t, lat, lon))
+def __propagateChunks(tles: list, days: numpy.ndarray, backend: str, workers: int, chunkSize: int):
+    """時刻方向に chunkSize 点ずつ区切って全衛星の経緯度を求め、(開始番号, 緯度, 経度) を順に返す。
 
-    filepath = 'D:/GIS/ArcGIS_Project/衛星軌道の描画/軌道.csv'
-    with open(filepath, mode='w') as file:
-        for i in range(0, len(timeLatLonList) - 1):
-            file.write('{},{},{},{},{}\n'.format(
-                timeLatLonList[i][0].strftime('%Y/%m/%d %H:%M:%S'),
-                timeLatLonList[i][1], timeLatLonList[i][2],
-                timeLatLonList[i + 1][1], timeLatLonList[i + 1][2]))
+    workersが2以上の場合は、衛星をワーカー数に分けてプロセスプールで並列に計算する。
+    """
+    import concurrent.futures
+    if workers <= 1:
+        propagator = createPropagator(tles, backend)
+        for t0 in range(0, len(days), chunkSize):
+            phi, lam = propagator.latLon(days[t0:t0 + chunkSize])
+            yield (t0, phi, lam)
+        return
+    groups = [tles[k::workers] for k in range(workers) if tles[k::workers]]
+    order = numpy.argsort(numpy.concatenate([numpy.arange(len(tles))[k::workers] for k in range(len(groups))]))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=len(groups)) as executor:
+        for t0 in range(0, len(days), chunkSize):
+            chunk = days[t0:t0 + chunkSize]
+            results = list(executor.map(__latLonWorker, groups, [chunk] * len(groups), [backend] * len(groups)))
+            phi = numpy.concatenate([result[0] for result in results])[order]
+            lam = numpy.concatenate([result[1] for result in results])[order]
+            yield (t0, phi, lam)
+
+
+def __commandTrack(args) -> None:
+    """track：期間内の全衛星の地上軌跡を出力する。"""
+    tles = __readTLESources(args.tle)
+    begin = asDays(__parseDate(args.begin))
+    end = asDays(__parseDate(args.end)) if args.end is not None else begin + args.days
+    if end <= begin:
+        raise ValueError('end must be later than begin')
+
+    if args.adaptive is not None:
+        # 刻み幅を自動調整した地上軌跡を、隣り合う2点を結ぶ線分の表として出力する（衛星ごとに点の日時が異なるのでCSVだけ）
+        with __openOutput(args.output) as file:
+            file.write('satelliteNumber,time,lat,lon,nextLat,nextLon\n')
+            for tle in tles:
+                dates, lat, lon = groundTrack_adaptive(tle, begin, end, tolerance=args.adaptive, maxStep=args.step, backend=args.backend)
+                logger.info('{}: points = {}'.format(tle.name.strip(), len(dates)))
+                labels = formatTimestamps(dates, unit='s', dateSeparator='/', timeSeparator=' ')
+                for i in range(0, len(dates) - 1):
+                    file.write('{},{},{},{},{},{}\n'.format(
+                        tle.satelliteNumber_int, labels[i],
+                        lat[i], lon[i],
+                        lat[i + 1], lon[i + 1]))
+        return
+
+    if args.format == 'npy':
+        # メモリマップの配列へチャンクごとに書き込む（中断しても同じ引数で再開できる）
+        import OrbitChunked
+        job = OrbitChunked.ChunkedPropagation(
+            args.output, tles, begin, end, args.step, args.backend, numpy.float32,
+            memoryBudget=args.chunk_size * len(tles) * (OrbitChunked.ChunkedPropagation.WORK_BYTES_PER_POINT + 8))
+        job.run(lambda done, total: logger.info('{}/{} chunks'.format(done, total)))
+        return
+
+    pointNum = int(math.ceil((end - begin) * 86400.0 / args.step - 1e-9))
+    days = begin + numpy.arange(pointNum) * (args.step / 86400.0)
+    numbers = numpy.array([tle.satelliteNumber_int for tle in tles])
+    if args.format == 'csv':
+        # チャンクごとに書き出すので、全点を一度にメモリに持たない（行は時刻、衛星の順）
+        with __openOutput(args.output) as file:
+            file.write('satelliteNumber,time,lat,lon\n')
+            for t0, phi, lam in __propagateChunks(tles, days, args.backend, args.workers, args.chunk_size):
+                # 日時の列はチャンクごとにまとめて文字列にし、行は時刻、衛星の順に並べた列から作る
+                labels = formatTimestamps(days[t0:t0 + phi.shape[1]], unit='ms')
+                file.write(''.join(map('{},{},{:.6f},{:.6f}\n'.format,
+                    numpy.tile(numbers, phi.shape[1]).tolist(), numpy.repeat(labels, len(tles)).tolist(),
+                    phi.T.ravel().tolist(), lam.T.ravel().tolist())))
+        return
+
+    import OrbitExport
+    phi = numpy.empty((len(tles), pointNum))
+    lam = numpy.empty((len(tles), pointNum))
+    for t0, chunkPhi, chunkLam in __propagateChunks(tles, days, args.backend, args.workers, args.chunk_size):
+        phi[:, t0:t0 + chunkPhi.shape[1]] = chunkPhi
+        lam[:, t0:t0 + chunkLam.shape[1]] = chunkLam
+    writer = {'npz': OrbitExport.writeNPZ, 'parquet': OrbitExport.writeParquet, 'geojson': OrbitExport.writeGeoJSON}[args.format]
+    writer(args.output, daysToDatetime64(days), phi, lam, numbers)
+
+
+def __commandSnapshot(args) -> None:
+    """snapshot：ある日時の全衛星の位置を出力する。"""
+    tles = __readTLESources(args.tle)
+    days = numpy.array([asDays(__parseDate(args.at))])
+    phi, lam = next(__propagateChunks(tles, days, args.backend, args.workers, 1))[1:]
+    label = formatTimestamps(days, unit='ms')[0]
+    with __openOutput(args.output) as file:
+        file.write('satelliteNumber,name,time,lat,lon\n')
+        for k, tle in enumerate(tles):
+            file.write('{},{},{},{:.6f},{:.6f}\n'.format(tle.satelliteNumber_int, tle.name.strip(), label, phi[k, 0], lam[k, 0]))
+
+
+def __commandPasses(args) -> None:
+    """passes：地上局から見える全衛星のパスを出力する。"""
+    import OrbitStation
+    tles = __readTLESources(args.tle)
+    begin = __parseDate(args.begin)
+    end = __parseDate(args.end) if args.end is not None else begin + datetime.timedelta(days=args.days)
+    station = OrbitStation.GroundStation(args.station[0], args.station[1], args.station[2] if len(args.station) > 2 else 0.0, args.min_elevation)
+    passes = OrbitStation.findPasses(tles, [station], begin, end, step=args.step, backend=args.backend)
+    beginLabels = formatTimestamps(numpy.array([p.begin for p in passes]), unit='s')
+    endLabels = formatTimestamps(numpy.array([p.end for p in passes]), unit='s')
+    with __openOutput(args.output) as file:
+        file.write('satelliteNumber,name,begin,end,duration,maxElevation\n')
+        for p, beginLabel, endLabel in zip(passes, beginLabels, endLabels):
+            tle = tles[p.satellite]
+            file.write('{},{},{},{},{:.1f},{:.2f}\n'.format(
+                tle.satelliteNumber_int, tle.name.strip(), beginLabel, endLabel, p.duration, p.maxElevation))
+
+
+def main(argv: list = None) -> int:
+    """コマンドラインから地上軌跡・位置・パスを求める。
+
+    python -m Orbit track    --tle catalog.txt --begin 2020-02-15T00:00 --days 1 --step 10 --output track.csv
+    python -m Orbit snapshot --tle catalog.txt --at now
+    python -m Orbit passes   --tle catalog.txt --station 35.68 139.77 --begin now --days 7
+    Args:
+        argv    (list)  :   コマンドライン引数。Noneの場合はsys.argv
+    Returns:
+        (int)   :   終了コード
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='Orbit', description='TLEから人工衛星の地上軌跡・位置・パスを求める')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--tle', action='append', required=True, help='TLEのファイル（複数指定可、-は標準入力）')
+    common.add_argument('--backend', choices=('meanMotion', 'sgp4'), default='meanMotion', help='伝搬計算のバックエンド')
+    common.add_argument('--output', default='-', help='出力先（-は標準出力）')
+    common.add_argument('--workers', type=int, default=1, help='並列に計算するプロセス数')
+    common.add_argument('--log-level', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'), default='INFO', help='ログの出力レベル')
+    window = argparse.ArgumentParser(add_help=False)
+    window.add_argument('--begin', default='now', help='開始日時（ISO 8601、UTC、nowは現在日時）')
+    window.add_argument('--end', help='終了日時（ISO 8601、UTC）')
+    window.add_argument('--days', type=float, default=1.0, help='--endを省略した場合の期間 [day]')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    track = commands.add_parser('track', parents=[common, window], help='地上軌跡')
+    track.add_argument('--step', type=float, default=60.0, help='刻み幅 [sec]（--adaptiveでは最大刻み幅）')
+    track.add_argument('--format', choices=('csv', 'npz', 'parquet', 'geojson', 'npy'), default='csv', help='出力形式（npyは--outputのディレクトリへ再開可能な書き込み）')
+    track.add_argument('--chunk-size', type=int, default=10000, help='1度に計算する時刻の点数')
+    track.add_argument('--adaptive', type=float, metavar='TOLERANCE', help='刻み幅を自動調整する場合の弦の許容誤差 [km]（線分の表をCSVで出力する。--workersは使えない）')
+    track.set_defaults(handler=__commandTrack)
+
+    snapshot = commands.add_parser('snapshot', parents=[common], help='ある日時の全衛星の位置')
+    snapshot.add_argument('--at', default='now', help='日時（ISO 8601、UTC、nowは現在日時）')
+    snapshot.set_defaults(handler=__commandSnapshot)
+
+    passes = commands.add_parser('passes', parents=[common, window], help='地上局から見えるパス')
+    passes.add_argument('--station', type=float, nargs='+', required=True, metavar='LAT LON [HEIGHT]', help='地上局の緯度・経度 [deg]・楕円体高 [m]')
+    passes.add_argument('--min-elevation', type=float, default=0.0, help='最低仰角 [deg]')
+    passes.add_argument('--step', type=float, default=30.0, help='仰角を調べる刻み幅 [sec]')
+    passes.set_defaults(handler=__commandPasses)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if getattr(args, 'step', 1.0) <= 0 or getattr(args, 'chunk_size', 1) <= 0 or args.workers <= 0:
+        parser.error('--step, --chunk-size and --workers must be positive')
+    if args.command == 'track' and args.adaptive is not None and (args.format != 'csv' or args.workers != 1):
+        parser.error('--adaptive supports only --format csv and --workers 1')
+    if args.command == 'passes' and len(args.station) not in (2, 3):
+        parser.error('--station takes LAT LON [HEIGHT]')
+    try:
+        args.handler(args)
+    except (OSError, ValueError) as e:
+        parser.exit(1, 'Orbit: error: {}\n'.format(e))
+    return 0
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
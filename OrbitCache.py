@@ -0,0 +1,228 @@
+import logging
+import threading
+import collections
+import numpy
+
+import Orbit
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# クラス定義
+###################################################################################################
+
+class PropagationCache:
+    """衛星位置の計算結果を保持するLRUキャッシュ。
+
+    キーは (衛星番号, 元期番号 (Element Number), 量子化した時刻) とし、
+    要求された日時はresolution秒単位に丸めて、丸めた日時の位置を計算・保持する。
+    保持する件数または概算のバイト数が上限を超えたら、最も長く使われていないものから捨てる。
+    衛星のTLEをsetTLE()で差し替えた場合や、登録済みのTLEの内容が書き換えられた場合は、
+    その衛星の保持内容を自動的に捨てる。
+    位置は作成時に指定したバックエンド（Orbit.createPropagator()）で計算する。バックエンドは衛星ごとに
+    最初のミスで作成して使い回し（SGP4の定数の初期化を繰り返さない）、保持内容と一緒に捨てる。
+    1衛星ずつ引くので、多数の衛星をまとめて計算するOrbitServiceやコマンドラインでは使わず、
+    同じ衛星・日時を繰り返し求める呼び出し側の前に置いて使う。
+    """
+
+    # 1件あたりの概算のバイト数（値の配列とキー・辞書の管理領域）
+    ENTRY_BYTES = 5 * 8 + 200
+
+    def __init__(self, maxEntries: int = 100000, maxBytes: int = None, resolution: float = 1.0, backend: str = 'meanMotion'):
+        """空のキャッシュを作成する。
+
+        Args:
+            maxEntries  (int)   :   保持する件数の上限。Noneの場合は制限しない
+            maxBytes    (int)   :   保持する概算のバイト数の上限。Noneの場合は制限しない
+            resolution  (float) :   時刻を量子化する単位 [sec]
+            backend     (str)   :   伝搬計算のバックエンド（Orbit.createPropagator()と同じ）
+        """
+        if maxEntries is None and maxBytes is None:
+            raise ValueError('maxEntries or maxBytes must be specified')
+        if resolution <= 0:
+            raise ValueError('resolution is invalid')
+        self.__maxEntries = maxEntries
+        self.__maxBytes = maxBytes
+        self.__resolution = numpy.int64(round(resolution * 1e9))   # [ns]
+        self.__backend = backend
+        self.__entries = collections.OrderedDict()  # (衛星番号, 元期番号, 量子化した時刻) -> (緯度, 経度, x, y, z)
+        self.__keysBySatellite = {}                 # 衛星番号 -> キーの集合
+        self.__tles = {}                            # 衛星番号 -> (TwoLineElements, TLEの内容)
+        self.__propagators = {}                     # 衛星番号 -> Orbit.Propagator
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def backend(self) -> str:
+        return self.__backend
+    @property
+    def hits(self) -> int:
+        return self.__hits
+    @property
+    def misses(self) -> int:
+        return self.__misses
+    @property
+    def evictions(self) -> int:
+        return self.__evictions
+    @property
+    def entryNum(self) -> int:
+        return len(self.__entries)
+    @property
+    def byteNum(self) -> int:
+        return len(self.__entries) * self.ENTRY_BYTES
+
+
+    ###############################################################################################
+    # メソッド
+    ###############################################################################################
+
+    def setTLE(self, tle: Orbit.TwoLineElements) -> None:
+        """衛星のTLEを登録する。同じ衛星番号のTLEが登録済みで内容が異なる場合は、その衛星の保持内容を捨てる。
+
+        Args:
+            tle     (TwoLineElements)   :   TLE
+        """
+        with self.__lock:
+            current = self.__tles.get(tle.satelliteNumber_int)
+            if current is not None and current[1] != tle.elements:
+                self.__invalidate(tle.satelliteNumber_int)
+            self.__tles[tle.satelliteNumber_int] = (tle, tle.elements)
+
+
+    def removeTLE(self, satelliteNumber: int) -> None:
+        """衛星のTLEの登録を解除し、その衛星の保持内容を捨てる。
+
+        Args:
+            satelliteNumber (int)   :   衛星番号
+        """
+        with self.__lock:
+            self.__tles.pop(satelliteNumber, None)
+            self.__invalidate(satelliteNumber)
+
+
+    def clear(self) -> None:
+        """保持内容とヒット・ミスの回数をすべて消去する。TLEの登録は残す。
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.__keysBySatellite.clear()
+            self.__hits = self.__misses = self.__evictions = 0
+
+
+    def __invalidate(self, satelliteNumber: int) -> None:
+        """衛星の保持内容とバックエンドを捨てる（ロックを取得済みで呼ぶ）。"""
+        self.__propagators.pop(satelliteNumber, None)
+        for key in self.__keysBySatellite.pop(satelliteNumber, ()):
+            del self.__entries[key]
+
+
+    def __evict(self) -> None:
+        """上限を超えている間、最も長く使われていないものから捨てる（ロックを取得済みで呼ぶ）。"""
+        while (self.__maxEntries is not None and len(self.__entries) > self.__maxEntries) \
+            or (self.__maxBytes is not None and len(self.__entries) * self.ENTRY_BYTES > self.__maxBytes):
+            key, _ = self.__entries.popitem(last=False)
+            self.__keysBySatellite[key[0]].discard(key)
+            self.__evictions += 1
+
+
+    def lookup(self, satelliteNumber: int, dates: numpy.ndarray) -> numpy.ndarray:
+        """衛星の各日時（量子化した日時）における緯度・経度・三次元座標を、キャッシュを介して求める。
+
+        保持していない日時の分だけをバックエンドでまとめて計算し、キャッシュに加える。
+        Args:
+            satelliteNumber (int)       :   衛星番号（setTLE()で登録済みであること）
+            dates           (ndarray)   :   日時（UTC、datetime64）または基準日時からの経過日数 [day]
+        Returns:
+            (ndarray)   :   列が (緯度 [deg], 経度 [deg], x [km], y [km], z [km]) の配列、形状は dates.shape + (5,)
+        """
+        # 経過日数（datetime64以外）は、datetime64[ns]として読まずにOrbit.daysToDatetime64()で変換する
+        if not numpy.issubdtype(numpy.asarray(dates).dtype, numpy.datetime64):
+            dates = Orbit.daysToDatetime64(Orbit.asDays(dates))
+        dates = numpy.asarray(dates, dtype='datetime64[ns]')
+        buckets = numpy.round(dates.reshape(-1).astype(numpy.int64) / self.__resolution).astype(numpy.int64)
+        result = numpy.empty((len(buckets), 5))
+
+        with self.__lock:
+            if satelliteNumber not in self.__tles:
+                raise KeyError('satellite {} is not registered'.format(satelliteNumber))
+            tle, elements = self.__tles[satelliteNumber]
+            if tle.elements != elements:    # 登録済みのTLEの内容が書き換えられた
+                self.__invalidate(satelliteNumber)
+                elements = tle.elements
+                self.__tles[satelliteNumber] = (tle, elements)
+            elementNumber = tle.elementNumber_int
+            propagator = self.__propagators.get(satelliteNumber)
+
+            missing = []
+            for k, bucket in enumerate(buckets.tolist()):
+                value = self.__entries.get((satelliteNumber, elementNumber, bucket))
+                if value is None:
+                    missing.append(k)
+                else:
+                    self.__entries.move_to_end((satelliteNumber, elementNumber, bucket))
+                    result[k] = value
+            self.__hits += len(buckets) - len(missing)
+            self.__misses += len(missing)
+
+        if len(missing) > 0:
+            # 同じ量子化した時刻は1回だけ計算する
+            uniqueBuckets, inverse = numpy.unique(buckets[missing], return_inverse=True)
+            quantized = (uniqueBuckets * self.__resolution).astype('datetime64[ns]')
+            if propagator is None:
+                propagator = Orbit.createPropagator([tle], self.__backend)
+            xyz = propagator.xyz(quantized)[0]
+            lat, lon = Orbit.xyzToLatLon_array(xyz, quantized)
+            values = numpy.column_stack((lat, lon, xyz))
+            result[missing] = values[inverse]
+
+            with self.__lock:
+                # 計算中にTLEが差し替えられていれば保持しない
+                if self.__tles.get(satelliteNumber, (None, None))[1] == elements:
+                    self.__propagators.setdefault(satelliteNumber, propagator)
+                    keys = self.__keysBySatellite.setdefault(satelliteNumber, set())
+                    for bucket, value in zip(uniqueBuckets.tolist(), values):
+                        key = (satelliteNumber, elementNumber, bucket)
+                        self.__entries[key] = value
+                        keys.add(key)
+                    self.__evict()
+
+        return result.reshape(dates.shape + (5,))
+
+
+    def latLon(self, satelliteNumber: int, dates: numpy.ndarray) -> tuple:
+        """衛星の各日時（量子化した日時）における経緯度を、キャッシュを介して求める。
+
+        Args:
+            satelliteNumber (int)       :   衛星番号（setTLE()で登録済みであること）
+            dates           (ndarray)   :   lookup()と同じ
+        Returns:
+            phi     (ndarray)   :   緯度 [deg]
+            lam     (ndarray)   :   経度 [deg]
+        """
+        values = self.lookup(satelliteNumber, dates)
+        return (values[..., 0], values[..., 1])
+
+
+    def xyz(self, satelliteNumber: int, dates: numpy.ndarray) -> numpy.ndarray:
+        """衛星の各日時（量子化した日時）における三次元座標を、キャッシュを介して求める。
+
+        Args:
+            satelliteNumber (int)       :   衛星番号（setTLE()で登録済みであること）
+            dates           (ndarray)   :   日時（UTC、datetime64）
+        Returns:
+            (ndarray)   :   衛星の三次元座標 (x, y, z) [km]、形状は dates.shape + (3,)
+        """
+        return self.lookup(satelliteNumber, dates)[..., 2:]
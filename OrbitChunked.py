@@ -0,0 +1,225 @@
+import logging
+import os
+import json
+import math
+import tempfile
+import datetime
+import numpy
+
+import Orbit
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# クラス定義
+###################################################################################################
+
+class ChunkedPropagation:
+    """(衛星 × 時刻) の全点の経緯度を、メモリに収まるチャンクに分けて計算し、ディスク上の配列へ書き込む。
+
+    出力はディレクトリ内の lat.npy・lon.npy（形状は (衛星数, 点数)）で、numpy.load(mmap_mode='r') で読める。
+    チャンクの大きさは、配列版の計算の作業領域がメモリ予算に収まるように決める。
+    チャンクごとに完了を progress.npy に記録するので、中断した場合は同じ引数で作り直してrun()を呼べば、
+    未完了のチャンクから再開する。
+    """
+
+    # 配列版の計算で1点あたりに使う作業領域の概算のバイト数（float64の中間配列を約64個）
+    WORK_BYTES_PER_POINT = 64 * 8
+
+    def __init__(
+        self,
+        directory       : str,
+        tles            : list,
+        beginDate       : datetime.datetime,
+        endDate         : datetime.datetime,
+        step            : float,
+        backend         : str = 'meanMotion',
+        dtype                 = numpy.float32,
+        memoryBudget    : int = 256 * 2 ** 20
+        ):
+        """出力先を開く。同じ引数で作成済みの出力があれば、それを開いて再開できるようにする。
+
+        Args:
+            directory       (str)       :   出力先のディレクトリ
+            tles            (list)      :   TwoLineElementsのリスト
+            beginDate       (datetime)  :   開始日時（UTC）
+            endDate         (datetime)  :   終了日時（UTC）。この日時は含まない
+            step            (float)     :   刻み幅 [sec]
+            backend         (str)       :   Orbit.createPropagator()と同じ
+            dtype                       :   出力の型
+            memoryBudget    (int)       :   1つのチャンクの計算に使うメモリの目安 [byte]
+        """
+        begin = Orbit.asDays(beginDate)
+        end = Orbit.asDays(endDate)
+        if end <= begin:
+            raise ValueError('endDate must be later than beginDate')
+        if step <= 0:
+            raise ValueError('step must be positive')
+        tles = list(tles)
+        if len(tles) == 0:
+            raise ValueError('tles must not be empty')
+        self.__directory = directory
+        self.__tles = tles
+        self.__begin = begin
+        self.__step = step
+        self.__backend = backend
+        self.__dtype = numpy.dtype(dtype)
+        pointNum = int(math.ceil((end - begin) * 86400.0 / step - 1e-9))
+        self.__shape = (len(self.__tles), pointNum)
+
+        # チャンクの形状：衛星方向は全衛星（入りきらなければ入るだけ）をまとめて1つのバックエンドで計算し、
+        # 時刻方向は残りの点数を衛星数で割った長さとする
+        points = max(1, memoryBudget // (self.WORK_BYTES_PER_POINT + 2 * self.__dtype.itemsize))
+        satelliteChunk = min(len(self.__tles), points)
+        timeChunk = min(pointNum, max(1, points // satelliteChunk))
+        self.__chunkShape = (satelliteChunk, timeChunk)
+        self.__chunkGrid = (-(-len(self.__tles) // satelliteChunk), -(-pointNum // timeChunk))
+
+        manifest = {
+            'tles'      :   [tle.elements for tle in self.__tles],
+            'begin'     :   begin,
+            'step'      :   step,
+            'shape'     :   list(self.__shape),
+            'chunkShape':   list(self.__chunkShape),
+            'backend'   :   backend,
+            'dtype'     :   self.__dtype.str,
+        }
+        os.makedirs(directory, exist_ok=True)
+        manifestPath = os.path.join(directory, 'manifest.json')
+        resume = False
+        if os.path.exists(manifestPath):
+            with open(manifestPath, encoding='utf-8') as file:
+                if json.load(file) != json.loads(json.dumps(manifest)):
+                    raise ValueError('{} contains the output of different arguments'.format(directory))
+            resume = True
+
+        open_memmap = numpy.lib.format.open_memmap
+        if resume:
+            self.__lat = open_memmap(os.path.join(directory, 'lat.npy'), mode='r+')
+            self.__lon = open_memmap(os.path.join(directory, 'lon.npy'), mode='r+')
+            self.__done = open_memmap(os.path.join(directory, 'progress.npy'), mode='r+')
+        else:
+            self.__lat = open_memmap(os.path.join(directory, 'lat.npy'), mode='w+', dtype=self.__dtype, shape=self.__shape)
+            self.__lon = open_memmap(os.path.join(directory, 'lon.npy'), mode='w+', dtype=self.__dtype, shape=self.__shape)
+            self.__done = open_memmap(os.path.join(directory, 'progress.npy'), mode='w+', dtype=numpy.uint8, shape=self.__chunkGrid)
+            # 出力を作成し終えてから設定を書くので、設定があれば出力は必ずそろっている
+            fd, tmppath = tempfile.mkstemp(suffix='.json', dir=directory)
+            with os.fdopen(fd, mode='w', encoding='utf-8') as file:
+                json.dump(manifest, file)
+            os.replace(tmppath, manifestPath)
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def directory(self) -> str:
+        return self.__directory
+    @property
+    def shape(self) -> tuple:
+        return self.__shape
+    @property
+    def chunkShape(self) -> tuple:
+        return self.__chunkShape
+    @property
+    def chunkNum(self) -> int:
+        return self.__done.size
+    @property
+    def completedChunkNum(self) -> int:
+        return int(numpy.count_nonzero(self.__done))
+    @property
+    def isComplete(self) -> bool:
+        return self.completedChunkNum == self.chunkNum
+    @property
+    def lat(self) -> numpy.memmap:
+        return self.__lat
+    @property
+    def lon(self) -> numpy.memmap:
+        return self.__lon
+
+
+    ###############################################################################################
+    # メソッド
+    ###############################################################################################
+
+    def dates(self, start: int = 0, stop: int = None) -> numpy.ndarray:
+        """出力の時刻方向の点の日時を求める。
+
+        Args:
+            start   (int)   :   最初の点の番号
+            stop    (int)   :   最後の点の次の番号。Noneの場合は最後まで
+        Returns:
+            (ndarray)   :   日時（UTC、datetime64[ns]）
+        """
+        stop = self.__shape[1] if stop is None else stop
+        return Orbit.daysToDatetime64(self.__days(start, stop))
+
+
+    def __days(self, start: int, stop: int) -> numpy.ndarray:
+        return self.__begin + numpy.arange(start, stop) * (self.__step / 86400.0)
+
+
+    def run(self, progress=None) -> None:
+        """未完了のチャンクを順に計算して書き込む。
+
+        Args:
+            progress    :   チャンクを書き終えるたびに progress(完了したチャンク数, チャンク数) の形で呼ぶ関数
+        """
+        satelliteChunk, timeChunk = self.__chunkShape
+        satelliteNum, pointNum = self.__shape
+        completed = self.completedChunkNum
+        for i in range(self.__chunkGrid[0]):
+            if self.__done[i].all():
+                continue
+            s0, s1 = i * satelliteChunk, min((i + 1) * satelliteChunk, satelliteNum)
+            propagator = Orbit.createPropagator(self.__tles[s0:s1], self.__backend)
+            for j in range(self.__chunkGrid[1]):
+                if self.__done[i, j]:
+                    continue
+                t0, t1 = j * timeChunk, min((j + 1) * timeChunk, pointNum)
+                # 出力のメモリマップの部分へ直接書き込む
+                propagator.latLon(self.__days(t0, t1), out=(self.__lat[s0:s1, t0:t1], self.__lon[s0:s1, t0:t1]))
+                self.__lat.flush()
+                self.__lon.flush()
+                # 出力を書き終えてから完了を記録する
+                self.__done[i, j] = 1
+                self.__done.flush()
+                completed += 1
+                logger.debug('ChunkedPropagation: {}/{} chunks'.format(completed, self.chunkNum))
+                if progress is not None:
+                    progress(completed, self.chunkNum)
+
+
+###################################################################################################
+# 関数定義
+###################################################################################################
+
+def propagateToMemmap(
+    directory       : str,
+    tles            : list,
+    beginDate       : datetime.datetime,
+    endDate         : datetime.datetime,
+    step            : float,
+    backend         : str = 'meanMotion',
+    dtype                 = numpy.float32,
+    memoryBudget    : int = 256 * 2 ** 20,
+    progress              = None
+    ) -> ChunkedPropagation:
+    """全衛星・全時刻の経緯度をディスク上の配列へ書き込む。中断された出力があれば続きから再開する。
+
+    Args:
+        directory～memoryBudget  :   ChunkedPropagation()と同じ
+        progress                :   ChunkedPropagation.run()と同じ
+    Returns:
+        (ChunkedPropagation)    :   書き込みを終えた出力（lat・lonはメモリマップ）
+    """
+    job = ChunkedPropagation(directory, tles, beginDate, endDate, step, backend, dtype, memoryBudget)
+    job.run(progress)
+    return job
@@ -0,0 +1,233 @@
+import logging
+import math
+import datetime
+import numpy
+
+import Orbit
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+EARTH_RADIUS = 6378.137     # 地球の赤道半径 [km]
+
+
+###################################################################################################
+# クラス定義
+###################################################################################################
+
+class CoverageGrid:
+    """経緯度グリッドの各セルについて、センサーによるアクセスの回数・最初と最後の時刻・最大の再訪間隔を集計する。
+
+    地上軌跡を時刻順のチャンクで受け取り、固定サイズの配列だけを更新するので、地上軌跡そのものは保持しない。
+    衛星コンステレーションの場合は、全衛星の同じ期間の地上軌跡を1つのチャンクとして渡す。
+    セルの中心がセンサーの観測幅（衛星直下からの半頂角で指定）に入った時刻をアクセスとみなし、
+    同じセルへのアクセスの間隔がaccessGap以下のものは1回のアクセスとしてまとめる。
+    """
+
+    __NAT = numpy.iinfo(numpy.int64).min    # 未アクセスを表す値（datetime64のNaTと同じ）
+
+    def __init__(self, halfAngle: float, resolution: float = 1.0, accessGap: float = 600.0):
+        """空のグリッドを作成する。
+
+        Args:
+            halfAngle   (float)     :   センサーの観測幅の半頂角（衛星直下から） [deg]
+            resolution  (float)     :   グリッドの間隔 [deg]。180を割り切れる値
+            accessGap   (float)     :   1回のアクセスとみなす間隔の上限 [sec]。地上軌跡の刻み幅より大きくする
+        """
+        if not 0 < halfAngle < 90:
+            raise ValueError('halfAngle is invalid')
+        if resolution <= 0 or abs(180 / resolution - round(180 / resolution)) > 1e-9:
+            raise ValueError('resolution is invalid')
+        self.__halfAngle = halfAngle
+        self.__resolution = resolution
+        self.__accessGap = numpy.int64(accessGap * 1e9)     # [ns]
+        self.__rowNum = int(round(180 / resolution))
+        self.__colNum = 2 * self.__rowNum
+
+        # セルの中心の緯度・経度 [deg]
+        self.__cellLat = -90 + resolution * (numpy.arange(self.__rowNum) + 0.5)
+        self.__cellLon = -180 + resolution * (numpy.arange(self.__colNum) + 0.5)
+
+        # 集計結果（時刻はUNIX時間 [ns]）
+        shape = (self.__rowNum, self.__colNum)
+        self.__count = numpy.zeros(shape, dtype=numpy.int32)
+        self.__first = numpy.full(shape, self.__NAT, dtype=numpy.int64)
+        self.__last = numpy.full(shape, self.__NAT, dtype=numpy.int64)
+        self.__maxGap = numpy.zeros(shape, dtype=numpy.int64)
+        self.__lastDate = self.__NAT
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def latitudes(self) -> numpy.ndarray:
+        return self.__cellLat
+    @property
+    def longitudes(self) -> numpy.ndarray:
+        return self.__cellLon
+    @property
+    def count(self) -> numpy.ndarray:
+        return self.__count
+    @property
+    def firstAccess(self) -> numpy.ndarray:
+        return self.__first.view('datetime64[ns]')
+    @property
+    def lastAccess(self) -> numpy.ndarray:
+        return self.__last.view('datetime64[ns]')
+    @property
+    def maxRevisitGap(self) -> numpy.ndarray:
+        return self.__maxGap.view('timedelta64[ns]')
+
+
+    ###############################################################################################
+    # メソッド
+    ###############################################################################################
+
+    def footprintAngle(self, alt: numpy.ndarray) -> numpy.ndarray:
+        """観測幅の半頂角と高度から、観測範囲の地心角（衛星直下点からの角距離）を求める。
+
+        半頂角が地平線を超える場合は、地平線までの地心角とする。
+        Args:
+            alt     (ndarray)   :   衛星の高度 [km]
+        Returns:
+            (ndarray)   :   観測範囲の地心角 [rad]
+        """
+        eta = math.radians(self.__halfAngle)
+        ratio = (EARTH_RADIUS + numpy.asarray(alt, dtype=numpy.float64)) / EARTH_RADIUS
+        return numpy.where(
+            ratio * math.sin(eta) < 1,
+            numpy.arcsin(numpy.minimum(ratio * math.sin(eta), 1)) - eta,
+            numpy.arccos(1 / ratio))
+
+
+    def update(self, dates: numpy.ndarray, lat: numpy.ndarray, lon: numpy.ndarray, alt: numpy.ndarray) -> None:
+        """地上軌跡のチャンクを集計に加える。
+
+        チャンクは時刻順に渡す（前のチャンクの最後の時刻より前の時刻を含めない）。
+        Args:
+            dates   (ndarray)   :   日時（UTC、datetime64）、形状は (点数,)
+            lat     (ndarray)   :   衛星直下点の緯度 [deg]、形状は (点数,) または (衛星数, 点数)
+            lon     (ndarray)   :   衛星直下点の経度 [deg]、形状はlatと同じ
+            alt     (ndarray)   :   衛星の高度 [km]、latと同じ形状またはスカラー
+        """
+        dates = numpy.asarray(dates, dtype='datetime64[ns]').astype(numpy.int64)
+        lat = numpy.asarray(lat, dtype=numpy.float64)
+        lon = numpy.asarray(lon, dtype=numpy.float64)
+        if len(dates) == 0:
+            return
+        if dates.min() < self.__lastDate:
+            raise ValueError('chunks must be given in time order')
+        t = numpy.broadcast_to(dates, lat.shape).reshape(-1)
+        alpha = self.footprintAngle(numpy.broadcast_to(alt, lat.shape)).reshape(-1)
+        phi = numpy.radians(lat.reshape(-1))
+        lam = lon.reshape(-1)
+
+        # 観測範囲にかかる行（緯度帯）を点ごとに列挙する
+        res = self.__resolution
+        row0 = numpy.clip(numpy.floor((numpy.degrees(phi - alpha) + 90) / res), 0, self.__rowNum - 1).astype(numpy.int64)
+        row1 = numpy.clip(numpy.floor((numpy.degrees(phi + alpha) + 90) / res), 0, self.__rowNum - 1).astype(numpy.int64)
+        rowCount = row1 - row0 + 1
+        point = numpy.repeat(numpy.arange(len(t)), rowCount)
+        row = numpy.repeat(row0 - numpy.cumsum(rowCount) + rowCount, rowCount) + numpy.arange(rowCount.sum())
+
+        # 各行で観測範囲に入る経度の幅（球面三角法）
+        phiCell = numpy.radians(self.__cellLat[row])
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            cosDelta = (numpy.cos(alpha[point]) - numpy.sin(phi[point]) * numpy.sin(phiCell)) \
+                / (numpy.cos(phi[point]) * numpy.cos(phiCell))
+        valid = ~(cosDelta > 1)
+        point, row, cosDelta = point[valid], row[valid], cosDelta[valid]
+        delta = numpy.degrees(numpy.arccos(numpy.clip(cosDelta, -1, 1)))
+        full = ~(cosDelta > -1) | (delta >= 180)
+        col0 = numpy.ceil((lam[point] - delta + 180) / res - 0.5).astype(numpy.int64)
+        col1 = numpy.floor((lam[point] + delta + 180) / res - 0.5).astype(numpy.int64)
+        col0 = numpy.where(full, 0, col0)
+        col1 = numpy.where(full, self.__colNum - 1, numpy.minimum(col1, col0 + self.__colNum - 1))
+        colCount = numpy.maximum(col1 - col0 + 1, 0)
+
+        # (点, セル) の組を展開する
+        cellPoint = numpy.repeat(point, colCount)
+        cellCol = (numpy.repeat(col0 - numpy.cumsum(colCount) + colCount, colCount) + numpy.arange(colCount.sum())) % self.__colNum
+        cell = numpy.repeat(row, colCount) * self.__colNum + cellCol
+        cellTime = t[cellPoint]
+        if len(cell) == 0:
+            self.__lastDate = max(self.__lastDate, dates.max())
+            return
+
+        # セルごと・時刻順に並べて、アクセスの区切りと再訪間隔を求める
+        order = numpy.lexsort((cellTime, cell))
+        cell, cellTime = cell[order], cellTime[order]
+        head = numpy.ones(len(cell), dtype=bool)
+        head[1:] = cell[1:] != cell[:-1]
+        previous = numpy.empty_like(cellTime)
+        previous[1:] = cellTime[:-1]
+        previous[head] = self.__last.reshape(-1)[cell[head]]
+        hasPrevious = previous != self.__NAT
+        gap = numpy.where(hasPrevious, cellTime - previous, 0)
+        newAccess = ~hasPrevious | (gap > self.__accessGap)
+        revisit = numpy.where(hasPrevious & newAccess, gap, 0)
+
+        headIndex = numpy.flatnonzero(head)
+        cells = cell[headIndex]
+        tailIndex = numpy.append(headIndex[1:], len(cell)) - 1
+        count = self.__count.reshape(-1)
+        first = self.__first.reshape(-1)
+        last = self.__last.reshape(-1)
+        maxGap = self.__maxGap.reshape(-1)
+        count[cells] += numpy.add.reduceat(newAccess.astype(numpy.int32), headIndex)
+        first[cells] = numpy.where(first[cells] == self.__NAT, cellTime[headIndex], first[cells])
+        last[cells] = cellTime[tailIndex]
+        maxGap[cells] = numpy.maximum(maxGap[cells], numpy.maximum.reduceat(revisit, headIndex))
+        self.__lastDate = max(self.__lastDate, dates.max())
+
+
+###################################################################################################
+# 関数定義
+###################################################################################################
+
+def tleCoverage(
+    tles        : list,
+    beginDate   : datetime.datetime,
+    endDate     : datetime.datetime,
+    step        : float,
+    halfAngle   : float,
+    resolution  : float = 1.0,
+    chunkSize   : int = 1440,
+    accessGap   : float = 600.0
+    ) -> CoverageGrid:
+    """複数の衛星の地上軌跡をチャンクごとに求めながら、アクセスの統計を集計する。
+
+    Args:
+        tles        (list)      :   TwoLineElementsのリスト
+        beginDate   (datetime)  :   開始日時（UTC）
+        endDate     (datetime)  :   終了日時（UTC）
+        step        (float)     :   刻み幅 [sec]
+        halfAngle   (float)     :   CoverageGrid()と同じ
+        resolution  (float)     :   CoverageGrid()と同じ
+        chunkSize   (int)       :   1つのチャンクの時刻の数
+        accessGap   (float)     :   CoverageGrid()と同じ
+    Returns:
+        (CoverageGrid)  :   集計結果
+    """
+    grid = CoverageGrid(halfAngle, resolution, accessGap)
+    begin = Orbit.datetimeToDatetime64(beginDate)
+    end = Orbit.datetimeToDatetime64(endDate)
+    stepNs = numpy.timedelta64(int(step * 1e9), 'ns')
+    while begin < end:
+        dates = numpy.arange(begin, min(begin + stepNs * chunkSize, end), stepNs)
+        xyz = numpy.stack([Orbit.tleToXYZ_array(tle, dates) for tle in tles])
+        lat, lon = Orbit.xyzToLatLon_array(xyz, dates)
+        grid.update(dates, lat, lon, numpy.linalg.norm(xyz, axis=-1) - EARTH_RADIUS)
+        begin += stepNs * chunkSize
+    return grid
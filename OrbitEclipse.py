@@ -0,0 +1,165 @@
+import logging
+import math
+import numpy
+
+import Orbit
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+AU = 149597870.7            # 天文単位 [km]
+EARTH_RADIUS = 6378.137     # 地球の赤道半径 [km]
+SUN_RADIUS = 696000.0       # 太陽の半径 [km]
+
+# 照射状態
+SUNLIT = 0      # 日照
+PENUMBRA = 1    # 半影
+UMBRA = 2       # 本影
+
+
+###################################################################################################
+# 関数定義
+###################################################################################################
+
+def sunPosition_array(dates: numpy.ndarray) -> numpy.ndarray:
+    """各日時における地球中心の太陽の三次元座標（赤道座標系）を求める（配列版）。
+
+    References:
+        The Astronomical Almanac / Low precision formulas for the Sun（精度は0.01度程度、1950～2050年）
+    Args:
+        dates   (ndarray)   :   日時（UTC、datetime64）
+    Returns:
+        xyz     (ndarray)   :   太陽の三次元座標 (x, y, z) [km]、形状は (len(dates), 3)
+    """
+    n = Orbit.datetime64ToJulianDay(dates) - 2451545.0     # J2000.0からの経過日数 [day]
+    L = 280.460 + 0.9856474 * n                 # 平均黄経 [deg]
+    g = numpy.radians(357.528 + 0.9856003 * n)  # 平均近点角 [rad]
+    lam = numpy.radians(L + 1.915 * numpy.sin(g) + 0.020 * numpy.sin(2 * g))   # 黄経 [rad]
+    eps = numpy.radians(23.439 - 0.0000004 * n) # 黄道傾斜角 [rad]
+    R = (1.00014 - 0.01671 * numpy.cos(g) - 0.00014 * numpy.cos(2 * g)) * AU    # 距離 [km]
+
+    xyz = numpy.empty(numpy.shape(n) + (3,))
+    xyz[..., 0] = R * numpy.cos(lam)
+    xyz[..., 1] = R * numpy.cos(eps) * numpy.sin(lam)
+    xyz[..., 2] = R * numpy.sin(eps) * numpy.sin(lam)
+    return xyz
+
+
+def shadow_array(satXYZ: numpy.ndarray, sunXYZ: numpy.ndarray, model: str = 'conical') -> tuple:
+    """衛星の照射状態（日照・半影・本影）を求める（配列版）。
+
+    円錐モデルでは、衛星から見た太陽と地球の視半径と離角から、太陽面が地球に隠される割合を求める。
+    円筒モデルでは、太陽と反対側にある地球の半径の円筒の中を本影とみなし、半影は扱わない。
+    References:
+        Montenbruck, O. and Gill, E., Satellite Orbits, Springer, 2000, 3.4.2 Shadow Function
+    Args:
+        satXYZ  (ndarray)   :   衛星の三次元座標 [km]、形状は (..., 点数, 3)
+        sunXYZ  (ndarray)   :   太陽の三次元座標 [km]、形状は (点数, 3)
+        model   (str)       :   'conical'（円錐）または 'cylindrical'（円筒）
+    Returns:
+        state       (ndarray)   :   照射状態（SUNLIT、PENUMBRA、UMBRA）
+        fraction    (ndarray)   :   太陽光の照射割合（0：本影 ～ 1：日照）
+        margin      (ndarray)   :   影の境界までの角距離 [rad]（正：日照側、負：影の中）。入出時刻の補間に使う
+    """
+    satXYZ = numpy.asarray(satXYZ, dtype=numpy.float64)
+    sunXYZ = numpy.asarray(sunXYZ, dtype=numpy.float64)
+    r = numpy.linalg.norm(satXYZ, axis=-1)
+
+    if model == 'cylindrical':
+        sunUnit = sunXYZ / numpy.linalg.norm(sunXYZ, axis=-1, keepdims=True)
+        along = numpy.sum(satXYZ * sunUnit, axis=-1)
+        perpendicular = numpy.sqrt(numpy.maximum(r ** 2 - along ** 2, 0))
+        # 太陽と反対側では、円筒の外側までの角距離（地心から見た角度）を境界までの距離とする
+        margin = numpy.where(along < 0, numpy.arcsin(numpy.minimum(perpendicular / r, 1)) - numpy.arcsin(numpy.minimum(EARTH_RADIUS / r, 1)), math.pi)
+        umbra = margin < 0
+        state = numpy.where(umbra, UMBRA, SUNLIT)
+        fraction = numpy.where(umbra, 0.0, 1.0)
+        return (state, fraction, margin)
+    if model != 'conical':
+        raise ValueError('model must be conical or cylindrical')
+
+    toSun = sunXYZ - satXYZ
+    d = numpy.linalg.norm(toSun, axis=-1)
+    a = numpy.arcsin(numpy.minimum(SUN_RADIUS / d, 1))     # 太陽の視半径
+    b = numpy.arcsin(numpy.minimum(EARTH_RADIUS / r, 1))   # 地球の視半径
+    c = numpy.arccos(numpy.clip(-numpy.sum(satXYZ * toSun, axis=-1) / (r * d), -1, 1))  # 太陽と地球の中心の離角
+
+    umbra = c < b - a
+    penumbra = ~umbra & (c < a + b)
+    state = numpy.where(umbra, UMBRA, numpy.where(penumbra, PENUMBRA, SUNLIT))
+
+    # 半影では、太陽面のうち地球に隠される部分の面積から照射割合を求める
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        x = (c ** 2 + a ** 2 - b ** 2) / (2 * c)
+        y = numpy.sqrt(numpy.maximum(a ** 2 - x ** 2, 0))
+        area = a ** 2 * numpy.arccos(numpy.clip(x / a, -1, 1)) + b ** 2 * numpy.arccos(numpy.clip((c - x) / b, -1, 1)) - c * y
+    fraction = numpy.where(umbra, 0.0, numpy.where(penumbra, 1 - area / (math.pi * a ** 2), 1.0))
+    return (state, fraction, c - (a + b))
+
+
+def eclipseEvents(dates: numpy.ndarray, margin: numpy.ndarray) -> list:
+    """影への進入・影からの離脱の時刻を求める。
+
+    shadow_array()の境界までの角距離の符号が変わる区間について、角距離を線形補間して時刻を求める。
+    期間の始めや終わりに影の中にいる場合は、その端の日時を進入・離脱の時刻とする。
+    Args:
+        dates   (ndarray)   :   日時（UTC、datetime64）、形状は (点数,)
+        margin  (ndarray)   :   shadow_array()の境界までの角距離、形状は (点数,) または (衛星数, 点数)
+    Returns:
+        (list)  :   衛星ごとの (進入時刻の配列, 離脱時刻の配列) のリスト（datetime64[ns]）。
+                    marginが1次元の場合は、1つの (進入時刻の配列, 離脱時刻の配列) を返す
+    """
+    dates = numpy.asarray(dates, dtype='datetime64[ns]')
+    margin = numpy.asarray(margin, dtype=numpy.float64)
+    single = margin.ndim == 1
+    margin = numpy.atleast_2d(margin)
+    if len(dates) == 0:
+        # 日時が無ければ進入・離脱も無い（衛星が無ければ空のリスト）
+        events = [(numpy.array([], dtype='datetime64[ns]'), numpy.array([], dtype='datetime64[ns]')) for _ in margin]
+        return events[0] if single else events
+    t = (dates - dates[0]).astype(numpy.int64).astype(numpy.float64)
+
+    events = []
+    for m in margin:
+        inside = m < 0
+        change = numpy.flatnonzero(inside[1:] != inside[:-1])
+        ratio = m[change] / (m[change] - m[change + 1])
+        times = dates[0] + (t[change] + (t[change + 1] - t[change]) * ratio).astype('timedelta64[ns]')
+        entering = inside[change + 1]
+        entry = times[entering]
+        leave = times[~entering]
+        if len(inside) > 0 and inside[0]:
+            entry = numpy.concatenate((dates[:1], entry))
+        if len(inside) > 0 and inside[-1]:
+            leave = numpy.concatenate((leave, dates[-1:]))
+        events.append((entry, leave))
+    return events[0] if single else events
+
+
+def tleEclipse(tles: list, dates: numpy.ndarray, model: str = 'conical', backend: str = 'meanMotion') -> tuple:
+    """複数の衛星について、各日時の照射状態と影への進入・離脱の時刻を求める。
+
+    Args:
+        tles    (list)      :   TwoLineElementsのリスト
+        dates   (ndarray)   :   日時（UTC、datetime64）、形状は (点数,)
+        model   (str)       :   shadow_array()と同じ
+        backend (str)       :   伝搬計算のバックエンド（Orbit.createPropagator()と同じ）
+    Returns:
+        state       (ndarray)   :   照射状態、形状は (衛星数, 点数)
+        fraction    (ndarray)   :   太陽光の照射割合、形状は (衛星数, 点数)
+        events      (list)      :   eclipseEvents()と同じ（衛星ごと）
+    """
+    dates = numpy.asarray(dates, dtype='datetime64[ns]')
+    sunXYZ = sunPosition_array(dates)
+    satXYZ = Orbit.createPropagator(tles, backend).xyz(dates)
+    state, fraction, margin = shadow_array(satXYZ, sunXYZ, model)
+    return (state, fraction, eclipseEvents(dates, margin))
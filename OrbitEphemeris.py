@@ -0,0 +1,195 @@
+import logging
+import datetime
+import numpy
+
+import Orbit
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# クラス定義
+###################################################################################################
+
+class InterpolatedEphemeris:
+    """衛星の三次元座標を区分チェビシェフ多項式で近似した暦（エフェメリス）。
+
+    作成時に、期間を区間に分けて各区間のチェビシェフ節点で衛星の位置をバックエンド（Orbit.createPropagator()）で求め、
+    多項式の係数を求める。区間内の検証点で近似誤差が許容誤差を超える区間は二分して作り直すので、
+    検証点において誤差は許容誤差以下になる。
+    以降の任意の日時の問い合わせには、多項式の評価だけで答えるので、SGP4など1点あたりの計算が重いバックエンドほど効果が大きい。
+    """
+
+    def __init__(
+        self,
+        tle         : Orbit.TwoLineElements,
+        beginDate   : datetime.datetime,
+        endDate     : datetime.datetime,
+        tolerance   : float = 0.001,
+        degree      : int = 8,
+        minSegment  : float = 10.0,
+        backend     : str = 'meanMotion'
+        ):
+        """暦を作成する。
+
+        Args:
+            tle         (TwoLineElements)   :   TLE
+            beginDate   (datetime)          :   開始日時（UTC）
+            endDate     (datetime)          :   終了日時（UTC）
+            tolerance   (float)             :   位置の許容誤差 [km]
+            degree      (int)               :   多項式の次数
+            minSegment  (float)             :   区間の長さの下限 [sec]。これより短い区間は誤差にかかわらず二分しない
+            backend     (str)               :   近似する伝搬計算のバックエンド（Orbit.createPropagator()と同じ）
+        """
+        self.__tle = tle
+        self.__propagator = Orbit.createPropagator([tle], backend)
+        self.__begin = Orbit.asDays(beginDate)  # 基準日時からの経過日数 [day]
+        self.__end = Orbit.asDays(endDate)
+        self.__tolerance = tolerance
+        self.__degree = degree
+        period = (self.__end - self.__begin) * 86400.0     # [sec]
+        if period <= 0:
+            raise ValueError('endDate must be later than beginDate')
+
+        # 初期の区間長は周期の1/4とする
+        orbitalPeriod = 86400.0 / tle.meanMotion_float    # [sec]
+        edges = numpy.linspace(0, period, int(numpy.ceil(period / (orbitalPeriod / 4))) + 1)
+        t0, t1 = edges[:-1], edges[1:]
+
+        # チェビシェフ節点と検証点（正規化時刻 [-1, 1]）
+        self.__nodes = numpy.cos(numpy.pi * (numpy.arange(degree + 1) + 0.5) / (degree + 1))
+        checks = numpy.linspace(-1, 1, 2 * degree + 3)
+
+        segments, coefficients, errors = [], [], []
+        while len(t0) > 0:
+            coef = self.__fit(t0, t1)
+            approx = self.__evaluate(coef, numpy.broadcast_to(checks, (len(t0), len(checks))))
+            exact = self.__propagate(self.__denormalize(t0, t1, checks))
+            error = numpy.linalg.norm(approx - exact, axis=-1).max(axis=1)
+            split = (error > tolerance) & ((t1 - t0) / 2 >= minSegment)
+            segments.append(numpy.column_stack((t0[~split], t1[~split])))
+            coefficients.append(coef[~split])
+            errors.append(error[~split])
+            tm = (t0[split] + t1[split]) / 2
+            t0, t1 = numpy.concatenate((t0[split], tm)), numpy.concatenate((tm, t1[split]))
+
+        segments = numpy.concatenate(segments)
+        order = numpy.argsort(segments[:, 0])
+        self.__segments = segments[order]
+        self.__coefficientsByDegree = numpy.ascontiguousarray(numpy.concatenate(coefficients)[order].transpose(1, 0, 2))
+        self.__maxError = float(numpy.concatenate(errors).max())
+        logger.debug('InterpolatedEphemeris: segments = {}, maxError = {} [km]'.format(len(self.__segments), self.__maxError))
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def tle(self) -> Orbit.TwoLineElements:
+        return self.__tle
+    @property
+    def propagator(self) -> Orbit.Propagator:
+        return self.__propagator
+    @property
+    def beginDate(self) -> numpy.datetime64:
+        return Orbit.daysToDatetime64(self.__begin)
+    @property
+    def endDate(self) -> numpy.datetime64:
+        return Orbit.daysToDatetime64(self.__end)
+    @property
+    def segmentNum(self) -> int:
+        return len(self.__segments)
+    @property
+    def maxError(self) -> float:
+        """検証点における近似誤差の最大値 [km]"""
+        return self.__maxError
+
+
+    ###############################################################################################
+    # メソッド
+    ###############################################################################################
+
+    def __denormalize(self, t0: numpy.ndarray, t1: numpy.ndarray, tau: numpy.ndarray) -> numpy.ndarray:
+        """区間ごとの正規化時刻 [-1, 1] を開始日時からの経過秒に戻す。形状は (区間数, 点数)。"""
+        return ((t0 + t1) / 2)[:, numpy.newaxis] + ((t1 - t0) / 2)[:, numpy.newaxis] * tau[numpy.newaxis, :]
+
+
+    def __propagate(self, sec: numpy.ndarray) -> numpy.ndarray:
+        """開始日時からの経過秒における衛星の三次元座標を求める。"""
+        return self.__propagator.xyz(self.__begin + sec / 86400.0)[0]
+
+
+    def __fit(self, t0: numpy.ndarray, t1: numpy.ndarray) -> numpy.ndarray:
+        """区間ごとにチェビシェフ節点での位置から係数を求める。形状は (区間数, 次数 + 1, 3)。"""
+        values = self.__propagate(self.__denormalize(t0, t1, self.__nodes))
+        vander = numpy.polynomial.chebyshev.chebvander(self.__nodes, self.__degree)
+        return numpy.einsum('kn,snc->skc', numpy.linalg.inv(vander), values)
+
+
+    def __evaluate(self, coef: numpy.ndarray, tau: numpy.ndarray) -> numpy.ndarray:
+        """クレンショーの漸化式でチェビシェフ多項式を評価する。
+
+        Args:
+            coef    (ndarray)   :   係数、形状は (区間数, 次数 + 1, 3)
+            tau     (ndarray)   :   正規化時刻、形状は (区間数, 点数)
+        Returns:
+            (ndarray)   :   位置、形状は (区間数, 点数, 3)
+        """
+        x = tau[..., numpy.newaxis]
+        b1 = numpy.zeros(tau.shape + (3,))
+        b2 = numpy.zeros(tau.shape + (3,))
+        for k in range(self.__degree, 0, -1):
+            b1, b2 = 2 * x * b1 - b2 + coef[:, numpy.newaxis, k, :], b1
+        return x * b1 - b2 + coef[:, numpy.newaxis, 0, :]
+
+
+    def xyz(self, dates: numpy.ndarray) -> numpy.ndarray:
+        """各日時における地球中心の衛星の三次元座標（赤道座標系）を多項式の評価で求める。
+
+        Args:
+            dates   (ndarray)   :   日時（UTC、datetime64）または基準日時からの経過日数 [day]。暦の期間内であること
+        Returns:
+            (ndarray)   :   衛星の三次元座標 (x, y, z) [km]、形状は (len(dates), 3)
+        """
+        days = numpy.asarray(Orbit.asDays(dates))
+        if numpy.any(days < self.__begin) or numpy.any(days > self.__end):
+            raise ValueError('dates are out of the ephemeris range')
+        sec = (days.reshape(-1) - self.__begin) * 86400.0
+        index = numpy.clip(numpy.searchsorted(self.__segments[:, 0], sec, side='right') - 1, 0, len(self.__segments) - 1)
+        t0 = self.__segments[index, 0]
+        t1 = self.__segments[index, 1]
+        x = ((2 * sec - (t0 + t1)) / (t1 - t0))[:, numpy.newaxis]
+
+        # クレンショーの漸化式（係数は次数ごとに必要な区間の分だけ取り出し、作業配列は使い回す）
+        x2 = 2 * x
+        b0 = numpy.empty((len(sec), 3))
+        b1 = numpy.zeros((len(sec), 3))
+        b2 = numpy.zeros((len(sec), 3))
+        for k in range(self.__degree, 0, -1):
+            numpy.multiply(x2, b1, out=b0)
+            b0 -= b2
+            b0 += self.__coefficientsByDegree[k].take(index, axis=0)
+            b0, b1, b2 = b2, b0, b1
+        numpy.multiply(x, b1, out=b0)
+        b0 -= b2
+        b0 += self.__coefficientsByDegree[0].take(index, axis=0)
+        return b0.reshape(days.shape + (3,))
+
+
+    def latLon(self, dates: numpy.ndarray) -> tuple:
+        """各日時における衛星位置の経緯度を多項式の評価で求める。
+
+        Args:
+            dates   (ndarray)   :   日時（UTC、datetime64）または基準日時からの経過日数 [day]。暦の期間内であること
+        Returns:
+            phi     (ndarray)   :   緯度 [deg]
+            lam     (ndarray)   :   経度 [deg]
+        """
+        days = Orbit.asDays(dates)
+        return Orbit.xyzToLatLon_array(self.xyz(days), days)
@@ -0,0 +1,196 @@
+import logging
+import json
+import numpy
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 関数定義（共通）
+###################################################################################################
+
+def __toTrackArrays(dates: numpy.ndarray, lat: numpy.ndarray, lon: numpy.ndarray, satelliteNumbers) -> tuple:
+    """地上軌跡の配列を (衛星数, 点数) の形状にそろえる。
+    """
+    dates = numpy.asarray(dates, dtype='datetime64[ns]')
+    lat = numpy.asarray(lat)
+    lon = numpy.asarray(lon)
+    if lat.shape != lon.shape:
+        raise ValueError('lat and lon must have the same shape')
+    if lat.ndim == 1:
+        lat = lat[numpy.newaxis, :]
+        lon = lon[numpy.newaxis, :]
+    if dates.ndim != 1 or lat.ndim != 2 or lat.shape[1] != len(dates):
+        raise ValueError('dates must be 1-D and match the last axis of lat and lon')
+    if satelliteNumbers is None:
+        satelliteNumbers = numpy.arange(lat.shape[0])
+    satelliteNumbers = numpy.asarray(satelliteNumbers, dtype=numpy.int32).reshape(-1)
+    if len(satelliteNumbers) != lat.shape[0]:
+        raise ValueError('satelliteNumbers must have one entry per track')
+    return (dates, lat, lon, satelliteNumbers)
+
+
+def splitAtAntimeridian(lat: numpy.ndarray, lon: numpy.ndarray) -> list:
+    """地上軌跡を日付変更線（経度±180度）で分割する。
+
+    隣り合う点の経度差が180度を超える区間を日付変更線の横断とみなし、
+    横断位置の緯度を線形補間して、分割した両側の線の端点に経度±180度の点を加える。
+    Args:
+        lat     (ndarray)   :   緯度 [deg]
+        lon     (ndarray)   :   経度 [deg]
+    Returns:
+        (list)  :   分割した線ごとの座標配列のリスト。各配列の形状は (点数, 2) で、列は (経度, 緯度)
+    """
+    lat = numpy.asarray(lat, dtype=numpy.float64)
+    lon = numpy.asarray(lon, dtype=numpy.float64)
+    dlon = numpy.diff(lon)
+    idx = numpy.flatnonzero(numpy.abs(dlon) > 180)
+    if len(idx) == 0:
+        return [numpy.column_stack((lon, lat))]
+
+    # 横断位置の緯度（経度差を補正して線形補間）
+    edge = numpy.where(dlon[idx] < 0, 180.0, -180.0)     # 横断前の線の端の経度
+    unwrapped = lon[idx + 1] + 2 * edge
+    ratio = (edge - lon[idx]) / (unwrapped - lon[idx])
+    latCross = lat[idx] + (lat[idx + 1] - lat[idx]) * ratio
+
+    segments = []
+    for k, piece in enumerate(numpy.split(numpy.column_stack((lon, lat)), idx + 1)):
+        parts = [piece]
+        if k > 0:
+            parts.insert(0, [(-edge[k - 1], latCross[k - 1])])
+        if k < len(idx):
+            parts.append([(edge[k], latCross[k])])
+        segments.append(numpy.vstack(parts))
+    return segments
+
+
+def __splitAtGaps(lat: numpy.ndarray, lon: numpy.ndarray) -> list:
+    """地上軌跡を、緯度・経度がNaNの点（求まらなかった点）で分割する。
+
+    Args:
+        lat     (ndarray)   :   緯度 [deg]
+        lon     (ndarray)   :   経度 [deg]
+    Returns:
+        (list)  :   NaNを含まない連続した区間ごとの (緯度, 経度) のリスト。線にならない1点だけの区間は除く
+    """
+    valid = numpy.isfinite(lat) & numpy.isfinite(lon)
+    edges = numpy.flatnonzero(numpy.diff(numpy.concatenate(([False], valid, [False])).astype(numpy.int8)))
+    return [(lat[begin:end], lon[begin:end]) for begin, end in zip(edges[0::2], edges[1::2]) if end - begin >= 2]
+
+
+###################################################################################################
+# 関数定義（出力）
+###################################################################################################
+
+def writeNPZ(filepath: str, dates: numpy.ndarray, lat: numpy.ndarray, lon: numpy.ndarray, satelliteNumbers=None) -> None:
+    """地上軌跡を圧縮したNPZファイルに出力する。
+
+    Args:
+        filepath            (str)       :   出力先のファイルパス
+        dates               (ndarray)   :   日時（UTC、datetime64）、形状は (点数,)
+        lat                 (ndarray)   :   緯度 [deg]、形状は (点数,) または (衛星数, 点数)
+        lon                 (ndarray)   :   経度 [deg]、形状はlatと同じ
+        satelliteNumbers    (ndarray)   :   衛星番号、形状は (衛星数,)。省略時は0からの連番
+    """
+    dates, lat, lon, satelliteNumbers = __toTrackArrays(dates, lat, lon, satelliteNumbers)
+    numpy.savez_compressed(filepath, dates=dates.astype(numpy.int64), lat=lat, lon=lon, satelliteNumbers=satelliteNumbers)
+
+
+def readNPZ(filepath: str) -> tuple:
+    """writeNPZ()で出力したNPZファイルを読み込む。
+
+    Args:
+        filepath            (str)       :   NPZファイルのパス
+    Returns:
+        dates               (ndarray)   :   日時（UTC、datetime64[ns]）、形状は (点数,)
+        lat                 (ndarray)   :   緯度 [deg]、形状は (衛星数, 点数)
+        lon                 (ndarray)   :   経度 [deg]、形状は (衛星数, 点数)
+        satelliteNumbers    (ndarray)   :   衛星番号、形状は (衛星数,)
+    """
+    with numpy.load(filepath) as npz:
+        return (npz['dates'].astype('datetime64[ns]'), npz['lat'], npz['lon'], npz['satelliteNumbers'])
+
+
+def writeParquet(filepath: str, dates: numpy.ndarray, lat: numpy.ndarray, lon: numpy.ndarray, satelliteNumbers=None) -> None:
+    """地上軌跡をParquetファイルに出力する。
+
+    列は satelliteNumber (int32)、time (timestamp[ns, UTC])、lat、lon の縦持ちの表とする。
+    pyarrowが必要。
+    Args:
+        filepath～satelliteNumbers      :   writeNPZ()と同じ
+    """
+    import pyarrow
+    import pyarrow.parquet
+
+    dates, lat, lon, satelliteNumbers = __toTrackArrays(dates, lat, lon, satelliteNumbers)
+    nSat, nPoint = lat.shape
+    table = pyarrow.table({
+        'satelliteNumber'   :   numpy.repeat(satelliteNumbers, nPoint),
+        'time'              :   pyarrow.array(numpy.tile(dates.astype(numpy.int64), nSat), type=pyarrow.timestamp('ns', tz='UTC')),
+        'lat'               :   lat.reshape(-1),
+        'lon'               :   lon.reshape(-1),
+        })
+    pyarrow.parquet.write_table(table, filepath)
+
+
+def readParquet(filepath: str) -> tuple:
+    """writeParquet()で出力したParquetファイルを読み込む。
+
+    すべての衛星が同じ日時の列を持つことを前提に、readNPZ()と同じ形状の配列に戻す。
+    pyarrowが必要。
+    Args:
+        filepath        (str)   :   Parquetファイルのパス
+    Returns:
+        readNPZ()と同じ
+    """
+    import pyarrow.parquet
+
+    table = pyarrow.parquet.read_table(filepath)
+    satelliteNumber = table.column('satelliteNumber').to_numpy()
+    _, first, counts = numpy.unique(satelliteNumber, return_index=True, return_counts=True)
+    satelliteNumbers = satelliteNumber[numpy.sort(first)]
+    nSat = len(satelliteNumbers)
+    nPoint = len(satelliteNumber) // nSat if nSat > 0 else 0
+    if numpy.any(counts != nPoint):
+        raise ValueError('all satellites must have the same number of points')
+    time = table.column('time').cast('int64').to_numpy().reshape(nSat, nPoint)
+    return (time[0].astype('datetime64[ns]') if nSat > 0 else numpy.array([], dtype='datetime64[ns]'),
+            table.column('lat').to_numpy().reshape(nSat, nPoint),
+            table.column('lon').to_numpy().reshape(nSat, nPoint),
+            satelliteNumbers)
+
+
+def writeGeoJSON(filepath: str, dates: numpy.ndarray, lat: numpy.ndarray, lon: numpy.ndarray, satelliteNumbers=None) -> None:
+    """地上軌跡をGeoJSONファイルに出力する。
+
+    衛星ごとに1つのFeatureとし、日付変更線で分割したMultiLineStringとして出力する。
+    緯度・経度がNaNの点はJSONで表せないので、その前後で線を分割して除く。
+    プロパティには衛星番号と開始・終了日時（ISO 8601、UTC）を持たせる。
+    Args:
+        filepath～satelliteNumbers      :   writeNPZ()と同じ
+    """
+    dates, lat, lon, satelliteNumbers = __toTrackArrays(dates, lat, lon, satelliteNumbers)
+    begin, end = (numpy.datetime_as_string(dates[[0, -1]], unit='s', timezone='UTC') if len(dates) > 0 else (None, None))
+    features = []
+    for k in range(len(satelliteNumbers)):
+        features.append({
+            'type'      :   'Feature',
+            'geometry'  :   {
+                'type'          :   'MultiLineString',
+                'coordinates'   :   [segment.tolist() for runLat, runLon in __splitAtGaps(lat[k], lon[k])
+                                        for segment in splitAtAntimeridian(runLat, runLon)],
+                },
+            'properties':   {
+                'satelliteNumber'   :   int(satelliteNumbers[k]),
+                'begin'             :   None if begin is None else str(begin),
+                'end'               :   None if end is None else str(end),
+                },
+            })
+    with open(filepath, mode='w') as file:
+        json.dump({'type': 'FeatureCollection', 'features': features}, file, allow_nan=False)
@@ -0,0 +1,249 @@
+import logging
+import math
+import datetime
+import threading
+import importlib.util
+
+import Orbit
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+# Numbaがインストールされていれば、以下のカーネルを機械語にコンパイルして使う。
+# インストールされていなければ、同じコードをmathモジュールだけを使うPythonの関数として使う
+# （numpy.matrixを使うOrbit.orbitalElementToLatLon()よりも、1点の計算ではこちらの方が速い）。
+# Numbaの読み込みには時間がかかるので、モジュールの読み込み時ではなく最初の計算時に読み込んでコンパイルする。
+JIT_ENABLED = importlib.util.find_spec('numba') is not None
+
+EARTH_RADIUS = 6378.137         # 地球の半径r [km] 「GCS WGS 1984」の赤道半径
+GM = 2.975537 * (10 ** 15)      # [km^3 / day^2]
+EPSILON = 1.0e-10               # ニュートン・ラフソン法の収束判定の閾値 [deg]
+MAX_ITERATIONS = 50             # ニュートン・ラフソン法の反復の上限
+REFERENCE_JD = Orbit.REFERENCE_JD
+
+__KERNELS = []                  # コンパイルするカーネルの名前（呼び出される側から順に）
+__KERNELS_LOCK = threading.Lock()
+
+
+###################################################################################################
+# 関数定義（コンパイル）
+###################################################################################################
+
+def jit(function):
+    """カーネルとして登録する（コンパイルはcompileKernels()で行う）。"""
+    __KERNELS.append(function.__name__)
+    return function
+
+
+def compileKernels():
+    """Numbaを読み込み、登録したカーネルをコンパイルしたものに置き換える（2回目以降は何もしない）。
+
+    カーネルから呼び出す別のカーネルは、呼び出し側のコンパイル時にモジュールの変数から解決されるので、
+    全てのカーネルをまとめて置き換える。複数のスレッドから同時に呼ばれても1回だけ置き換える。
+    Numbaがインストールされていなければ何もしない。
+    """
+    if not JIT_ENABLED:
+        return
+    with __KERNELS_LOCK:
+        if not __KERNELS:
+            return
+        import numba
+        namespace = globals()
+        for name in __KERNELS:
+            namespace[name] = numba.njit(cache=True, fastmath=False)(namespace[name])
+        logger.debug('compileKernels: {}'.format(', '.join(__KERNELS)))
+        __KERNELS.clear()
+
+
+###################################################################################################
+# 関数定義（カーネル）
+###################################################################################################
+
+@jit
+def solveKepler_kernel(orb_M: float, orb_e: float) -> float:
+    """ケプラー方程式をニュートン・ラフソン法で解く（Orbit.solveKepler_array()と同じ反復）。
+
+    Args:
+        orb_M   (float) :   平均近点角M [deg]
+        orb_e   (float) :   離心率e
+    Returns:
+        (float) :   離心近点角E [deg]。MAX_ITERATIONS回で収束しなければNaN
+    """
+    M = math.radians(orb_M)
+    e = math.radians(orb_e)     # 度で書いた式 E - e sinE = M をラジアンに直した係数 (π/180) e
+    tolerance = math.radians(EPSILON)
+    E = M
+    for _ in range(MAX_ITERATIONS + 1):
+        fx = E - e * math.sin(E) - M
+        if abs(fx) <= tolerance:
+            return math.degrees(E)
+        E -= fx / (1 - e * math.cos(E))
+    return math.nan
+
+
+@jit
+def siderealTime_kernel(days: float) -> float:
+    """グリニッジ恒星時を求める（Orbit.siderealTime()と同じ計算）。
+
+    Args:
+        days    (float) :   基準日時からの経過日数 [day]
+    Returns:
+        (float) :   グリニッジ恒星時 [deg]
+    """
+    day0 = math.floor(days)
+    T0 = (REFERENCE_JD + day0 - 2451545) / 36525.0
+    theta_G0 = 100.4606184 + 36000.77004 * T0 + 0.000387933 * (T0 ** 2) - (2.58310 ** (-8)) * (T0 ** 3)
+    theta_G0 -= 360.0 * int(theta_G0 / 360.0)
+    if theta_G0 < 0:
+        theta_G0 += 360
+    UT = (days - day0) * 24.0
+    theta_G = theta_G0 + 360.98564724 * UT / 24.0
+    theta_G -= 360.0 * int(theta_G / 360.0)
+    if theta_G < 0:
+        theta_G += 360
+    return theta_G
+
+
+@jit
+def orbitalElementToXYZ_kernel(
+    orb_ET      : float,
+    orb_omega0  : float,
+    orb_i       : float,
+    orb_OMEGA0  : float,
+    orb_e       : float,
+    orb_M0      : float,
+    orb_M1      : float,
+    orb_M2      : float,
+    days        : float
+    ) -> tuple:
+    """軌道要素から地球中心の衛星の三次元座標（赤道座標系）を求める（Orbit.orbitalElementToLatLon()の前半と同じ計算）。
+
+    Args:
+        orb_ET      (float) :   元期 [day]（基準日時からの経過日数）
+        orb_omega0～orb_M2  :   Orbit.orbitalElementToLatLon()と同じ
+        days        (float) :   基準日時からの経過日数 [day]
+    Returns:
+        (x, y, z)   (tuple) :   衛星の三次元座標 [km]
+    """
+    # 軌道長半径a
+    delta_t = days - orb_ET
+    orb_Mm = orb_M1 + orb_M2 * delta_t
+    orb_a = (GM / (4.0 * (math.pi ** 2) * (orb_Mm ** 2))) ** (1.0 / 3.0)
+
+    # 離心近点角E
+    tmp_M = (orb_M0 / 360) + (orb_M1 * delta_t) + (0.5 * orb_M2 * (delta_t ** 2))
+    orb_M = (tmp_M - int(tmp_M)) * 360
+    orb_E = solveKepler_kernel(orb_M, orb_e)
+
+    # 軌道面上の座標(U, V)と近地点引数・昇交点赤経
+    orb_U = orb_a * math.cos(math.radians(orb_E)) - orb_a * orb_e
+    orb_V = orb_a * math.sqrt(1 - orb_e ** 2) * math.sin(math.radians(orb_E))
+    perturbation = 180 * 0.174 / (math.pi * ((orb_a / EARTH_RADIUS) ** 3.5)) * delta_t
+    orb_omega = orb_omega0 + (2 - 2.5 * (math.sin(math.radians(orb_i)) ** 2)) * perturbation
+    orb_OMEGA = orb_OMEGA0 - math.cos(math.radians(orb_i)) * perturbation
+
+    # 回転行列 mat1 * mat2 * mat3 を展開して適用する
+    cos_omega = math.cos(math.radians(orb_omega))
+    sin_omega = math.sin(math.radians(orb_omega))
+    cos_OMEGA = math.cos(math.radians(orb_OMEGA))
+    sin_OMEGA = math.sin(math.radians(orb_OMEGA))
+    cos_i = math.cos(math.radians(orb_i))
+    sin_i = math.sin(math.radians(orb_i))
+    p = orb_U * cos_omega - orb_V * sin_omega
+    q = orb_U * sin_omega + orb_V * cos_omega
+    return (p * cos_OMEGA - q * cos_i * sin_OMEGA, p * sin_OMEGA + q * cos_i * cos_OMEGA, q * sin_i)
+
+
+@jit
+def orbitalElementToLatLon_kernel(
+    orb_ET      : float,
+    orb_omega0  : float,
+    orb_i       : float,
+    orb_OMEGA0  : float,
+    orb_e       : float,
+    orb_M0      : float,
+    orb_M1      : float,
+    orb_M2      : float,
+    days        : float
+    ) -> tuple:
+    """軌道要素から衛星位置の経緯度を求める（Orbit.orbitalElementToLatLon()と同じ計算）。
+
+    Args:
+        orbitalElementToXYZ_kernel()と同じ
+    Returns:
+        phi     (float) :   緯度（地心緯度） [deg]
+        lam     (float) :   経度 [deg]
+    """
+    x, y, z = orbitalElementToXYZ_kernel(orb_ET, orb_omega0, orb_i, orb_OMEGA0, orb_e, orb_M0, orb_M1, orb_M2, days)
+
+    # グリニッジ恒星時で地球に固定した座標系へ回転する（mat5）
+    theta_G = math.radians(siderealTime_kernel(days))
+    cos_G = math.cos(theta_G)
+    sin_G = math.sin(theta_G)
+    X = x * cos_G + y * sin_G
+    Y = -x * sin_G + y * cos_G
+    phi = math.degrees(math.asin(z / math.sqrt(X ** 2 + Y ** 2 + z ** 2)))
+    lam = math.degrees(math.atan2(Y, X))
+    return (phi, lam)
+
+
+###################################################################################################
+# 関数定義
+###################################################################################################
+
+def orbitalElementToLatLon_jit(
+    orb_ET      : datetime.datetime,
+    orb_omega0  : float,
+    orb_i       : float,
+    orb_OMEGA0  : float,
+    orb_e       : float,
+    orb_M0      : float,
+    orb_M1      : float,
+    orb_M2      : float,
+    date        : datetime.datetime
+    ) -> tuple:
+    """軌道要素から、ある日時における衛星位置の経緯度を求める（1点の計算を速くしたもの）。
+
+    Orbit.orbitalElementToLatLon()と同じ計算をカーネルで行う。日時の変換だけをここで行う。
+    Args:
+        Orbit.orbitalElementToLatLon()と同じ
+    Returns:
+        phi         (float)     :   緯度 [deg]
+        lam         (float)     :   経度 [deg]
+    """
+    compileKernels()
+    return orbitalElementToLatLon_kernel(
+        float(Orbit.asDays(orb_ET)), float(orb_omega0), float(orb_i), float(orb_OMEGA0),
+        float(orb_e), float(orb_M0), float(orb_M1), float(orb_M2), float(Orbit.asDays(date)))
+
+
+def tleToLatLon_jit(tle: Orbit.TwoLineElements, date: datetime.datetime) -> tuple:
+    """TLEから、ある日時における衛星位置の経緯度を求める（1点の計算を速くしたもの）。
+
+    Args:
+        tle     (TwoLineElements)   :   TLE
+        date    (datetime)          :   この日時の衛星の経緯度を求める（UTC）。基準日時からの経過日数 [day] も可
+    Returns:
+        phi     (float)             :   緯度 [deg]
+        lam     (float)             :   経度 [deg]
+    """
+    compileKernels()
+    return orbitalElementToLatLon_kernel(
+        Orbit.datetimeToDays(tle.epoch_datetime),
+        tle.argumentOfPerigee_float,
+        tle.inclination_float,
+        tle.raan_float,
+        tle.eccentricity_float,
+        tle.meanAnomaly_float,
+        tle.meanMotion_float,
+        tle.firstDerivativeMeanMotion_float,
+        float(Orbit.asDays(date)))
@@ -0,0 +1,860 @@
+import logging
+import math
+import numpy
+
+import Orbit
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+# 重力定数（WGS72）
+MU = 398600.8                   # 地心重力定数 [km^3 / s^2]
+EARTH_RADIUS = 6378.135         # 地球の赤道半径 [km]
+XKE = 60.0 / math.sqrt(EARTH_RADIUS ** 3 / MU)  # [1 / min]（地球半径を距離の単位とする）
+J2 = 0.001082616
+J3 = -0.00000253881
+J4 = -0.00000165597
+J3OJ2 = J3 / J2
+
+# 1950年1月0日0時（SGP4の元期の基準）から基準日時までの日数 [day]
+DAYS_1950 = Orbit.REFERENCE_JD - 2433281.5
+
+# エラーコード（Spacetrack Report #3 の実装と同じ）
+ERROR_NONE = 0                      # 正常
+ERROR_MEAN_ECCENTRICITY = 1         # 平均離心率が範囲外
+ERROR_MEAN_MOTION = 2               # 平均運動が負
+ERROR_PERTURBED_ECCENTRICITY = 3    # 摂動を加えた離心率が範囲外
+ERROR_SEMILATUS_RECTUM = 4          # 半直弦が負
+ERROR_DECAYED = 6                   # 地表より下（落下済み）
+
+TWOPI = 2.0 * math.pi
+X2O3 = 2.0 / 3.0
+
+# 伝搬計算に使う定数の名前（衛星ごとの値を配列にまとめる）
+CONSTANT_NAMES = (
+    'epochDays', 'bstar', 'ndot', 'nddot', 'ecco', 'argpo', 'inclo', 'mo', 'nodeo', 'no', 'gsto',
+    'isimp', 'deepSpace', 'con41', 'x1mth2', 'x7thm1', 'eta', 'cc1', 'cc4', 'cc5', 'd2', 'd3', 'd4',
+    'mdot', 'argpdot', 'nodedot', 'omgcof', 'xmcof', 'nodecf', 't2cof', 't3cof', 't4cof', 't5cof',
+    'xlcof', 'aycof', 'delmo', 'sinmao',
+    # SDP4（月・太陽の摂動）
+    'zmol', 'zmos', 'e3', 'ee2', 'se2', 'se3', 'sgh2', 'sgh3', 'sgh4', 'sh2', 'sh3', 'si2', 'si3',
+    'sl2', 'sl3', 'sl4', 'xgh2', 'xgh3', 'xgh4', 'xh2', 'xh3', 'xi2', 'xi3', 'xl2', 'xl3', 'xl4',
+    'dedt', 'didt', 'dmdt', 'domdt', 'dnodt',
+    # SDP4（共鳴）
+    'irez', 'd2201', 'd2211', 'd3210', 'd3222', 'd4410', 'd4422', 'd5220', 'd5232', 'd5421', 'd5433',
+    'del1', 'del2', 'del3', 'xfact', 'xlamo',
+    )
+
+
+###################################################################################################
+# 関数定義（初期化）
+###################################################################################################
+
+def __initialize(tle: Orbit.TwoLineElements) -> dict:
+    """TLEから、1つの衛星のSGP4/SDP4の伝搬計算に使う定数を求める（sgp4init()）。
+
+    Args:
+        tle     (TwoLineElements)   :   TLE
+    Returns:
+        (dict)  :   定数名 -> 値
+    """
+    c = dict.fromkeys(CONSTANT_NAMES, 0.0)
+
+    # TLEの値をSGP4の単位（ラジアン、地球半径、分）にそろえる
+    xpdotp = 1440.0 / TWOPI     # [rev / day] -> [rad / min]
+    epochDays = Orbit.datetimeToDays(tle.epoch_datetime)
+    epoch = epochDays + DAYS_1950   # 1950年1月0日0時からの経過日数 [day]
+    ecco = tle.eccentricity_float
+    argpo = math.radians(tle.argumentOfPerigee_float)
+    inclo = math.radians(tle.inclination_float)
+    mo = math.radians(tle.meanAnomaly_float)
+    nodeo = math.radians(tle.raan_float)
+    no_kozai = tle.meanMotion_float / xpdotp
+    bstar = tle.bstar_float
+    c.update(
+        epochDays=epochDays, bstar=bstar,
+        ndot=tle.firstDerivativeMeanMotion_float / (xpdotp * 1440.0),
+        nddot=tle.secondDerivativeMeanMotion_float / (xpdotp * 1440.0 * 1440.0),
+        ecco=ecco, argpo=argpo, inclo=inclo, mo=mo, nodeo=nodeo)
+
+    ss = 78.0 / EARTH_RADIUS + 1.0
+    qzms2t = ((120.0 - 78.0) / EARTH_RADIUS) ** 4
+
+    # initl：平均運動をKozaiからBrouwerの定義へ直す
+    eccsq = ecco * ecco
+    omeosq = 1.0 - eccsq
+    rteosq = math.sqrt(omeosq)
+    cosio = math.cos(inclo)
+    cosio2 = cosio * cosio
+    ak = (XKE / no_kozai) ** X2O3
+    d1 = 0.75 * J2 * (3.0 * cosio2 - 1.0) / (rteosq * omeosq)
+    delta = d1 / (ak * ak)
+    adel = ak * (1.0 - delta * delta - delta * (1.0 / 3.0 + 134.0 * delta * delta / 81.0))
+    delta = d1 / (adel * adel)
+    no = no_kozai / (1.0 + delta)
+    ao = (XKE / no) ** X2O3
+    sinio = math.sin(inclo)
+    po = ao * omeosq
+    con42 = 1.0 - 5.0 * cosio2
+    con41 = -con42 - cosio2 - cosio2
+    posq = po * po
+    rp = ao * (1.0 - ecco)
+    gsto = __gstime(epoch + 2433281.5)
+    c.update(no=no, con41=con41, gsto=gsto)
+
+    isimp = rp < 220.0 / EARTH_RADIUS + 1.0
+    sfour = ss
+    qzms24 = qzms2t
+    perige = (rp - 1.0) * EARTH_RADIUS
+    if perige < 156.0:
+        sfour = perige - 78.0
+        if perige < 98.0:
+            sfour = 20.0
+        qzms24 = ((120.0 - sfour) / EARTH_RADIUS) ** 4
+        sfour = sfour / EARTH_RADIUS + 1.0
+    pinvsq = 1.0 / posq
+
+    tsi = 1.0 / (ao - sfour)
+    eta = ao * ecco * tsi
+    etasq = eta * eta
+    eeta = ecco * eta
+    psisq = abs(1.0 - etasq)
+    coef = qzms24 * tsi ** 4
+    coef1 = coef / psisq ** 3.5
+    cc2 = coef1 * no * (ao * (1.0 + 1.5 * etasq + eeta * (4.0 + etasq))
+        + 0.375 * J2 * tsi / psisq * con41 * (8.0 + 3.0 * etasq * (8.0 + etasq)))
+    cc1 = bstar * cc2
+    cc3 = 0.0
+    if ecco > 1.0e-4:
+        cc3 = -2.0 * coef * tsi * J3OJ2 * no * sinio / ecco
+    x1mth2 = 1.0 - cosio2
+    cc4 = 2.0 * no * coef1 * ao * omeosq * (eta * (2.0 + 0.5 * etasq) + ecco * (0.5 + 2.0 * etasq)
+        - J2 * tsi / (ao * psisq) * (-3.0 * con41 * (1.0 - 2.0 * eeta + etasq * (1.5 - 0.5 * eeta))
+        + 0.75 * x1mth2 * (2.0 * etasq - eeta * (1.0 + etasq)) * math.cos(2.0 * argpo)))
+    cc5 = 2.0 * coef1 * ao * omeosq * (1.0 + 2.75 * (etasq + eeta) + eeta * etasq)
+    cosio4 = cosio2 * cosio2
+    temp1 = 1.5 * J2 * pinvsq * no
+    temp2 = 0.5 * temp1 * J2 * pinvsq
+    temp3 = -0.46875 * J4 * pinvsq * pinvsq * no
+    mdot = no + 0.5 * temp1 * rteosq * con41 + 0.0625 * temp2 * rteosq * (13.0 - 78.0 * cosio2 + 137.0 * cosio4)
+    argpdot = -0.5 * temp1 * con42 + 0.0625 * temp2 * (7.0 - 114.0 * cosio2 + 395.0 * cosio4) \
+        + temp3 * (3.0 - 36.0 * cosio2 + 49.0 * cosio4)
+    xhdot1 = -temp1 * cosio
+    nodedot = xhdot1 + (0.5 * temp2 * (4.0 - 19.0 * cosio2) + 2.0 * temp3 * (3.0 - 7.0 * cosio2)) * cosio
+    xpidot = argpdot + nodedot
+    xmcof = 0.0
+    if ecco > 1.0e-4:
+        xmcof = -X2O3 * coef * bstar / eeta
+    c.update(
+        eta=eta, cc1=cc1, cc4=cc4, cc5=cc5, x1mth2=x1mth2,
+        mdot=mdot, argpdot=argpdot, nodedot=nodedot,
+        omgcof=bstar * cc3 * math.cos(argpo),
+        xmcof=xmcof,
+        nodecf=3.5 * omeosq * xhdot1 * cc1,
+        t2cof=1.5 * cc1,
+        xlcof=-0.25 * J3OJ2 * sinio * (3.0 + 5.0 * cosio) / (1.0 + cosio if abs(cosio + 1.0) > 1.5e-12 else 1.5e-12),
+        aycof=-0.5 * J3OJ2 * sinio,
+        delmo=(1.0 + eta * math.cos(mo)) ** 3,
+        sinmao=math.sin(mo),
+        x7thm1=7.0 * cosio2 - 1.0)
+
+    # 周期が225分以上の衛星は、月・太陽の摂動と共鳴を考慮する（SDP4）
+    if TWOPI / no >= 225.0:
+        isimp = True
+        c['deepSpace'] = 1.0
+        c.update(__deepSpaceInitialize(epoch, ecco, argpo, inclo, nodeo, mo, no, eccsq, gsto, mdot, nodedot, xpidot))
+
+    if not isimp:
+        cc1sq = cc1 * cc1
+        d2 = 4.0 * ao * tsi * cc1sq
+        temp = d2 * tsi * cc1 / 3.0
+        d3 = (17.0 * ao + sfour) * temp
+        d4 = 0.5 * temp * ao * tsi * (221.0 * ao + 31.0 * sfour) * cc1
+        c.update(
+            d2=d2, d3=d3, d4=d4,
+            t3cof=d2 + 2.0 * cc1sq,
+            t4cof=0.25 * (3.0 * d3 + cc1 * (12.0 * d2 + 10.0 * cc1sq)),
+            t5cof=0.2 * (3.0 * d4 + 12.0 * cc1 * d3 + 6.0 * d2 * d2 + 15.0 * cc1sq * (2.0 * d2 + cc1sq)))
+    c['isimp'] = float(isimp)
+    return c
+
+
+def __gstime(jdut1: float) -> float:
+    """ユリウス日（UT1）からグリニッジ平均恒星時を求める（IAU-82）。
+
+    Args:
+        jdut1   (float) :   ユリウス日
+    Returns:
+        (float) :   グリニッジ平均恒星時 [rad]
+    """
+    tut1 = (jdut1 - 2451545.0) / 36525.0
+    temp = -6.2e-6 * tut1 * tut1 * tut1 + 0.093104 * tut1 * tut1 + (876600.0 * 3600 + 8640184.812866) * tut1 + 67310.54841  # [sec]
+    return (math.radians(temp) / 240.0) % TWOPI
+
+
+def __deepSpaceInitialize(
+    epoch   : float,
+    ecco    : float,
+    argpo   : float,
+    inclo   : float,
+    nodeo   : float,
+    mo      : float,
+    no      : float,
+    eccsq   : float,
+    gsto    : float,
+    mdot    : float,
+    nodedot : float,
+    xpidot  : float
+    ) -> dict:
+    """月・太陽の摂動と共鳴の定数を求める（dscom()、dsinit()）。
+
+    Returns:
+        (dict)  :   定数名 -> 値
+    """
+    c = {}
+    zes, zel = 0.01675, 0.05490
+    c1ss, c1l = 2.9864797e-6, 4.7968065e-7
+    zsinis, zcosis = 0.39785416, 0.91744867
+    zcosgs, zsings = 0.1945905, -0.98088458
+    zns, znl = 1.19459e-5, 1.5835218e-4
+
+    # dscom：月・太陽の方向に関する係数
+    snodm, cnodm = math.sin(nodeo), math.cos(nodeo)
+    sinomm, cosomm = math.sin(argpo), math.cos(argpo)
+    sinim, cosim = math.sin(inclo), math.cos(inclo)
+    em = ecco
+    emsq = em * em
+    betasq = 1.0 - emsq
+    rtemsq = math.sqrt(betasq)
+    day = epoch + 18261.5
+    xnodce = (4.5236020 - 9.2422029e-4 * day) % TWOPI
+    stem, ctem = math.sin(xnodce), math.cos(xnodce)
+    zcosil = 0.91375164 - 0.03568096 * ctem
+    zsinil = math.sqrt(1.0 - zcosil * zcosil)
+    zsinhl = 0.089683511 * stem / zsinil
+    zcoshl = math.sqrt(1.0 - zsinhl * zsinhl)
+    gam = 5.8351514 + 0.0019443680 * day
+    zx = 0.39785416 * stem / zsinil
+    zy = zcoshl * ctem + 0.91744867 * zsinhl * stem
+    zx = gam + math.atan2(zx, zy) - xnodce
+    zcosgl, zsingl = math.cos(zx), math.sin(zx)
+
+    # 1回目は太陽、2回目は月について求める
+    terms = []
+    for zcosg, zsing, zcosi, zsini, zcosh, zsinh, cc in (
+        (zcosgs, zsings, zcosis, zsinis, cnodm, snodm, c1ss),
+        (zcosgl, zsingl, zcosil, zsinil, zcoshl * cnodm + zsinhl * snodm, snodm * zcoshl - cnodm * zsinhl, c1l)):
+        a1 = zcosg * zcosh + zsing * zcosi * zsinh
+        a3 = -zsing * zcosh + zcosg * zcosi * zsinh
+        a7 = -zcosg * zsinh + zsing * zcosi * zcosh
+        a8 = zsing * zsini
+        a9 = zsing * zsinh + zcosg * zcosi * zcosh
+        a10 = zcosg * zsini
+        a2 = cosim * a7 + sinim * a8
+        a4 = cosim * a9 + sinim * a10
+        a5 = -sinim * a7 + cosim * a8
+        a6 = -sinim * a9 + cosim * a10
+        x1 = a1 * cosomm + a2 * sinomm
+        x2 = a3 * cosomm + a4 * sinomm
+        x3 = -a1 * sinomm + a2 * cosomm
+        x4 = -a3 * sinomm + a4 * cosomm
+        x5 = a5 * sinomm
+        x6 = a6 * sinomm
+        x7 = a5 * cosomm
+        x8 = a6 * cosomm
+        z31 = 12.0 * x1 * x1 - 3.0 * x3 * x3
+        z32 = 24.0 * x1 * x2 - 6.0 * x3 * x4
+        z33 = 12.0 * x2 * x2 - 3.0 * x4 * x4
+        z1 = 3.0 * (a1 * a1 + a2 * a2) + z31 * emsq
+        z2 = 6.0 * (a1 * a3 + a2 * a4) + z32 * emsq
+        z3 = 3.0 * (a3 * a3 + a4 * a4) + z33 * emsq
+        z11 = -6.0 * a1 * a5 + emsq * (-24.0 * x1 * x7 - 6.0 * x3 * x5)
+        z12 = -6.0 * (a1 * a6 + a3 * a5) + emsq * (-24.0 * (x2 * x7 + x1 * x8) - 6.0 * (x3 * x6 + x4 * x5))
+        z13 = -6.0 * a3 * a6 + emsq * (-24.0 * x2 * x8 - 6.0 * x4 * x6)
+        z21 = 6.0 * a2 * a5 + emsq * (24.0 * x1 * x5 - 6.0 * x3 * x7)
+        z22 = 6.0 * (a4 * a5 + a2 * a6) + emsq * (24.0 * (x2 * x5 + x1 * x6) - 6.0 * (x4 * x7 + x3 * x8))
+        z23 = 6.0 * a4 * a6 + emsq * (24.0 * x2 * x6 - 6.0 * x4 * x8)
+        z1 = z1 + z1 + betasq * z31
+        z2 = z2 + z2 + betasq * z32
+        z3 = z3 + z3 + betasq * z33
+        s3 = cc / no
+        s2 = -0.5 * s3 / rtemsq
+        s4 = s3 * rtemsq
+        s1 = -15.0 * em * s4
+        s5 = x1 * x3 + x2 * x4
+        s6 = x2 * x3 + x1 * x4
+        s7 = x2 * x4 - x1 * x3
+        terms.append((s1, s2, s3, s4, s5, s6, s7, z1, z2, z3, z11, z12, z13, z21, z22, z23, z31, z32, z33))
+    (ss1, ss2, ss3, ss4, ss5, ss6, ss7, sz1, sz2, sz3, sz11, sz12, sz13, sz21, sz22, sz23, sz31, sz32, sz33) = terms[0]
+    (s1, s2, s3, s4, s5, s6, s7, z1, z2, z3, z11, z12, z13, z21, z22, z23, z31, z32, z33) = terms[1]
+
+    c.update(
+        zmol=(4.7199672 + 0.22997150 * day - gam) % TWOPI,
+        zmos=(6.2565837 + 0.017201977 * day) % TWOPI,
+        se2=2.0 * ss1 * ss6, se3=2.0 * ss1 * ss7,
+        si2=2.0 * ss2 * sz12, si3=2.0 * ss2 * (sz13 - sz11),
+        sl2=-2.0 * ss3 * sz2, sl3=-2.0 * ss3 * (sz3 - sz1), sl4=-2.0 * ss3 * (-21.0 - 9.0 * emsq) * zes,
+        sgh2=2.0 * ss4 * sz32, sgh3=2.0 * ss4 * (sz33 - sz31), sgh4=-18.0 * ss4 * zes,
+        sh2=-2.0 * ss2 * sz22, sh3=-2.0 * ss2 * (sz23 - sz21),
+        ee2=2.0 * s1 * s6, e3=2.0 * s1 * s7,
+        xi2=2.0 * s2 * z12, xi3=2.0 * s2 * (z13 - z11),
+        xl2=-2.0 * s3 * z2, xl3=-2.0 * s3 * (z3 - z1), xl4=-2.0 * s3 * (-21.0 - 9.0 * emsq) * zel,
+        xgh2=2.0 * s4 * z32, xgh3=2.0 * s4 * (z33 - z31), xgh4=-18.0 * s4 * zel,
+        xh2=-2.0 * s2 * z22, xh3=-2.0 * s2 * (z23 - z21))
+
+    # dsinit：永年変化率と共鳴の係数
+    q22, q31, q33 = 1.7891679e-6, 2.1460748e-6, 2.2123015e-7
+    root22, root44, root54 = 1.7891679e-6, 7.3636953e-9, 2.1765803e-9
+    root32, root52 = 3.7393792e-7, 1.1428639e-7
+    rptim = 4.37526908801129966e-3     # 地球の自転角速度 [rad / min]
+    nm = no
+    irez = 0
+    if 0.0034906585 < nm < 0.0052359877:
+        irez = 1    # 1日周期の共鳴（静止軌道など）
+    if 8.26e-3 <= nm <= 9.24e-3 and em >= 0.5:
+        irez = 2    # 半日周期の共鳴（モルニア軌道など）
+
+    ses = ss1 * zns * ss5
+    sis = ss2 * zns * (sz11 + sz13)
+    sls = -zns * ss3 * (sz1 + sz3 - 14.0 - 6.0 * emsq)
+    sghs = ss4 * zns * (sz31 + sz33 - 6.0)
+    shs = -zns * ss2 * (sz21 + sz23)
+    if inclo < 5.2359877e-2 or inclo > math.pi - 5.2359877e-2:
+        shs = 0.0
+    if sinim != 0.0:
+        shs = shs / sinim
+    sgs = sghs - cosim * shs
+    dedt = ses + s1 * znl * s5
+    didt = sis + s2 * znl * (z11 + z13)
+    dmdt = sls - znl * s3 * (z1 + z3 - 14.0 - 6.0 * emsq)
+    sghl = s4 * znl * (z31 + z33 - 6.0)
+    shll = -znl * s2 * (z21 + z23)
+    if inclo < 5.2359877e-2 or inclo > math.pi - 5.2359877e-2:
+        shll = 0.0
+    domdt = sgs + sghl
+    dnodt = shs
+    if sinim != 0.0:
+        domdt = domdt - cosim / sinim * shll
+        dnodt = dnodt + shll / sinim
+    c.update(irez=float(irez), dedt=dedt, didt=didt, dmdt=dmdt, domdt=domdt, dnodt=dnodt)
+
+    theta = gsto % TWOPI
+    if irez != 0:
+        aonv = (nm / XKE) ** X2O3
+        if irez == 2:
+            cosisq = cosim * cosim
+            em = ecco
+            emsq = eccsq
+            eoc = em * emsq
+            g201 = -0.306 - (em - 0.64) * 0.440
+            if em <= 0.65:
+                g211 = 3.616 - 13.2470 * em + 16.2900 * emsq
+                g310 = -19.302 + 117.3900 * em - 228.4190 * emsq + 156.5910 * eoc
+                g322 = -18.9068 + 109.7927 * em - 214.6334 * emsq + 146.5816 * eoc
+                g410 = -41.122 + 242.6940 * em - 471.0940 * emsq + 313.9530 * eoc
+                g422 = -146.407 + 841.8800 * em - 1629.014 * emsq + 1083.4350 * eoc
+                g520 = -532.114 + 3017.977 * em - 5740.032 * emsq + 3708.2760 * eoc
+            else:
+                g211 = -72.099 + 331.819 * em - 508.738 * emsq + 266.724 * eoc
+                g310 = -346.844 + 1582.851 * em - 2415.925 * emsq + 1246.113 * eoc
+                g322 = -342.585 + 1554.908 * em - 2366.899 * emsq + 1215.972 * eoc
+                g410 = -1052.797 + 4758.686 * em - 7193.992 * emsq + 3651.957 * eoc
+                g422 = -3581.690 + 16178.110 * em - 24462.770 * emsq + 12422.520 * eoc
+                if em > 0.715:
+                    g520 = -5149.66 + 29936.92 * em - 54087.36 * emsq + 31324.56 * eoc
+                else:
+                    g520 = 1464.74 - 4664.75 * em + 3763.64 * emsq
+            if em < 0.7:
+                g533 = -919.22770 + 4988.6100 * em - 9064.7700 * emsq + 5542.21 * eoc
+                g521 = -822.71072 + 4568.6173 * em - 8491.4146 * emsq + 5337.524 * eoc
+                g532 = -853.66600 + 4690.2500 * em - 8624.7700 * emsq + 5341.4 * eoc
+            else:
+                g533 = -37995.780 + 161616.52 * em - 229838.20 * emsq + 109377.94 * eoc
+                g521 = -51752.104 + 218913.95 * em - 309468.16 * emsq + 146349.42 * eoc
+                g532 = -40023.880 + 170470.89 * em - 242699.48 * emsq + 115605.82 * eoc
+            sini2 = sinim * sinim
+            f220 = 0.75 * (1.0 + 2.0 * cosim + cosisq)
+            f221 = 1.5 * sini2
+            f321 = 1.875 * sinim * (1.0 - 2.0 * cosim - 3.0 * cosisq)
+            f322 = -1.875 * sinim * (1.0 + 2.0 * cosim - 3.0 * cosisq)
+            f441 = 35.0 * sini2 * f220
+            f442 = 39.3750 * sini2 * sini2
+            f522 = 9.84375 * sinim * (sini2 * (1.0 - 2.0 * cosim - 5.0 * cosisq)
+                + 0.33333333 * (-2.0 + 4.0 * cosim + 6.0 * cosisq))
+            f523 = sinim * (4.92187512 * sini2 * (-2.0 - 4.0 * cosim + 10.0 * cosisq)
+                + 6.56250012 * (1.0 + 2.0 * cosim - 3.0 * cosisq))
+            f542 = 29.53125 * sinim * (2.0 - 8.0 * cosim + cosisq * (-12.0 + 8.0 * cosim + 10.0 * cosisq))
+            f543 = 29.53125 * sinim * (-2.0 - 8.0 * cosim + cosisq * (12.0 + 8.0 * cosim - 10.0 * cosisq))
+            xno2 = nm * nm
+            ainv2 = aonv * aonv
+            temp1 = 3.0 * xno2 * ainv2
+            temp = temp1 * root22
+            c.update(d2201=temp * f220 * g201, d2211=temp * f221 * g211)
+            temp1 = temp1 * aonv
+            temp = temp1 * root32
+            c.update(d3210=temp * f321 * g310, d3222=temp * f322 * g322)
+            temp1 = temp1 * aonv
+            temp = 2.0 * temp1 * root44
+            c.update(d4410=temp * f441 * g410, d4422=temp * f442 * g422)
+            temp1 = temp1 * aonv
+            temp = temp1 * root52
+            c.update(d5220=temp * f522 * g520, d5232=temp * f523 * g532)
+            temp = 2.0 * temp1 * root54
+            c.update(d5421=temp * f542 * g521, d5433=temp * f543 * g533)
+            c['xlamo'] = (mo + nodeo + nodeo - theta - theta) % TWOPI
+            c['xfact'] = mdot + dmdt + 2.0 * (nodedot + dnodt - rptim) - no
+        else:
+            g200 = 1.0 + emsq * (-2.5 + 0.8125 * emsq)
+            g310 = 1.0 + 2.0 * emsq
+            g300 = 1.0 + emsq * (-6.0 + 6.60937 * emsq)
+            f220 = 0.75 * (1.0 + cosim) * (1.0 + cosim)
+            f311 = 0.9375 * sinim * sinim * (1.0 + 3.0 * cosim) - 0.75 * (1.0 + cosim)
+            f330 = 1.875 * (1.0 + cosim) ** 3
+            del1 = 3.0 * nm * nm * aonv * aonv
+            c['del2'] = 2.0 * del1 * f220 * g200 * q22
+            c['del3'] = 3.0 * del1 * f330 * g300 * q33 * aonv
+            c['del1'] = del1 * f311 * g310 * q31 * aonv
+            c['xlamo'] = (mo + nodeo + argpo - theta) % TWOPI
+            c['xfact'] = mdot + xpidot - rptim + dmdt + domdt + dnodt - no
+    return c
+
+
+def sgp4Constants(tles: list) -> dict:
+    """複数のTLEから、SGP4/SDP4の伝搬計算に使う定数を求めて衛星ごとの配列にまとめる。
+
+    Args:
+        tles    (list)  :   TwoLineElementsのリスト
+    Returns:
+        (dict)  :   定数名 -> 値の配列（形状は (衛星数,)）
+    """
+    rows = [__initialize(tle) for tle in tles]
+    return {name: numpy.array([row[name] for row in rows], dtype=numpy.float64) for name in CONSTANT_NAMES}
+
+
+###################################################################################################
+# 関数定義（伝搬計算）
+###################################################################################################
+
+def sgp4_array(constants: dict, dates: numpy.ndarray, dtype=numpy.float64, out: tuple = None) -> tuple:
+    """SGP4/SDP4で、各衛星・各日時における衛星の位置と速度（TEME座標系）を求める（配列版）。
+
+    全衛星・全日時をまとめて計算する。周期225分以上の衛星（SDP4）は、それ以外の衛星と分けて計算する。
+    References:
+        Vallado, David A., Paul Crawford, Richard Hujsak, and T.S. Kelso, "Revisiting Spacetrack Report #3," presented at the AIAA/AAS Astrodynamics Specialist Conference, Keystone, CO, 2006 August 21–24.
+        http://www.celestrak.com/publications/AIAA/2006-6753/
+    Args:
+        constants   (dict)      :   sgp4Constants()で求めた定数
+        dates       (ndarray)   :   日時（UTC、datetime64）または基準日時からの経過日数 [day]
+        dtype                   :   位置・速度の出力の型。途中の計算は常にfloat64で行う
+        out         (tuple)     :   位置・速度の出力先の配列 (r, v)（Orbit.prepareOutput()を参照）。C連続の配列であること
+    Returns:
+        r       (ndarray)   :   位置 (x, y, z) [km]、形状は (衛星数,) + dates.shape + (3,)。エラーの点はNaN
+        v       (ndarray)   :   速度 (vx, vy, vz) [km / s]、形状はrと同じ
+        error   (ndarray)   :   エラーコード（ERROR_*）、形状は (衛星数,) + dates.shape
+    """
+    days = numpy.asarray(Orbit.asDays(dates), dtype=numpy.float64)
+    satelliteNum = len(constants['epochDays'])
+    shape = (satelliteNum,) + days.shape
+    rOut, vOut = (None, None) if out is None else out
+    rOut = Orbit.prepareOutput(shape + (3,), dtype, rOut)
+    vOut = Orbit.prepareOutput(shape + (3,), dtype, vOut)
+    if not (rOut.flags.c_contiguous and vOut.flags.c_contiguous):
+        raise ValueError('out must be C-contiguous')
+    r = rOut.reshape((satelliteNum, days.size, 3))
+    v = vOut.reshape((satelliteNum, days.size, 3))
+    error = numpy.empty((satelliteNum, days.size), dtype=numpy.int8)
+
+    deep = constants['deepSpace'] != 0
+    for group in (numpy.flatnonzero(~deep), numpy.flatnonzero(deep)):
+        if len(group) == 0 or days.size == 0:
+            continue
+        c = {name: value[group, numpy.newaxis] for name, value in constants.items()}
+        tsince = (days.reshape(1, -1) - c['epochDays']) * 1440.0   # 元期からの経過時間 [min]
+        r[group], v[group], error[group] = __propagate(c, tsince, deep[group[0]])
+
+    return (rOut, vOut, error.reshape(shape))
+
+
+def __propagate(c: dict, t: numpy.ndarray, deepSpace: bool) -> tuple:
+    """SGP4/SDP4の本体（sgp4()）。
+
+    Args:
+        c           (dict)      :   定数（値の形状は (衛星数, 1)）
+        t           (ndarray)   :   元期からの経過時間 [min]、形状は (衛星数, 点数)
+        deepSpace   (bool)      :   全衛星がSDP4の対象か
+    Returns:
+        r, v, error :   sgp4_array()と同じ（形状は (衛星数, 点数, 3) と (衛星数, 点数)）
+    """
+    vkmpersec = EARTH_RADIUS * XKE / 60.0
+    error = numpy.zeros(t.shape, dtype=numpy.int8)
+
+    # 永年変化と大気抵抗
+    xmdf = c['mo'] + c['mdot'] * t
+    argpdf = c['argpo'] + c['argpdot'] * t
+    nodedf = c['nodeo'] + c['nodedot'] * t
+    t2 = t * t
+    nodem = nodedf + c['nodecf'] * t2
+    tempa = 1.0 - c['cc1'] * t
+    tempe = c['bstar'] * c['cc4'] * t
+    templ = c['t2cof'] * t2
+    argpm = argpdf
+    mm = xmdf
+    if not deepSpace:
+        full = c['isimp'] == 0   # 近地点高度が220km未満の衛星は簡略化した式を使う
+        delmtemp = 1.0 + c['eta'] * numpy.cos(xmdf)
+        temp = numpy.where(full, c['omgcof'] * t + c['xmcof'] * (delmtemp * delmtemp * delmtemp - c['delmo']), 0.0)
+        mm = xmdf + temp
+        argpm = argpdf - temp
+        t3 = t2 * t
+        t4 = t3 * t
+        tempa = tempa - c['d2'] * t2 - c['d3'] * t3 - c['d4'] * t4
+        tempe = tempe + numpy.where(full, c['bstar'] * c['cc5'] * (numpy.sin(mm) - c['sinmao']), 0.0)
+        templ = templ + c['t3cof'] * t3 + t4 * (c['t4cof'] + t * c['t5cof'])
+
+    nm = numpy.broadcast_to(c['no'], t.shape)
+    em = numpy.broadcast_to(c['ecco'], t.shape)
+    inclm = numpy.broadcast_to(c['inclo'], t.shape)
+    if deepSpace:
+        em, argpm, inclm, mm, nodem, nm = __deepSpaceSecular(c, t, em, argpm, inclm, mm, nodem, nm)
+
+    error[nm <= 0.0] = ERROR_MEAN_MOTION
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        am = (XKE / nm) ** X2O3 * tempa * tempa
+        nm = XKE / am ** 1.5
+    em = em - tempe
+    error[(error == 0) & ((em >= 1.0) | (em < -0.001))] = ERROR_MEAN_ECCENTRICITY
+    em = numpy.maximum(em, 1.0e-6)
+    mm = mm + c['no'] * templ
+    xlm = mm + argpm + nodem
+    nodem = numpy.fmod(nodem, TWOPI)
+    argpm = numpy.mod(argpm, TWOPI)
+    xlm = numpy.mod(xlm, TWOPI)
+    mm = numpy.mod(xlm - argpm - nodem, TWOPI)
+
+    # 長周期の摂動（月・太陽）
+    ep, xincp, argpp, nodep, mp = em, inclm, argpm, nodem, mm
+    con41, x1mth2, x7thm1 = c['con41'], c['x1mth2'], c['x7thm1']
+    aycof, xlcof = c['aycof'], c['xlcof']
+    if deepSpace:
+        ep, xincp, nodep, argpp, mp = __deepSpacePeriodic(c, t, ep, xincp, nodep, argpp, mp)
+        negative = xincp < 0.0
+        xincp = numpy.where(negative, -xincp, xincp)
+        nodep = numpy.where(negative, nodep + math.pi, nodep)
+        argpp = numpy.where(negative, argpp - math.pi, argpp)
+        error[(error == 0) & ((ep < 0.0) | (ep > 1.0))] = ERROR_PERTURBED_ECCENTRICITY
+        sinip = numpy.sin(xincp)
+        cosip = numpy.cos(xincp)
+        aycof = -0.5 * J3OJ2 * sinip
+        xlcof = -0.25 * J3OJ2 * sinip * (3.0 + 5.0 * cosip) \
+            / numpy.where(numpy.abs(cosip + 1.0) > 1.5e-12, 1.0 + cosip, 1.5e-12)
+        cosisq = cosip * cosip
+        con41 = 3.0 * cosisq - 1.0
+        x1mth2 = 1.0 - cosisq
+        x7thm1 = 7.0 * cosisq - 1.0
+    else:
+        sinip = numpy.sin(xincp)
+        cosip = numpy.cos(xincp)
+
+    # ケプラー方程式を解く（ニュートン・ラフソン法、最大10回）
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        axnl = ep * numpy.cos(argpp)
+        temp = 1.0 / (am * (1.0 - ep * ep))
+        aynl = ep * numpy.sin(argpp) + temp * aycof
+        xl = mp + argpp + nodep + temp * xlcof * axnl
+    u = numpy.mod(xl - nodep, TWOPI)
+    eo1 = u.copy()
+    sineo1 = numpy.sin(eo1)
+    coseo1 = numpy.cos(eo1)
+    active = numpy.ones(t.shape, dtype=bool)
+    for _ in range(10):
+        sin1 = numpy.sin(eo1)
+        cos1 = numpy.cos(eo1)
+        numpy.copyto(sineo1, sin1, where=active)
+        numpy.copyto(coseo1, cos1, where=active)
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            tem5 = (u - aynl * cos1 + axnl * sin1 - eo1) / (1.0 - cos1 * axnl - sin1 * aynl)
+        tem5 = numpy.clip(tem5, -0.95, 0.95)
+        numpy.add(eo1, tem5, out=eo1, where=active)
+        active &= ~(numpy.abs(tem5) < 1.0e-12)
+        if not active.any():
+            break
+
+    # 短周期の摂動
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        ecose = axnl * coseo1 + aynl * sineo1
+        esine = axnl * sineo1 - aynl * coseo1
+        el2 = axnl * axnl + aynl * aynl
+        pl = am * (1.0 - el2)
+        error[(error == 0) & (pl < 0.0)] = ERROR_SEMILATUS_RECTUM
+        rl = am * (1.0 - ecose)
+        rdotl = numpy.sqrt(am) * esine / rl
+        rvdotl = numpy.sqrt(pl) / rl
+        betal = numpy.sqrt(1.0 - el2)
+        temp = esine / (1.0 + betal)
+        sinu = am / rl * (sineo1 - aynl - axnl * temp)
+        cosu = am / rl * (coseo1 - axnl + aynl * temp)
+        su = numpy.arctan2(sinu, cosu)
+        sin2u = (cosu + cosu) * sinu
+        cos2u = 1.0 - 2.0 * sinu * sinu
+        temp = 1.0 / pl
+        temp1 = 0.5 * J2 * temp
+        temp2 = temp1 * temp
+
+        mrt = rl * (1.0 - 1.5 * temp2 * betal * con41) + 0.5 * temp1 * x1mth2 * cos2u
+        su = su - 0.25 * temp2 * x7thm1 * sin2u
+        xnode = nodep + 1.5 * temp2 * cosip * sin2u
+        xinc = xincp + 1.5 * temp2 * cosip * sinip * cos2u
+        mvt = rdotl - nm * temp1 * x1mth2 * sin2u / XKE
+        rvdot = rvdotl + nm * temp1 * (x1mth2 * cos2u + 1.5 * con41) / XKE
+
+    # 方向ベクトル
+    sinsu, cossu = numpy.sin(su), numpy.cos(su)
+    snod, cnod = numpy.sin(xnode), numpy.cos(xnode)
+    sini, cosi = numpy.sin(xinc), numpy.cos(xinc)
+    xmx = -snod * cosi
+    xmy = cnod * cosi
+    r = numpy.empty(t.shape + (3,))
+    v = numpy.empty(t.shape + (3,))
+    mr = mrt * EARTH_RADIUS
+    uz = sini * sinsu
+    vz = sini * cossu
+    ux = xmx * sinsu + cnod * cossu
+    vx = xmx * cossu - cnod * sinsu
+    r[..., 0] = mr * ux
+    v[..., 0] = (mvt * ux + rvdot * vx) * vkmpersec
+    uy = xmy * sinsu + snod * cossu
+    vy = xmy * cossu - snod * sinsu
+    r[..., 1] = mr * uy
+    v[..., 1] = (mvt * uy + rvdot * vy) * vkmpersec
+    r[..., 2] = mr * uz
+    v[..., 2] = (mvt * uz + rvdot * vz) * vkmpersec
+
+    error[(error == 0) & (mrt < 1.0)] = ERROR_DECAYED
+    invalid = (error != 0) & (error != ERROR_DECAYED)
+    r[invalid] = numpy.nan
+    v[invalid] = numpy.nan
+    return (r, v, error)
+
+
+def __deepSpaceSecular(c, t, em, argpm, inclm, mm, nodem, nm) -> tuple:
+    """月・太陽の永年摂動と共鳴の効果を加える（dspace()）。
+
+    共鳴のある衛星は、元期から720分刻みのオイラー・マクローリン法で平均運動と平均経度を積分する。
+    Returns:
+        em, argpm, inclm, mm, nodem, nm
+    """
+    fasx2, fasx4, fasx6 = 0.13130908, 2.8843198, 0.37448087
+    g22, g32, g44, g52, g54 = 5.7686396, 0.95240898, 1.8014998, 1.0508330, 4.4108898
+    rptim = 4.37526908801129966e-3
+    stepp = 720.0
+    step2 = 259200.0
+
+    theta = numpy.mod(c['gsto'] + t * rptim, TWOPI)
+    em = em + c['dedt'] * t
+    inclm = inclm + c['didt'] * t
+    argpm = argpm + c['domdt'] * t
+    nodem = nodem + c['dnodt'] * t
+    mm = mm + c['dmdt'] * t
+
+    irez = numpy.broadcast_to(c['irez'], t.shape)
+    index = numpy.flatnonzero(irez != 0)
+    if len(index) == 0:
+        return (em, argpm, inclm, mm, nodem, nm)
+
+    # 共鳴のある点だけを1次元に取り出して積分する
+    def take(value):
+        return numpy.broadcast_to(value, t.shape).reshape(-1)[index]
+    tt = take(t)
+    rez = take(irez)
+    k = {name: take(c[name]) for name in (
+        'd2201', 'd2211', 'd3210', 'd3222', 'd4410', 'd4422', 'd5220', 'd5232', 'd5421', 'd5433',
+        'del1', 'del2', 'del3', 'xfact', 'argpo', 'argpdot')}
+    no = take(c['no'])
+    xli = take(c['xlamo']).copy()
+    xni = no.copy()
+    atime = numpy.zeros(len(index))
+    delt = numpy.where(tt > 0.0, stepp, -stepp)
+    xndt = numpy.empty(len(index))
+    xldot = numpy.empty(len(index))
+    xnddt = numpy.empty(len(index))
+
+    active = numpy.arange(len(index))
+    while len(active) > 0:
+        li, ni, at = xli[active], xni[active], atime[active]
+        one = rez[active] == 1
+        d = {name: value[active] for name, value in k.items()}
+        # 1日周期の共鳴
+        ndt1 = d['del1'] * numpy.sin(li - fasx2) + d['del2'] * numpy.sin(2.0 * (li - fasx4)) + d['del3'] * numpy.sin(3.0 * (li - fasx6))
+        nddt1 = d['del1'] * numpy.cos(li - fasx2) + 2.0 * d['del2'] * numpy.cos(2.0 * (li - fasx4)) + 3.0 * d['del3'] * numpy.cos(3.0 * (li - fasx6))
+        # 半日周期の共鳴
+        xomi = d['argpo'] + d['argpdot'] * at
+        x2omi = xomi + xomi
+        x2li = li + li
+        ndt2 = (d['d2201'] * numpy.sin(x2omi + li - g22) + d['d2211'] * numpy.sin(li - g22)
+            + d['d3210'] * numpy.sin(xomi + li - g32) + d['d3222'] * numpy.sin(-xomi + li - g32)
+            + d['d4410'] * numpy.sin(x2omi + x2li - g44) + d['d4422'] * numpy.sin(x2li - g44)
+            + d['d5220'] * numpy.sin(xomi + li - g52) + d['d5232'] * numpy.sin(-xomi + li - g52)
+            + d['d5421'] * numpy.sin(xomi + x2li - g54) + d['d5433'] * numpy.sin(-xomi + x2li - g54))
+        nddt2 = (d['d2201'] * numpy.cos(x2omi + li - g22) + d['d2211'] * numpy.cos(li - g22)
+            + d['d3210'] * numpy.cos(xomi + li - g32) + d['d3222'] * numpy.cos(-xomi + li - g32)
+            + d['d5220'] * numpy.cos(xomi + li - g52) + d['d5232'] * numpy.cos(-xomi + li - g52)
+            + 2.0 * (d['d4410'] * numpy.cos(x2omi + x2li - g44) + d['d4422'] * numpy.cos(x2li - g44)
+            + d['d5421'] * numpy.cos(xomi + x2li - g54) + d['d5433'] * numpy.cos(-xomi + x2li - g54)))
+        ldot = ni + d['xfact']
+        xndt[active] = numpy.where(one, ndt1, ndt2)
+        xldot[active] = ldot
+        xnddt[active] = numpy.where(one, nddt1, nddt2) * ldot
+
+        # 残りが1刻み未満になった点は積分を終え、それ以外は1刻み進める
+        step = active[numpy.abs(tt[active] - at) >= stepp]
+        xli[step] += xldot[step] * delt[step] + xndt[step] * step2
+        xni[step] += xndt[step] * delt[step] + xnddt[step] * step2
+        atime[step] += delt[step]
+        active = step
+
+    ft = tt - atime
+    nmr = xni + xndt * ft + xnddt * ft * ft * 0.5
+    xl = xli + xldot * ft + xndt * ft * ft * 0.5
+    nodemr = take(nodem)
+    mm = mm.copy().reshape(-1)
+    mm[index] = numpy.where(rez != 1, xl - 2.0 * nodemr + 2.0 * take(theta), xl - nodemr - take(argpm) + take(theta))
+    nm = numpy.array(nm, dtype=numpy.float64).reshape(-1)
+    nm[index] = no + (nmr - no)
+    return (em, argpm, inclm, mm.reshape(t.shape), nodem, nm.reshape(t.shape))
+
+
+def __deepSpacePeriodic(c, t, ep, inclp, nodep, argpp, mp) -> tuple:
+    """月・太陽の長周期摂動を加える（dpper()）。
+
+    軌道傾斜角が0.2rad未満の場合はLyddaneの修正を使う。
+    Returns:
+        ep, inclp, nodep, argpp, mp
+    """
+    zns, zes = 1.19459e-5, 0.01675
+    znl, zel = 1.5835218e-4, 0.05490
+
+    # 太陽
+    zm = c['zmos'] + zns * t
+    zf = zm + 2.0 * zes * numpy.sin(zm)
+    sinzf = numpy.sin(zf)
+    f2 = 0.5 * sinzf * sinzf - 0.25
+    f3 = -0.5 * sinzf * numpy.cos(zf)
+    ses = c['se2'] * f2 + c['se3'] * f3
+    sis = c['si2'] * f2 + c['si3'] * f3
+    sls = c['sl2'] * f2 + c['sl3'] * f3 + c['sl4'] * sinzf
+    sghs = c['sgh2'] * f2 + c['sgh3'] * f3 + c['sgh4'] * sinzf
+    shs = c['sh2'] * f2 + c['sh3'] * f3
+
+    # 月
+    zm = c['zmol'] + znl * t
+    zf = zm + 2.0 * zel * numpy.sin(zm)
+    sinzf = numpy.sin(zf)
+    f2 = 0.5 * sinzf * sinzf - 0.25
+    f3 = -0.5 * sinzf * numpy.cos(zf)
+    sel = c['ee2'] * f2 + c['e3'] * f3
+    sil = c['xi2'] * f2 + c['xi3'] * f3
+    sll = c['xl2'] * f2 + c['xl3'] * f3 + c['xl4'] * sinzf
+    sghl = c['xgh2'] * f2 + c['xgh3'] * f3 + c['xgh4'] * sinzf
+    shll = c['xh2'] * f2 + c['xh3'] * f3
+
+    pe = ses + sel
+    pinc = sis + sil
+    pl = sls + sll
+    pgh = sghs + sghl
+    ph = shs + shll
+    inclp = inclp + pinc
+    ep = ep + pe
+    sinip = numpy.sin(inclp)
+    cosip = numpy.cos(inclp)
+
+    # 周期項をそのまま加える
+    direct = inclp >= 0.2
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        ph1 = ph / sinip
+    argpp1 = argpp + pgh - cosip * ph1
+    nodep1 = nodep + ph1
+
+    # Lyddaneの修正
+    sinop = numpy.sin(nodep)
+    cosop = numpy.cos(nodep)
+    alfdp = sinip * sinop + (ph * cosop + pinc * cosip * sinop)
+    betdp = sinip * cosop + (-ph * sinop + pinc * cosip * cosop)
+    nodep2 = numpy.fmod(nodep, TWOPI)
+    xls = mp + argpp + pl + pgh + (cosip - pinc * sinip) * nodep2
+    xnoh = nodep2
+    nodep2 = numpy.arctan2(alfdp, betdp)
+    nodep2 = numpy.where(numpy.abs(xnoh - nodep2) > math.pi, numpy.where(nodep2 < xnoh, nodep2 + TWOPI, nodep2 - TWOPI), nodep2)
+    argpp2 = xls - (mp + pl) - cosip * nodep2
+
+    return (
+        ep, inclp,
+        numpy.where(direct, nodep1, nodep2),
+        numpy.where(direct, argpp1, argpp2),
+        mp + pl)
+
+
+###################################################################################################
+# クラス定義
+###################################################################################################
+
+class SGP4Propagator(Orbit.Propagator):
+    """SGP4/SDP4のバックエンド。
+
+    TLEの平均要素（BSTAR、平均運動の1次・2次の変化率を含む）から伝搬計算の定数を作成時に求めておき、
+    全衛星・全日時の位置をまとめて求める。座標系はTEME（真赤道・平均春分点）で、
+    経緯度はグリニッジ恒星時で回転して求める（Orbit.xyzToLatLon_array()）。
+    """
+
+    def __init__(self, tles: list):
+        """バックエンドを作成し、全衛星の定数を求めておく。
+
+        Args:
+            tles    (list)  :   TwoLineElementsのリスト
+        """
+        super().__init__(tles)
+        self.__constants = sgp4Constants(self.tles)
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def constants(self) -> dict:
+        return self.__constants
+
+
+    ###############################################################################################
+    # メソッド
+    ###############################################################################################
+
+    def xyz(self, dates: numpy.ndarray, dtype=numpy.float64, out: numpy.ndarray = None) -> numpy.ndarray:
+        r, _, _ = sgp4_array(self.__constants, dates, dtype, (out, None))
+        return r
+
+
+    def xyzVelocity(self, dates: numpy.ndarray, dtype=numpy.float64, out: tuple = None) -> tuple:
+        r, v, _ = sgp4_array(self.__constants, dates, dtype, out)
+        return (r, v)
+
+
+    def state(self, dates: numpy.ndarray, dtype=numpy.float64, out: tuple = None) -> tuple:
+        """各衛星・各日時における衛星の位置・速度とエラーコードを求める。
+
+        Args:
+            dates   (ndarray)   :   日時（UTC、datetime64）または基準日時からの経過日数 [day]
+            dtype               :   sgp4_array()と同じ
+            out     (tuple)     :   sgp4_array()と同じ
+        Returns:
+            sgp4_array()と同じ
+        """
+        return sgp4_array(self.__constants, dates, dtype, out)
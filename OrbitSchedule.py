@@ -0,0 +1,223 @@
+import logging
+import heapq
+import datetime
+
+import OrbitStation
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+MAX_EXACT_SIZE = 40     # 厳密解を分枝限定法で求める、競合する連結成分の最大のパス数
+
+
+###################################################################################################
+# 関数定義
+###################################################################################################
+
+def findConflicts(passes: list, satelliteExclusive: bool = True) -> list:
+    """同時に割り当てられないパスの組を、掃引線法で求める。
+
+    開始日時の順にパスを走査し、地上局（と衛星）ごとに終了日時のヒープで実行中のパスを管理する。
+    同じ地上局のパスは、時間帯が重なれば競合する（アンテナは同時に1衛星しか扱えない）。
+    satelliteExclusiveがTrueの場合は、同じ衛星のパスも、時間帯が重なれば競合する。
+    計算量は、パス数をn、競合の組の数をkとして O(n log n + k)。
+    Args:
+        passes              (list)  :   OrbitStation.Passのリスト
+        satelliteExclusive  (bool)  :   衛星も同時に1局としか交信しないとする場合はTrue
+    Returns:
+        (list)  :   パスごとの、競合するパスの番号の集合のリスト
+    """
+    conflicts = [set() for _ in passes]
+    active = {}     # 資源（地上局・衛星） → 実行中のパスの (終了日時, 番号) のヒープ
+    for k in sorted(range(len(passes)), key=lambda k: passes[k].begin):
+        p = passes[k]
+        resources = [('station', p.station)]
+        if satelliteExclusive:
+            resources.append(('satellite', p.satellite))
+        for resource in resources:
+            heap = active.setdefault(resource, [])
+            # 開始日時までに終わったパスを取り除き、残りと競合させる
+            while heap and heap[0][0] <= p.begin:
+                heapq.heappop(heap)
+            for _, other in heap:
+                conflicts[k].add(other)
+                conflicts[other].add(k)
+            heapq.heappush(heap, (p.end, k))
+    return conflicts
+
+
+def scheduleContacts(
+    passes              : list,
+    priorities                  = None,
+    mode                : str = 'greedy',
+    satelliteExclusive  : bool = True
+    ) -> list:
+    """競合しないパスの組み合わせのうち、優先度で重み付けした交信時間の合計が大きいものを選ぶ。
+
+    パスの重みは 衛星の優先度 × 継続時間 [sec] とする。
+    'greedy'は重みの大きい順に、選んだパスと競合しなければ採用する（O(n log n + k)）。
+    'exact'は競合の連結成分ごとに、重みの合計が最大の組み合わせを求める。1つの地上局だけの成分
+    （satelliteExclusiveがFalseの場合）は区間スケジューリングの動的計画法で、それ以外は分枝限定法で解く。
+    分枝限定法で解く成分がMAX_EXACT_SIZEを超える場合はValueErrorとする。
+    Args:
+        passes              (list)  :   OrbitStation.Passのリスト
+        priorities                  :   衛星の番号 → 優先度 の辞書または列。Noneの場合は全衛星1
+        mode                (str)   :   'greedy' または 'exact'
+        satelliteExclusive  (bool)  :   findConflicts()と同じ
+    Returns:
+        (list)  :   選んだOrbitStation.Passのリスト（開始日時の順）
+    """
+    if mode not in ('greedy', 'exact'):
+        raise ValueError('mode must be greedy or exact')
+    weights = [(1.0 if priorities is None else priorities[p.satellite]) * p.duration for p in passes]
+    conflicts = findConflicts(passes, satelliteExclusive)
+
+    if mode == 'greedy':
+        chosen = __greedy(range(len(passes)), weights, conflicts)
+    else:
+        chosen = []
+        for component in __components(conflicts):
+            if len(component) == 1:
+                chosen.extend(component)
+            elif not satelliteExclusive and len({passes[k].station for k in component}) == 1:
+                chosen.extend(__weightedIntervalScheduling(component, passes, weights))
+            elif len(component) <= MAX_EXACT_SIZE:
+                chosen.extend(__branchAndBound(component, weights, conflicts))
+            else:
+                raise ValueError('a conflicting group of {} passes is too large for the exact mode'.format(len(component)))
+
+    schedule = sorted((passes[k] for k in chosen), key=lambda p: (p.begin, p.station))
+    logger.debug('scheduleContacts: {} of {} passes, weight {}'.format(len(schedule), len(passes), sum(weights[k] for k in chosen)))
+    return schedule
+
+
+def schedulePasses(
+    tles                : list,
+    stations            : list,
+    beginDate           : datetime.datetime,
+    endDate             : datetime.datetime,
+    priorities                  = None,
+    mode                : str = 'greedy',
+    satelliteExclusive  : bool = True,
+    step                : float = 30.0,
+    backend             : str = 'meanMotion'
+    ) -> list:
+    """パスを予測し、地上局への交信の割り当てを求める。
+
+    Args:
+        tles～endDate           :   OrbitStation.findPasses()と同じ
+        priorities～satelliteExclusive  :   scheduleContacts()と同じ
+        step                    :   OrbitStation.findPasses()と同じ
+        backend                 :   OrbitStation.findPasses()と同じ
+    Returns:
+        (list)  :   選んだOrbitStation.Passのリスト（開始日時の順）
+    """
+    passes = OrbitStation.findPasses(tles, stations, beginDate, endDate, step=step, backend=backend)
+    return scheduleContacts(passes, priorities, mode, satelliteExclusive)
+
+
+def __greedy(candidates, weights: list, conflicts: list) -> list:
+    """重みの大きい順に、選んだパスと競合しなければ採用する。"""
+    chosen = []
+    blocked = set()
+    for k in sorted(candidates, key=lambda k: -weights[k]):
+        if k not in blocked:
+            chosen.append(k)
+            blocked.update(conflicts[k])
+    return chosen
+
+
+def __components(conflicts: list) -> list:
+    """競合の連結成分（パスの番号のリスト）を求める。"""
+    seen = [False] * len(conflicts)
+    components = []
+    for start in range(len(conflicts)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        component = [start]
+        stack = [start]
+        while stack:
+            for other in conflicts[stack.pop()]:
+                if not seen[other]:
+                    seen[other] = True
+                    component.append(other)
+                    stack.append(other)
+        components.append(component)
+    return components
+
+
+def __weightedIntervalScheduling(component: list, passes: list, weights: list) -> list:
+    """1つの資源を使うパスについて、重みの合計が最大の重ならない組み合わせを動的計画法で求める。"""
+    order = sorted(component, key=lambda k: passes[k].end)
+    ends = [passes[k].end for k in order]
+    best = [0.0] * (len(order) + 1)     # best[n] : 終了日時の順で先頭n個のパスから選んだ場合の最大値
+    previous = []
+    for n, k in enumerate(order):
+        # このパスの開始日時までに終わるパスの数（二分探索）
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ends[mid] <= passes[k].begin:
+                lo = mid + 1
+            else:
+                hi = mid
+        previous.append(lo)
+        best[n + 1] = max(best[n], best[lo] + weights[k])
+    chosen = []
+    n = len(order)
+    while n > 0:
+        if best[n] == best[n - 1]:
+            n -= 1
+        else:
+            chosen.append(order[n - 1])
+            n = previous[n - 1]
+    return chosen
+
+
+def __branchAndBound(component: list, weights: list, conflicts: list) -> list:
+    """競合グラフの最大重み独立集合を分枝限定法で求める。
+
+    重みの大きいパスから、採用する・しないで分枝する。残りの候補の重みの合計を上界とし、
+    貪欲法の解を初期の暫定解にする。
+    """
+    order = sorted(component, key=lambda k: -weights[k])
+    index = {k: n for n, k in enumerate(order)}
+    masks = [sum(1 << index[other] for other in conflicts[k]) for k in order]
+    w = [weights[k] for k in order]
+
+    initial = __greedy(component, weights, conflicts)
+    best = [sum(weights[k] for k in initial), sum(1 << index[k] for k in initial)]
+
+    def search(candidates: int, chosen: int, total: float, bound: float):
+        if total > best[0]:
+            best[0], best[1] = total, chosen
+        if candidates == 0 or total + bound <= best[0]:
+            return
+        n = (candidates & -candidates).bit_length() - 1     # 残りで最も重いパス
+        rest = candidates & ~(1 << n)
+        # 採用する（競合するパスを候補から除く）
+        removed = rest & masks[n]
+        search(rest & ~masks[n], chosen | (1 << n), total + w[n], bound - w[n] - sum(w[m] for m in __bits(removed)))
+        # 採用しない
+        search(rest, chosen, total, bound - w[n])
+
+    search((1 << len(order)) - 1, 0, 0.0, sum(w))
+    return [order[n] for n in __bits(best[1])]
+
+
+def __bits(mask: int):
+    """整数の立っているビットの位置を順に返す。"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
@@ -0,0 +1,385 @@
+import logging
+import json
+import asyncio
+import concurrent.futures
+import numpy
+
+import Orbit
+import OrbitStation
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+MAX_BODY_BYTES = 16 * 2 ** 20   # 受け付けるリクエストの本文の最大のバイト数
+MAX_POINTS = 10 ** 7            # 1つのリクエストで求める (衛星 × 時刻) の最大の点数
+ENCODE_CHUNK = 10 ** 4          # 応答をJSONに変換する1回あたりの点数（変換の合間にイベントループへGILを譲る）
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+###################################################################################################
+# クラス定義
+###################################################################################################
+
+class RequestError(Exception):
+    """クライアントに返すHTTPのエラー"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class PropagationService:
+    """伝搬計算をループバックのHTTP/JSONで提供するサービス。
+
+    以下のエンドポイントを持つ（日時はISO 8601の文字列、UTC）。
+        GET  /catalog   :   カタログの衛星番号と世代
+        POST /position  :   {"satellites": [衛星番号, ...], "dates": [日時, ...]} の経緯度
+        POST /track     :   {"satellites": [...], "begin": 日時, "end": 日時, "step": 秒} の経緯度
+        POST /passes    :   {"satellites": [...], "station": {"latitude", "longitude", "height", "minElevation"},
+                             "begin": 日時, "end": 日時} のパス
+    satellitesを省略した場合はカタログの全衛星とする。
+    同じカタログの世代・同じ日時の列に対する /position・/track のリクエストは、イベントループの
+    同じ反復の間（coalesceDelay秒）に届いたものをまとめ、衛星の和集合について1回の配列計算で求める。
+    計算と、大きくなる応答（/position・/track）のJSONへの変換はワーカーのスレッドプールで行い、イベントループを止めない。
+    """
+
+    def __init__(
+        self,
+        tles            : list,
+        host            : str = '127.0.0.1',
+        port            : int = 0,
+        backend         : str = 'meanMotion',
+        workers         : int = 4,
+        coalesceDelay   : float = 0.0
+        ):
+        """サービスを作成する。start()を呼ぶまで待ち受けない。
+
+        Args:
+            tles            (list)  :   カタログ（TwoLineElementsのリスト）
+            host            (str)   :   待ち受けるアドレス
+            port            (int)   :   待ち受けるポート。0の場合は空いているポート
+            backend         (str)   :   Orbit.createPropagator()と同じ
+            workers         (int)   :   計算に使うワーカーのスレッド数
+            coalesceDelay   (float) :   リクエストをまとめるために待つ時間 [sec]
+        """
+        self.__host = host
+        self.__port = port
+        self.__backend = backend
+        self.__coalesceDelay = coalesceDelay
+        self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self.__server = None
+        self.__pending = {}     # (世代, 日時の列) → [衛星番号の集合, asyncio.Future]
+        self.__requestNum = 0
+        self.__batchNum = 0
+        self.__generation = 0
+        self.setCatalog(tles)
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def address(self) -> tuple:
+        """待ち受けているアドレスとポート"""
+        return self.__server.sockets[0].getsockname()[:2]
+    @property
+    def generation(self) -> int:
+        return self.__generation
+    @property
+    def requestNum(self) -> int:
+        """受け付けた位置のリクエストの数"""
+        return self.__requestNum
+    @property
+    def batchNum(self) -> int:
+        """位置の計算を実行した回数"""
+        return self.__batchNum
+
+
+    ###############################################################################################
+    # メソッド
+    ###############################################################################################
+
+    def setCatalog(self, tles: list) -> None:
+        """カタログを入れ替える。以後のリクエストは新しい世代として計算する。
+
+        Args:
+            tles    (list)  :   TwoLineElementsのリスト
+        """
+        self.__catalog = {tle.satelliteNumber_int: tle for tle in tles}
+        self.__generation += 1
+
+
+    async def start(self) -> None:
+        """待ち受けを始める。"""
+        self.__server = await asyncio.start_server(self.__handle, self.__host, self.__port)
+        logger.info('PropagationService: listening on {}:{}'.format(*self.address))
+
+
+    async def close(self) -> None:
+        """待ち受けを終え、ワーカーを止める。"""
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+        self.__executor.shutdown(wait=True)
+
+
+    async def serveForever(self) -> None:
+        """待ち受けを始め、止められるまで処理を続ける。"""
+        await self.start()
+        try:
+            await self.__server.serve_forever()
+        finally:
+            await self.close()
+
+
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """1つの接続のリクエストを処理する（HTTP/1.1、応答後に接続を閉じる）。"""
+        try:
+            try:
+                method, path, body = await self.__readRequest(reader)
+                status, result = 200, await self.__dispatch(method, path, body)
+            except RequestError as e:
+                status, result = e.status, {'error': str(e)}
+            except Exception as e:
+                logger.exception('PropagationService: request failed')
+                status, result = 500, {'error': str(e)}
+            # 変換済みの応答（bytesのリスト）は、つなげずにそのまま書き込む
+            parts = result if isinstance(result, list) else [json.dumps(result).encode('utf-8')]
+            writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: close\r\n\r\n'.format(
+                status, STATUS_TEXT[status], sum(len(part) for part in parts)).encode('ascii'))
+            for part in parts:
+                writer.write(part)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+    @staticmethod
+    async def __readRequest(reader: asyncio.StreamReader) -> tuple:
+        """リクエスト行・ヘッダー・本文を読む。"""
+        try:
+            line = (await reader.readline()).decode('latin-1').split()
+            method, target = line[0].upper(), line[1]
+        except (IndexError, UnicodeDecodeError):
+            raise RequestError(400, 'malformed request line')
+        length = 0
+        while True:
+            header = (await reader.readline()).decode('latin-1').strip()
+            if not header:
+                break
+            name, _, value = header.partition(':')
+            if name.strip().lower() == 'content-length':
+                try:
+                    length = int(value)
+                except ValueError:
+                    raise RequestError(400, 'invalid Content-Length')
+        if length > MAX_BODY_BYTES:
+            raise RequestError(413, 'request body is too large')
+        body = await reader.readexactly(length) if length > 0 else b''
+        return (method, target.split('?', 1)[0], body)
+
+
+    async def __dispatch(self, method: str, path: str, body: bytes):
+        """パスに応じて処理を振り分ける。応答の辞書、またはJSONに変換済みの応答（bytesのリスト）を返す。"""
+        routes = {
+            '/catalog'  :   ('GET', self.__catalogQuery),
+            '/position' :   ('POST', self.__positionQuery),
+            '/track'    :   ('POST', self.__trackQuery),
+            '/passes'   :   ('POST', self.__passesQuery),
+        }
+        if path not in routes:
+            raise RequestError(404, 'unknown path {}'.format(path))
+        expected, handler = routes[path]
+        if method != expected:
+            raise RequestError(405, '{} requires {}'.format(path, expected))
+        if expected == 'GET':
+            return await handler()
+        try:
+            query = json.loads(body.decode('utf-8')) if body else {}
+        except (UnicodeDecodeError, ValueError):
+            raise RequestError(400, 'body must be JSON')
+        if not isinstance(query, dict):
+            raise RequestError(400, 'body must be a JSON object')
+        return await handler(query)
+
+
+    async def __catalogQuery(self) -> dict:
+        return {'generation': self.__generation, 'satellites': sorted(self.__catalog)}
+
+
+    async def __positionQuery(self, query: dict) -> list:
+        satellites = self.__satellites(query)
+        try:
+            days = Orbit.datetime64ToDays(numpy.array(query['dates'], dtype='datetime64[ns]'))
+        except (KeyError, TypeError, ValueError):
+            raise RequestError(400, 'dates must be a list of ISO 8601 strings')
+        return await self.__propagate(satellites, days)
+
+
+    async def __trackQuery(self, query: dict) -> list:
+        satellites = self.__satellites(query)
+        begin, end = self.__window(query)
+        step = query.get('step', 60.0)
+        if not isinstance(step, (int, float)) or step <= 0:
+            raise RequestError(400, 'step must be a positive number')
+        pointNum = int((end - begin) * 86400.0 / step + 1e-9) + 1
+        if pointNum * len(satellites) > MAX_POINTS:
+            raise RequestError(400, 'too many points')
+        return await self.__propagate(satellites, begin + numpy.arange(pointNum) * (step / 86400.0))
+
+
+    async def __passesQuery(self, query: dict) -> dict:
+        satellites = self.__satellites(query)
+        begin, end = self.__window(query)
+        try:
+            station = OrbitStation.GroundStation(**query['station'])
+        except (KeyError, TypeError, ValueError):
+            raise RequestError(400, 'station must have latitude, longitude and optionally height, minElevation, name')
+        tles = [self.__catalog[number] for number in satellites]
+        loop = asyncio.get_running_loop()
+        passes = await loop.run_in_executor(self.__executor, OrbitStation.findPasses, tles, [station], begin, end, 30.0, 0.1, self.__backend)
+        return {'passes': [{
+            'satellite'     :   satellites[p.satellite],
+            'begin'         :   str(p.beginDate),
+            'end'           :   str(p.endDate),
+            'maxElevation'  :   p.maxElevation,
+            } for p in passes]}
+
+
+    def __satellites(self, query: dict) -> list:
+        """リクエストの衛星番号のリストを確かめる。"""
+        satellites = query.get('satellites')
+        if satellites is None:
+            return sorted(self.__catalog)
+        if not isinstance(satellites, list) or not all(isinstance(s, int) for s in satellites):
+            raise RequestError(400, 'satellites must be a list of catalog numbers')
+        missing = [s for s in satellites if s not in self.__catalog]
+        if missing:
+            raise RequestError(404, 'satellites not in catalog: {}'.format(missing))
+        return satellites
+
+
+    @staticmethod
+    def __window(query: dict) -> tuple:
+        """リクエストの開始・終了日時を、基準日時からの経過日数にする。"""
+        try:
+            begin = float(Orbit.datetime64ToDays(numpy.datetime64(query['begin'], 'ns')))
+            end = float(Orbit.datetime64ToDays(numpy.datetime64(query['end'], 'ns')))
+        except (KeyError, TypeError, ValueError):
+            raise RequestError(400, 'begin and end must be ISO 8601 strings')
+        if end <= begin:
+            raise RequestError(400, 'end must be later than begin')
+        return (begin, end)
+
+
+    async def __propagate(self, satellites: list, days: numpy.ndarray) -> list:
+        """同じ世代・同じ日時の列のリクエストをまとめて計算し、このリクエストの衛星の行をJSONに変換して返す。"""
+        if len(satellites) * len(days) > MAX_POINTS:
+            raise RequestError(400, 'too many points')
+        self.__requestNum += 1
+        key = (self.__generation, days.tobytes())
+        entry = self.__pending.get(key)
+        if entry is None:
+            # 最初のリクエストが計算を予約し、予約が実行されるまでに届いたリクエストを相乗りさせる
+            # （予約した世代のカタログで計算するので、実行までにsetCatalog()が呼ばれても混ざらない）
+            entry = [set(), asyncio.get_running_loop().create_future()]
+            self.__pending[key] = entry
+            asyncio.ensure_future(self.__flush(key, days, self.__catalog))
+        entry[0].update(satellites)
+        numbers, phi, lam = await asyncio.shield(entry[1])
+        # 数千万点のリスト化・JSONへの変換には秒単位でかかるので、イベントループでは行わない
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, self.__encode, satellites, days, numbers, phi, lam)
+
+
+    async def __flush(self, key: tuple, days: numpy.ndarray, catalog: dict) -> None:
+        """予約された計算を、衛星の和集合について1回の配列計算で行う。
+
+        Args:
+            key     (tuple)     :   予約のキー (世代, 日時の列)
+            days    (ndarray)   :   日時（基準日時からの経過日数 [day]）
+            catalog (dict)      :   予約した世代のカタログ（衛星番号 → TwoLineElements）
+        """
+        await asyncio.sleep(self.__coalesceDelay)
+        satellites, future = self.__pending.pop(key)
+        numbers = numpy.array(sorted(satellites))
+        tles = [catalog[number] for number in numbers]
+        self.__batchNum += 1
+        try:
+            loop = asyncio.get_running_loop()
+            phi, lam = await loop.run_in_executor(self.__executor, self.__latLon, tles, days)
+            future.set_result((numbers, phi, lam))
+        except Exception as e:
+            future.set_exception(e)
+
+
+    def __latLon(self, tles: list, days: numpy.ndarray) -> tuple:
+        return Orbit.createPropagator(tles, self.__backend).latLon(days)
+
+
+    @staticmethod
+    def __encode(satellites: list, days: numpy.ndarray, numbers: numpy.ndarray, phi: numpy.ndarray, lam: numpy.ndarray) -> list:
+        """まとめて計算した結果から、リクエストの衛星の行を取り出してJSONに変換する。
+
+        json.dumps()・tolist()・numpy.datetime_as_string()は1回の呼び出しの間GILを手放さないので、
+        ワーカーのスレッドで実行しても数千万点を一度に変換するとイベントループが止まる。
+        ENCODE_CHUNK点ずつ変換して合間にGILを譲り、つなげずにバイト列のリストで返す
+        （つなげるとjson.dumps()で辞書全体を変換したものと同じになる）。
+        """
+        rows = numpy.searchsorted(numbers, satellites)
+        parts = [b'{"satellites": ', json.dumps(satellites).encode('utf-8'), b', "dates": ']
+        parts += PropagationService.__encodeArray(Orbit.daysToDatetime64(days))
+        for name, values in ((b'lat', phi), (b'lon', lam)):
+            parts.append(b', "' + name + b'": [')
+            for k, row in enumerate(rows):
+                if k > 0:
+                    parts.append(b', ')
+                parts += PropagationService.__encodeArray(values[row])
+            parts.append(b']')
+        parts.append(b'}')
+        return parts
+
+
+    @staticmethod
+    def __encodeArray(values: numpy.ndarray) -> list:
+        """1次元の配列を、ENCODE_CHUNK点ずつJSONの配列に変換したバイト列のリストにする（日時はISO 8601の文字列）。"""
+        parts = [b'[']
+        for begin in range(0, len(values), ENCODE_CHUNK):
+            if begin > 0:
+                parts.append(b', ')
+            chunk = values[begin:begin + ENCODE_CHUNK]
+            if numpy.issubdtype(chunk.dtype, numpy.datetime64):
+                chunk = numpy.datetime_as_string(chunk)
+            parts.append(json.dumps(chunk.tolist())[1:-1].encode('utf-8'))
+        parts.append(b']')
+        return parts
+
+
+###################################################################################################
+# 関数定義
+###################################################################################################
+
+def serve(tles: list, host: str = '127.0.0.1', port: int = 8080, backend: str = 'meanMotion', workers: int = 4) -> None:
+    """サービスを起動し、止められるまで処理を続ける。
+
+    Args:
+        tles～workers   :   PropagationService()と同じ
+    """
+    service = PropagationService(tles, host, port, backend, workers)
+    try:
+        asyncio.run(service.serveForever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,359 @@
+import logging
+import os
+import sys
+import mmap
+import json
+import numpy
+from multiprocessing import shared_memory
+
+# 共有メモリを読み取り専用でメモリマップするために、POSIXのshm_open()を直接呼ぶ（SharedCatalogReader.__attach()を参照）。
+# CPythonの非公開のモジュールなので、使えない場合は公開APIのSharedMemoryで接続する
+try:
+    import _posixshmem
+except ImportError:
+    _posixshmem = None
+
+import Orbit
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+CONTROL_BYTES = 8       # 制御ブロックの大きさ（世代番号 int64）
+ALIGNMENT = 64          # 配列の先頭の境界 [byte]
+MAX_RETRIES = 100       # 公開と読み込みが重なった場合に、読み込みをやり直す回数の上限
+
+# 軌道要素の配列の行（Orbit.MeanMotionPropagatorと同じ並び）
+ELEMENT_NAMES = ('epochDays', 'argumentOfPerigee', 'inclination', 'raan', 'eccentricity', 'meanAnomaly', 'meanMotion', 'firstDerivativeMeanMotion')
+
+
+###################################################################################################
+# クラス定義
+###################################################################################################
+
+class SharedCatalog:
+    """TLEのカタログを共有メモリに公開する側（1つのプロセスだけが持つ）。
+
+    衛星番号、軌道要素の列（(8, 衛星数) のfloat64）、SGP4/SDP4の定数（(定数の数, 衛星数) のfloat64）を
+    世代ごとの共有メモリ「名前_g世代」に書き、書き終えてから制御ブロック「名前」の世代番号を更新する。
+    読む側（SharedCatalogReader）は世代番号で新しい世代を見つけて、コピーせずに読み取り専用で参照する。
+    古い世代は新しい世代を公開したときに削除する（参照中のプロセスの割り当ては残る）。
+    """
+
+    def __init__(self, name: str, tles: list = None, sgp4: bool = True):
+        """制御ブロックを作成する。tlesを指定した場合は最初の世代として公開する。
+
+        Args:
+            name    (str)   :   共有メモリの名前
+            tles    (list)  :   TwoLineElementsのリスト
+            sgp4    (bool)  :   SGP4/SDP4の定数も求めて公開する場合はTrue
+        """
+        self.__name = name
+        self.__sgp4 = sgp4
+        self.__control = shared_memory.SharedMemory(name=name, create=True, size=CONTROL_BYTES)
+        self.__generationArray = numpy.ndarray((1,), dtype=numpy.int64, buffer=self.__control.buf)
+        self.__generationArray[0] = 0
+        self.__segment = None
+        if tles is not None:
+            self.publish(tles)
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def name(self) -> str:
+        return self.__name
+    @property
+    def generation(self) -> int:
+        return int(self.__generationArray[0])
+
+
+    ###############################################################################################
+    # メソッド
+    ###############################################################################################
+
+    def publish(self, tles: list) -> int:
+        """カタログを新しい世代として公開する。
+
+        Args:
+            tles    (list)  :   TwoLineElementsのリスト
+        Returns:
+            (int)   :   公開した世代番号
+        """
+        arrays = {
+            'satelliteNumbers'  :   numpy.array([tle.satelliteNumber_int for tle in tles], dtype=numpy.int64),
+            'elements'          :   numpy.array([[
+                Orbit.datetimeToDays(tle.epoch_datetime),
+                tle.argumentOfPerigee_float,
+                tle.inclination_float,
+                tle.raan_float,
+                tle.eccentricity_float,
+                tle.meanAnomaly_float,
+                tle.meanMotion_float,
+                tle.firstDerivativeMeanMotion_float
+                ] for tle in tles], dtype=numpy.float64).reshape(-1, len(ELEMENT_NAMES)).T,
+        }
+        constantNames = []
+        if self.__sgp4:
+            import OrbitSGP4
+            constants = OrbitSGP4.sgp4Constants(tles)
+            constantNames = list(OrbitSGP4.CONSTANT_NAMES)
+            arrays['constants'] = numpy.array([constants[k] for k in constantNames], dtype=numpy.float64).reshape(len(constantNames), len(tles))
+
+        # 見出し（JSON）と配列の配置を決める
+        generation = self.generation + 1
+        layout = {}
+        offset = 0
+        for key, array in arrays.items():
+            layout[key] = [array.dtype.str, list(array.shape), offset]
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        header = json.dumps({'generation': generation, 'arrays': layout, 'constantNames': constantNames}).encode('utf-8')
+        base = -(-(8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+        # 新しい世代を書き終えてから世代番号を更新する
+        segment = shared_memory.SharedMemory(name=segmentName(self.__name, generation), create=True, size=max(1, base + offset))
+        numpy.ndarray((1,), dtype=numpy.uint64, buffer=segment.buf)[0] = len(header)
+        segment.buf[8:8 + len(header)] = header
+        for key, array in arrays.items():
+            numpy.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf, offset=base + layout[key][2])[...] = array
+        self.__generationArray[0] = generation
+
+        if self.__segment is not None:
+            self.__segment.close()
+            self.__segment.unlink()
+        self.__segment = segment
+        logger.debug('SharedCatalog: published generation {} ({} satellites)'.format(generation, len(tles)))
+        return generation
+
+
+    def close(self) -> None:
+        """共有メモリを削除する。"""
+        if self.__segment is not None:
+            self.__segment.close()
+            self.__segment.unlink()
+            self.__segment = None
+        self.__generationArray = None
+        self.__control.close()
+        self.__control.unlink()
+
+
+class SharedCatalogReader:
+    """共有メモリに公開されたカタログを読み取り専用で参照する側（ワーカーごとに持つ）。
+
+    共有メモリを読み取り専用でメモリマップし、配列はそれをそのまま参照する（コピーしない）numpy配列とする。
+    refresh()を呼ぶまでは参照している世代が変わらない。配列はメモリマップを保持しているので、
+    refresh()・close()の後も、配列を持っている間は古い世代の内容を読める。
+    """
+
+    # _posixshmemが使えない場合にSharedMemoryで接続した共有メモリ（配列が参照している間は閉じられないので保持する）
+    __attached = []
+
+    def __init__(self, name: str):
+        """制御ブロックに接続し、最新の世代を参照する。
+
+        Args:
+            name    (str)   :   SharedCatalog()と同じ共有メモリの名前
+        """
+        self.__name = name
+        self.__generationArray = numpy.frombuffer(self.__attach(name), dtype=numpy.int64, count=1)
+        self.__arrays = {}
+        self.__constantNames = []
+        self.__generation = 0
+        self.refresh()
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def generation(self) -> int:
+        """参照している世代番号"""
+        return self.__generation
+    @property
+    def latestGeneration(self) -> int:
+        """公開されている最新の世代番号"""
+        return int(self.__generationArray[0])
+    @property
+    def satelliteNumbers(self) -> numpy.ndarray:
+        return self.__arrays['satelliteNumbers']
+    @property
+    def satelliteNum(self) -> int:
+        return len(self.__arrays['satelliteNumbers'])
+    @property
+    def elements(self) -> numpy.ndarray:
+        """軌道要素の列、形状は (8, 衛星数)（行の並びはELEMENT_NAMES）"""
+        return self.__arrays['elements']
+    @property
+    def constants(self) -> dict:
+        """SGP4/SDP4の定数（OrbitSGP4.sgp4Constants()と同じ形式）"""
+        if 'constants' not in self.__arrays:
+            raise ValueError('the catalog was published without SGP4 constants')
+        return dict(zip(self.__constantNames, self.__arrays['constants']))
+
+
+    ###############################################################################################
+    # メソッド
+    ###############################################################################################
+
+    @staticmethod
+    def __attach(name: str):
+        """既存の共有メモリを読み取り専用で参照するバッファを作る。
+
+        SharedMemoryは読み書き可能でしか接続できず、3.12以前は接続したプロセスが resource_tracker に登録されて
+        このプロセスの終了時に公開する側の共有メモリが削除されてしまい、また配列を持ったままでは閉じられない。
+        そこで、読み取り専用のメモリマップを直接作る。削除は公開する側が行う。
+        """
+        if os.name == 'nt':
+            # 大きさを調べるためだけにSharedMemoryで開く（Windowsでは resource_tracker を使わない）
+            memory = shared_memory.SharedMemory(name=name)
+            size = memory.size
+            memory.close()
+            return mmap.mmap(-1, size, tagname=name, access=mmap.ACCESS_READ)
+        if _posixshmem is None:
+            return SharedCatalogReader.__attachSharedMemory(name)
+        fd = _posixshmem.shm_open('/' + name, os.O_RDONLY, mode=0o600)
+        try:
+            return mmap.mmap(fd, os.fstat(fd).st_size, prot=mmap.PROT_READ)
+        finally:
+            os.close(fd)
+
+
+    @staticmethod
+    def __attachSharedMemory(name: str) -> memoryview:
+        """公開APIのSharedMemoryで接続し、読み取り専用のバッファを返す（_posixshmemが使えない場合の代わり）。
+
+        メモリマップは読み書き可能なので、配列の側を読み取り専用にする。配列が参照している間は閉じられないので
+        接続した共有メモリを保持し、次に接続するときに参照されなくなったものを閉じる。
+        """
+        attached = SharedCatalogReader.__attached
+        for memory in list(attached):
+            try:
+                memory.close()
+            except BufferError:
+                continue
+            attached.remove(memory)
+        options = {'track': False} if sys.version_info >= (3, 13) else {}
+        memory = shared_memory.SharedMemory(name=name, **options)
+        attached.append(memory)
+        return memory.buf.toreadonly()
+
+
+    def refresh(self) -> bool:
+        """新しい世代が公開されていれば、そちらを参照する。
+
+        Returns:
+            (bool)  :   参照する世代が変わった場合はTrue
+        """
+        for _ in range(MAX_RETRIES):
+            generation = self.latestGeneration
+            if generation == self.__generation:
+                return False
+            if generation == 0:
+                raise ValueError('no catalog has been published to {}'.format(self.__name))
+            try:
+                segment = self.__attach(segmentName(self.__name, generation))
+            except FileNotFoundError:
+                # 接続する前に次の世代が公開されて削除された
+                continue
+            length = int(numpy.frombuffer(segment, dtype=numpy.uint64, count=1)[0])
+            header = json.loads(bytes(segment[8:8 + length]).decode('utf-8'))
+            base = -(-(8 + length) // ALIGNMENT) * ALIGNMENT
+            arrays = {}
+            for key, (dtype, shape, offset) in header['arrays'].items():
+                count = int(numpy.prod(shape))
+                arrays[key] = numpy.frombuffer(segment, dtype=numpy.dtype(dtype), count=count, offset=base + offset).reshape(shape)
+            self.__arrays = arrays
+            self.__constantNames = header['constantNames']
+            self.__generation = header['generation']
+            logger.debug('SharedCatalogReader: attached generation {}'.format(self.__generation))
+            return True
+        raise RuntimeError('the catalog kept changing while attaching')
+
+
+    def index(self, satelliteNumbers) -> numpy.ndarray:
+        """衛星番号から、配列の列の番号を求める。
+
+        Args:
+            satelliteNumbers    :   衛星番号（整数またはその列）
+        Returns:
+            (ndarray)   :   列の番号
+        """
+        numbers = self.satelliteNumbers
+        order = numpy.argsort(numbers)
+        position = numpy.searchsorted(numbers, satelliteNumbers, sorter=order)
+        position = numpy.minimum(position, len(numbers) - 1)
+        found = order[position]
+        if numpy.any(numbers[found] != satelliteNumbers):
+            raise ValueError('satellites not in catalog')
+        return found
+
+
+    def xyz(self, dates: numpy.ndarray, backend: str = 'meanMotion', satellites: numpy.ndarray = None) -> numpy.ndarray:
+        """共有メモリの要素から、各衛星・各日時における地球中心の衛星の三次元座標を求める。
+
+        Args:
+            dates       (ndarray)   :   日時（UTC、datetime64）または基準日時からの経過日数 [day]
+            backend     (str)       :   'meanMotion' または 'sgp4'（Orbit.createPropagator()と同じ）
+            satellites  (ndarray)   :   計算する衛星の列の番号（index()を参照）。Noneの場合は全衛星
+        Returns:
+            (ndarray)   :   衛星の三次元座標 (x, y, z) [km]、形状は (衛星数,) + dates.shape + (3,)
+        """
+        days = numpy.asarray(Orbit.asDays(dates))
+        if backend == 'meanMotion':
+            elements = self.elements if satellites is None else self.elements[:, satellites]
+            columns = elements.reshape((len(ELEMENT_NAMES), elements.shape[1]) + (1,) * days.ndim)
+            return Orbit.orbitalElementToXYZ_array(*columns, dates=days)
+        if backend == 'sgp4':
+            import OrbitSGP4
+            constants = self.constants
+            if satellites is not None:
+                constants = {key: value[satellites] for key, value in constants.items()}
+            r, _, _ = OrbitSGP4.sgp4_array(constants, days)
+            return r
+        raise ValueError('backend must be meanMotion or sgp4')
+
+
+    def latLon(self, dates: numpy.ndarray, backend: str = 'meanMotion', satellites: numpy.ndarray = None) -> tuple:
+        """共有メモリの要素から、各衛星・各日時における衛星位置の経緯度を求める。
+
+        Args:
+            xyz()と同じ
+        Returns:
+            phi     (ndarray)   :   緯度 [deg]、形状は (衛星数,) + dates.shape
+            lam     (ndarray)   :   経度 [deg]、形状は (衛星数,) + dates.shape
+        """
+        days = numpy.asarray(Orbit.asDays(dates))
+        return Orbit.xyzToLatLon_array(self.xyz(days, backend, satellites), days)
+
+
+    def close(self) -> None:
+        """共有メモリから切り離す（この後に参照できるのは、呼び出し側が持っている配列だけ）。"""
+        self.__arrays = {}
+        self.__generationArray = None
+
+
+###################################################################################################
+# 関数定義
+###################################################################################################
+
+def segmentName(name: str, generation: int) -> str:
+    """世代ごとの共有メモリの名前を求める。
+
+    Args:
+        name        (str)   :   SharedCatalog()の共有メモリの名前
+        generation  (int)   :   世代番号
+    Returns:
+        (str)   :   共有メモリの名前
+    """
+    return '{}_g{}'.format(name, generation)
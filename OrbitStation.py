@@ -0,0 +1,380 @@
+import logging
+import math
+import datetime
+import numpy
+
+import Orbit
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+WGS84_A = 6378.137                      # 赤道半径 [km]
+WGS84_F = 1 / 298.257223563             # 扁平率
+WGS84_E2 = WGS84_F * (2 - WGS84_F)      # 離心率の2乗
+EARTH_ROTATION = math.radians(360.98564724) / 86400.0   # 地球の自転角速度 [rad / s]（Orbit.siderealTime()の進みと同じ）
+
+
+###################################################################################################
+# クラス定義
+###################################################################################################
+
+class GroundStation:
+    """地上局（アンテナ）の位置と最低仰角。
+    """
+
+    def __init__(self, latitude: float, longitude: float, height: float = 0.0, minElevation: float = 0.0, name: str = ''):
+        """地上局を作成する。
+
+        Args:
+            latitude        (float) :   緯度（WGS84の地理緯度） [deg]
+            longitude       (float) :   経度 [deg]
+            height          (float) :   楕円体高 [m]
+            minElevation    (float) :   可視とみなす最低仰角 [deg]
+            name            (str)   :   局名
+        """
+        if not -90 <= latitude <= 90:
+            raise ValueError('latitude must be between -90 and 90')
+        self.__latitude = latitude
+        self.__longitude = longitude
+        self.__height = height
+        self.__minElevation = minElevation
+        self.__name = name
+
+        # 地球に固定した座標系（ECEF）での位置 [km] と、東・北・天頂方向の単位ベクトル
+        phi = math.radians(latitude)
+        lam = math.radians(longitude)
+        N = WGS84_A / math.sqrt(1 - WGS84_E2 * math.sin(phi) ** 2)
+        h = height / 1000.0
+        self.__xyz = numpy.array([
+            (N + h) * math.cos(phi) * math.cos(lam),
+            (N + h) * math.cos(phi) * math.sin(lam),
+            (N * (1 - WGS84_E2) + h) * math.sin(phi)])
+        self.__enu = numpy.array([
+            [-math.sin(lam), math.cos(lam), 0.0],
+            [-math.sin(phi) * math.cos(lam), -math.sin(phi) * math.sin(lam), math.cos(phi)],
+            [math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi)]])
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def latitude(self) -> float:
+        return self.__latitude
+    @property
+    def longitude(self) -> float:
+        return self.__longitude
+    @property
+    def height(self) -> float:
+        return self.__height
+    @property
+    def minElevation(self) -> float:
+        return self.__minElevation
+    @property
+    def name(self) -> str:
+        return self.__name
+    @property
+    def xyz(self) -> numpy.ndarray:
+        """地球に固定した座標系（ECEF）での位置 (x, y, z) [km]"""
+        return self.__xyz
+    @property
+    def enu(self) -> numpy.ndarray:
+        """東・北・天頂方向の単位ベクトル（行）を並べた回転行列"""
+        return self.__enu
+
+
+class Pass:
+    """ある地上局から、ある衛星が最低仰角以上に見える時間帯（パス）。
+    """
+
+    def __init__(self, satellite: int, station: int, begin: float, end: float, maxElevation: float):
+        """パスを作成する。
+
+        Args:
+            satellite       (int)   :   衛星の番号（findPasses()に渡したTLEのリストでの位置）
+            station         (int)   :   地上局の番号（findPasses()に渡した地上局のリストでの位置）
+            begin           (float) :   開始日時（基準日時からの経過日数 [day]）
+            end             (float) :   終了日時（基準日時からの経過日数 [day]）
+            maxElevation    (float) :   最大仰角 [deg]
+        """
+        self.__satellite = satellite
+        self.__station = station
+        self.__begin = begin
+        self.__end = end
+        self.__maxElevation = maxElevation
+
+
+    def __repr__(self) -> str:
+        return 'Pass(satellite={}, station={}, begin={}, end={}, maxElevation={:.1f})'.format(
+            self.__satellite, self.__station, self.beginDate, self.endDate, self.__maxElevation)
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def satellite(self) -> int:
+        return self.__satellite
+    @property
+    def station(self) -> int:
+        return self.__station
+    @property
+    def begin(self) -> float:
+        return self.__begin
+    @property
+    def end(self) -> float:
+        return self.__end
+    @property
+    def beginDate(self) -> numpy.datetime64:
+        return Orbit.daysToDatetime64(self.__begin)
+    @property
+    def endDate(self) -> numpy.datetime64:
+        return Orbit.daysToDatetime64(self.__end)
+    @property
+    def duration(self) -> float:
+        """継続時間 [sec]"""
+        return (self.__end - self.__begin) * 86400.0
+    @property
+    def maxElevation(self) -> float:
+        return self.__maxElevation
+
+
+###################################################################################################
+# 関数定義
+###################################################################################################
+
+def __topocentric(xyz: numpy.ndarray, dates: numpy.ndarray, station: GroundStation) -> tuple:
+    """衛星の三次元座標（赤道座標系）を、地上局からの視線ベクトルの東・北・天頂の成分と距離に変換する。"""
+    theta_G = numpy.radians(Orbit.siderealTime_array(dates))
+    cos_G = numpy.cos(theta_G)
+    sin_G = numpy.sin(theta_G)
+    dX = xyz[..., 0] * cos_G + xyz[..., 1] * sin_G - station.xyz[0]
+    dY = -xyz[..., 0] * sin_G + xyz[..., 1] * cos_G - station.xyz[1]
+    dZ = xyz[..., 2] - station.xyz[2]
+    east, north, up = (m[0] * dX + m[1] * dY + m[2] * dZ for m in station.enu)
+    return (east, north, up, numpy.sqrt(dX ** 2 + dY ** 2 + dZ ** 2))
+
+
+def elevation_array(xyz: numpy.ndarray, dates: numpy.ndarray, station: GroundStation) -> numpy.ndarray:
+    """衛星の三次元座標（赤道座標系）から、地上局から見た仰角を求める（配列版）。
+
+    Args:
+        xyz         (ndarray)       :   衛星の三次元座標 (x, y, z) [km]、形状は (..., len(dates), 3)
+        dates       (ndarray)       :   各座標の日時（UTC、datetime64）。基準日時からの経過日数 [day] も可
+        station     (GroundStation) :   地上局
+    Returns:
+        (ndarray)   :   仰角 [deg]
+    """
+    _, _, up, distance = __topocentric(xyz, dates, station)
+    return numpy.degrees(numpy.arcsin(up / distance))
+
+
+def lookAngles_array(
+    xyz         : numpy.ndarray,
+    velocity    : numpy.ndarray,
+    dates       : numpy.ndarray,
+    station     : GroundStation
+    ) -> tuple:
+    """衛星の三次元座標と速度（赤道座標系）から、地上局から見た方位角・仰角・距離・距離変化率を求める（配列版）。
+
+    グリニッジ恒星時で地球に固定した座標系へ回転し（速度は自転の分を差し引く）、地上局からの視線ベクトルを
+    東・北・天頂の成分に分解する。距離変化率は視線方向の相対速度で、差分ではなく速度から解析的に求める。
+    Args:
+        xyz         (ndarray)       :   衛星の三次元座標 (x, y, z) [km]、形状は (..., len(dates), 3)
+        velocity    (ndarray)       :   衛星の速度 (vx, vy, vz) [km/s]、形状はxyzと同じ
+        dates       (ndarray)       :   各座標の日時（UTC、datetime64）。基準日時からの経過日数 [day] も可
+        station     (GroundStation) :   地上局
+    Returns:
+        azimuth     (ndarray)       :   方位角（北から東回り） [deg]、0～360
+        elevation   (ndarray)       :   仰角 [deg]
+        distance    (ndarray)       :   距離 [km]
+        rangeRate   (ndarray)       :   距離変化率 [km/s]（遠ざかる向きが正）
+    """
+    theta_G = numpy.radians(Orbit.siderealTime_array(dates))
+    cos_G = numpy.cos(theta_G)
+    sin_G = numpy.sin(theta_G)
+
+    # 地球に固定した座標系での衛星の位置と速度
+    X = xyz[..., 0] * cos_G + xyz[..., 1] * sin_G
+    Y = -xyz[..., 0] * sin_G + xyz[..., 1] * cos_G
+    Z = xyz[..., 2]
+    VX = velocity[..., 0] * cos_G + velocity[..., 1] * sin_G + EARTH_ROTATION * Y
+    VY = -velocity[..., 0] * sin_G + velocity[..., 1] * cos_G - EARTH_ROTATION * X
+    VZ = velocity[..., 2]
+
+    # 地上局からの視線ベクトル
+    dX = X - station.xyz[0]
+    dY = Y - station.xyz[1]
+    dZ = Z - station.xyz[2]
+    distance = numpy.sqrt(dX ** 2 + dY ** 2 + dZ ** 2)
+    rangeRate = (dX * VX + dY * VY + dZ * VZ) / distance
+
+    # 東・北・天頂の成分
+    east, north, up = (m[0] * dX + m[1] * dY + m[2] * dZ for m in station.enu)
+    azimuth = numpy.degrees(numpy.arctan2(east, north)) % 360
+    elevation = numpy.degrees(numpy.arcsin(up / distance))
+    return (azimuth, elevation, distance, rangeRate)
+
+
+def lookAngleTable(
+    tle         : Orbit.TwoLineElements,
+    station     : GroundStation,
+    beginDate   : datetime.datetime,
+    endDate     : datetime.datetime,
+    rate        : float = 10.0,
+    backend     : str = 'meanMotion'
+    ) -> tuple:
+    """パスの時間帯について、アンテナ制御用の方位角・仰角・距離・距離変化率の表を求める。
+
+    Args:
+        tle         (TwoLineElements)   :   TLE
+        station     (GroundStation)     :   地上局
+        beginDate   (datetime)          :   開始日時（UTC）
+        endDate     (datetime)          :   終了日時（UTC）。この日時も含む
+        rate        (float)             :   1秒あたりの点数 [Hz]
+        backend     (str)               :   Orbit.createPropagator()と同じ
+    Returns:
+        dates       (ndarray)           :   日時（UTC、datetime64[ns]）
+        azimuth～rangeRate              :   lookAngles_array()と同じ
+    """
+    begin = Orbit.asDays(beginDate)
+    end = Orbit.asDays(endDate)
+    if end < begin:
+        raise ValueError('endDate must not be earlier than beginDate')
+    if rate <= 0:
+        raise ValueError('rate must be positive')
+    pointNum = int(math.floor((end - begin) * 86400.0 * rate + 1e-6)) + 1
+    days = begin + numpy.arange(pointNum) / (rate * 86400.0)
+    xyz, velocity = Orbit.createPropagator([tle], backend).xyzVelocity(days)
+    azimuth, elevation, distance, rangeRate = lookAngles_array(xyz[0], velocity[0], days, station)
+    logger.debug('lookAngleTable: {} points'.format(pointNum))
+    return (Orbit.daysToDatetime64(days), azimuth, elevation, distance, rangeRate)
+
+
+def findPasses(
+    tles        : list,
+    stations    : list,
+    beginDate   : datetime.datetime,
+    endDate     : datetime.datetime,
+    step        : float = 30.0,
+    tolerance   : float = 0.1,
+    backend     : str = 'meanMotion'
+    ) -> list:
+    """各衛星・各地上局のパス（最低仰角以上に見える時間帯）を求める。
+
+    全衛星の位置を刻み幅ごとにまとめて求めて、仰角が最低仰角をまたぐ区間を見つけ、
+    その区間を二分して開始・終了日時を許容誤差まで詰める。刻み幅より短いパスは見落とすことがある。
+    最大仰角は、刻み幅ごとの仰角が最大の点の前後の区間を黄金分割探索で許容誤差まで詰めて求める。
+    期間の始め・終わりにかかるパスは、期間の端で切る。
+    Args:
+        tles        (list)      :   TwoLineElementsのリスト
+        stations    (list)      :   GroundStationのリスト
+        beginDate   (datetime)  :   開始日時（UTC）
+        endDate     (datetime)  :   終了日時（UTC）
+        step        (float)     :   仰角を調べる刻み幅 [sec]
+        tolerance   (float)     :   開始・終了日時と最大仰角の日時の許容誤差 [sec]
+        backend     (str)       :   Orbit.createPropagator()と同じ
+    Returns:
+        (list)  :   Passのリスト（開始日時の順）
+    """
+    begin = Orbit.asDays(beginDate)
+    end = Orbit.asDays(endDate)
+    if end <= begin:
+        raise ValueError('endDate must be later than beginDate')
+    if step <= 0:
+        raise ValueError('step must be positive')
+    pointNum = int(math.ceil((end - begin) * 86400.0 / step)) + 1
+    days = numpy.minimum(begin + numpy.arange(pointNum) * (step / 86400.0), end)
+    xyz = Orbit.createPropagator(tles, backend).xyz(days)   # (衛星数, 点数, 3)
+
+    passes = []
+    for j, station in enumerate(stations):
+        elevation = elevation_array(xyz, days, station)
+        above = elevation >= station.minElevation
+        # 見え始め・見えなくなる区間（前後の点の番号）
+        change = numpy.diff(above.astype(numpy.int8), axis=1)
+        for i in numpy.flatnonzero(change.any(axis=1) | above[:, 0]):
+            rises = numpy.flatnonzero(change[i] > 0)
+            sets = numpy.flatnonzero(change[i] < 0)
+            propagator = Orbit.createPropagator([tles[i]], backend)
+            riseDays = __refineCrossing(propagator, station, days[rises], days[rises + 1], True, tolerance)
+            setDays = __refineCrossing(propagator, station, days[sets], days[sets + 1], False, tolerance)
+            if above[i, 0]:
+                riseDays = numpy.concatenate(([begin], riseDays))
+                rises = numpy.concatenate(([-1], rises))
+            if above[i, -1]:
+                setDays = numpy.append(setDays, end)
+                sets = numpy.append(sets, pointNum - 1)
+            # 刻み幅ごとの仰角が最大の点の前後の区間（パスの開始・終了日時の内側）で最大仰角を詰める
+            peaks = numpy.array([k0 + 1 + numpy.argmax(elevation[i, k0 + 1:k1 + 1]) for k0, k1 in zip(rises, sets)], dtype=numpy.int64)
+            lower = numpy.maximum(days[numpy.maximum(peaks - 1, 0)], riseDays)
+            upper = numpy.minimum(days[numpy.minimum(peaks + 1, pointNum - 1)], setDays)
+            maxElevations = numpy.maximum(__refinePeak(propagator, station, lower, upper, tolerance), elevation[i, peaks])
+            for riseDay, setDay, maxElevation in zip(riseDays, setDays, maxElevations):
+                passes.append(Pass(int(i), j, float(riseDay), float(setDay), float(maxElevation)))
+    passes.sort(key=lambda p: (p.begin, p.station, p.satellite))
+    logger.debug('findPasses: {} passes'.format(len(passes)))
+    return passes
+
+
+def __refineCrossing(
+    propagator  : Orbit.Propagator,
+    station     : GroundStation,
+    lower       : numpy.ndarray,
+    upper       : numpy.ndarray,
+    rising      : bool,
+    tolerance   : float
+    ) -> numpy.ndarray:
+    """仰角が最低仰角をまたぐ区間を二分して、またぐ日時を求める（1衛星の全区間をまとめて計算する）。"""
+    lower = lower.copy()
+    upper = upper.copy()
+    while len(lower) > 0 and (upper - lower).max() * 86400.0 > tolerance:
+        middle = (lower + upper) / 2
+        above = elevation_array(propagator.xyz(middle)[0], middle, station) >= station.minElevation
+        # 見え始めなら中点が見えていれば前半、見えなくなるなら中点が見えていれば後半に絞る
+        first = above if rising else ~above
+        upper = numpy.where(first, middle, upper)
+        lower = numpy.where(first, lower, middle)
+    return (lower + upper) / 2
+
+
+def __refinePeak(
+    propagator  : Orbit.Propagator,
+    station     : GroundStation,
+    lower       : numpy.ndarray,
+    upper       : numpy.ndarray,
+    tolerance   : float
+    ) -> numpy.ndarray:
+    """最大仰角を含む区間を黄金分割探索で詰めて、最大仰角を求める（1衛星の全区間をまとめて計算する）。"""
+    def elevation(days):
+        return elevation_array(propagator.xyz(days)[0], days, station)
+
+    ratio = (math.sqrt(5) - 1) / 2
+    lower = lower.copy()
+    upper = upper.copy()
+    left = upper - ratio * (upper - lower)
+    right = lower + ratio * (upper - lower)
+    leftElevation = elevation(left)
+    rightElevation = elevation(right)
+    while len(lower) > 0 and (upper - lower).max() * 86400.0 > tolerance:
+        # 左の点の方が高ければ [lower, right]、そうでなければ [left, upper] に絞り、新しい点だけを計算する
+        first = leftElevation > rightElevation
+        upper = numpy.where(first, right, upper)
+        lower = numpy.where(first, lower, left)
+        middle = numpy.where(first, upper - ratio * (upper - lower), lower + ratio * (upper - lower))
+        middleElevation = elevation(middle)
+        left, right = numpy.where(first, middle, right), numpy.where(first, left, middle)
+        leftElevation, rightElevation = (numpy.where(first, middleElevation, rightElevation),
+                                         numpy.where(first, leftElevation, middleElevation))
+    return numpy.maximum(leftElevation, rightElevation)
@@ -0,0 +1,174 @@
+import logging
+import os
+import json
+import hashlib
+import tempfile
+import datetime
+import numpy
+
+import Orbit
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# クラス定義
+###################################################################################################
+
+class EphemerisTileStore:
+    """衛星の三次元座標を固定長の時間タイルごとにファイルへ保存し、メモリマップで読み出すストア。
+
+    タイルは「バックエンドとTLEの内容（元期番号を含む）ごとのディレクトリ / タイル番号.npy」に保存する。
+    タイル番号は1970-01-01T00:00:00 UTCからの経過時間をタイル長で割った商で、
+    各タイルはタイルの開始日時から刻み幅ごとの (点数, 3) の配列（赤道座標系 [km]）を持つ。
+    読み出し時に無いタイルはストアのバックエンド（Orbit.createPropagator()）で計算して書き込むので、
+    複数のプロセス・複数回の実行の間で同じ計算を繰り返さない。
+    書き込みは一時ファイルに書いてから置き換えるので、並行して読み書きしても壊れたタイルは見えない。
+    """
+
+    def __init__(self, directory: str, step: float = 60.0, tileLength: float = 86400.0, backend: str = 'meanMotion'):
+        """ストアを開く。ディレクトリが無ければ作成する。
+
+        Args:
+            directory   (str)   :   保存先のディレクトリ
+            step        (float) :   刻み幅 [sec]。1秒の整数倍
+            tileLength  (float) :   タイル長 [sec]。刻み幅の整数倍
+            backend     (str)   :   伝搬計算のバックエンド（Orbit.createPropagator()と同じ）
+        """
+        if step <= 0 or step != int(step):
+            raise ValueError('step must be a positive whole number of seconds')
+        if tileLength <= 0 or tileLength % step != 0:
+            raise ValueError('tileLength must be a multiple of step')
+        self.__directory = directory
+        self.__step = numpy.timedelta64(int(step), 's').astype('timedelta64[ns]')
+        self.__tileLength = numpy.timedelta64(int(tileLength), 's').astype('timedelta64[ns]')
+        self.__pointNum = int(tileLength // step)
+        self.__backend = backend
+        os.makedirs(directory, exist_ok=True)
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def directory(self) -> str:
+        return self.__directory
+    @property
+    def step(self) -> numpy.timedelta64:
+        return self.__step
+    @property
+    def tileLength(self) -> numpy.timedelta64:
+        return self.__tileLength
+    @property
+    def backend(self) -> str:
+        return self.__backend
+
+
+    ###############################################################################################
+    # メソッド
+    ###############################################################################################
+
+    def tleKey(self, tle: Orbit.TwoLineElements) -> str:
+        """TLEの内容からタイルの保存先ディレクトリ名を求める。
+
+        衛星番号・元期番号・バックエンドに、TLEの内容と刻み幅のハッシュを付けた名前とする。
+        バックエンドが異なるストアは、同じディレクトリでも互いのタイルを使わない。
+        Args:
+            tle     (TwoLineElements)   :   TLE
+        Returns:
+            (str)   :   ディレクトリ名
+        """
+        content = json.dumps([tle.elements, str(self.__step), str(self.__tileLength), self.__backend], sort_keys=True)
+        digest = hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+        return '{}_{}_{}_{}'.format(tle.satelliteNumber, tle.elementNumber, self.__backend, digest)
+
+
+    def tileDates(self, tileIndex: int) -> numpy.ndarray:
+        """タイルの各点の日時を求める。
+
+        Args:
+            tileIndex   (int)   :   タイル番号
+        Returns:
+            (ndarray)   :   日時（UTC、datetime64[ns]）、形状は (点数,)
+        """
+        begin = numpy.datetime64(0, 'ns') + self.__tileLength * tileIndex
+        return begin + self.__step * numpy.arange(self.__pointNum)
+
+
+    def tile(self, tle: Orbit.TwoLineElements, tileIndex: int) -> numpy.memmap:
+        """タイルをメモリマップで開く。無ければ計算して書き込んでから開く。
+
+        Args:
+            tle         (TwoLineElements)   :   TLE
+            tileIndex   (int)               :   タイル番号
+        Returns:
+            (memmap)    :   読み取り専用の衛星の三次元座標 [km]、形状は (点数, 3)
+        """
+        directory = os.path.join(self.__directory, self.tleKey(tle))
+        filepath = os.path.join(directory, '{}.npy'.format(tileIndex))
+        if not os.path.exists(filepath):
+            os.makedirs(directory, exist_ok=True)
+            xyz = Orbit.createPropagator([tle], self.__backend).xyz(self.tileDates(tileIndex))[0]
+            fd, tmppath = tempfile.mkstemp(suffix='.npy', dir=directory)
+            try:
+                with os.fdopen(fd, mode='wb') as file:
+                    numpy.save(file, xyz)
+                os.replace(tmppath, filepath)
+            except BaseException:
+                os.remove(tmppath)
+                raise
+            logger.debug('EphemerisTileStore: wrote {}'.format(filepath))
+        return numpy.load(filepath, mmap_mode='r')
+
+
+    def iterTiles(self, tle: Orbit.TwoLineElements, beginDate: datetime.datetime, endDate: datetime.datetime):
+        """期間 [beginDate, endDate) にかかるタイルの部分を、コピーせずに順に返す。
+
+        Args:
+            tle         (TwoLineElements)   :   TLE
+            beginDate   (datetime)          :   開始日時（UTC）。datetime64、基準日時からの経過日数 [day] も可
+            endDate     (datetime)          :   終了日時（UTC）。beginDateと同じ
+        Yields:
+            dates       (ndarray)           :   日時（UTC、datetime64[ns]）
+            xyz         (memmap)            :   衛星の三次元座標 [km]（タイルのメモリマップのスライス）
+        """
+        # 刻み幅の格子（1970-01-01T00:00:00 UTCから刻み幅ごと）で、begin以上・end未満の点の通し番号。
+        # 経過日数の丸め誤差（2000年前後で0.1マイクロ秒程度）で格子上の日時を取りこぼさないように、
+        # 格子の点との差が0.5マイクロ秒未満の日時は格子上とみなす
+        origin = Orbit.asDays(numpy.datetime64(0, 'ns'))
+        stepDays = self.__step / numpy.timedelta64(1, 'D')
+        tolerance = numpy.timedelta64(500, 'ns') / self.__step
+        first, last = (int(numpy.ceil((Orbit.asDays(date) - origin) / stepDays - tolerance)) for date in (beginDate, endDate))
+        while first < last:
+            tileIndex = first // self.__pointNum
+            start = first - tileIndex * self.__pointNum
+            stop = min(last - tileIndex * self.__pointNum, self.__pointNum)
+            yield (self.tileDates(tileIndex)[start:stop], self.tile(tle, tileIndex)[start:stop])
+            first = (tileIndex + 1) * self.__pointNum
+
+
+    def read(self, tle: Orbit.TwoLineElements, beginDate: datetime.datetime, endDate: datetime.datetime) -> tuple:
+        """期間 [beginDate, endDate) の刻み幅ごとの衛星の三次元座標を読み出す。
+
+        期間が1つのタイルに収まる場合は、タイルのメモリマップのスライスをコピーせずに返す。
+        複数のタイルにまたがる場合は連結した配列を返す。
+        Args:
+            tle         (TwoLineElements)   :   TLE
+            beginDate   (datetime)          :   iterTiles()と同じ
+            endDate     (datetime)          :   iterTiles()と同じ
+        Returns:
+            dates       (ndarray)           :   日時（UTC、datetime64[ns]）
+            xyz         (ndarray)           :   衛星の三次元座標 [km]、形状は (点数, 3)
+        """
+        parts = list(self.iterTiles(tle, beginDate, endDate))
+        if len(parts) == 0:
+            return (numpy.array([], dtype='datetime64[ns]'), numpy.empty((0, 3)))
+        if len(parts) == 1:
+            return parts[0]
+        return (numpy.concatenate([dates for dates, _ in parts]), numpy.concatenate([xyz for _, xyz in parts]))
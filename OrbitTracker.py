@@ -0,0 +1,218 @@
+import logging
+import math
+import datetime
+import numpy
+
+import Orbit
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+EARTH_RADIUS = 6378.137         # 地球の半径r [km] 「GCS WGS 1984」の赤道半径
+GM = 2.975537 * (10 ** 15)      # [km^3 / day^2]
+EPSILON = 1.0e-10               # ニュートン・ラフソン法の収束判定の閾値
+SIDEREAL_RATE = 360.98564724    # グリニッジ恒星時の進み [deg / day]（Orbit.siderealTime()と同じ）
+
+
+###################################################################################################
+# クラス定義
+###################################################################################################
+
+class RealTimeTracker:
+    """複数の衛星を一定の刻み幅で進めながら、現在位置を求め続ける追跡器。
+
+    Orbit.orbitalElementToXYZ_array()と同じ軌道モデルで、衛星ごとの状態
+    （平均近点角、近地点引数ω・昇交点赤経Ωの余弦・正弦、離心近点角）とグリニッジ恒星時を保持する。
+    1刻みごとの更新では、ω・Ω・恒星時を作成時に求めた回転の増分で回し、離心近点角は前回の値から
+    ニュートン・ラフソン法を始めるので、元期からの計算をやり直さない。
+    回転の積み重ねによる誤差が増えないように、reanchorInterval秒ごとに元期から状態を求め直す。
+    """
+
+    def __init__(
+        self,
+        tles                : list,
+        startDate           : datetime.datetime,
+        step                : float = 1.0,
+        reanchorInterval    : float = 3600.0
+        ):
+        """追跡器を作成し、開始日時の状態を求める。
+
+        Args:
+            tles                (list)      :   TwoLineElementsのリスト
+            startDate           (datetime)  :   開始日時（UTC）
+            step                (float)     :   刻み幅 [sec]
+            reanchorInterval    (float)     :   状態を元期から求め直す間隔 [sec]
+        """
+        if step <= 0:
+            raise ValueError('step must be positive')
+        self.__tles = list(tles)
+        self.__step = step / 86400.0    # [day]
+        self.__reanchorTicks = max(1, int(round(reanchorInterval / step)))
+        self.__start = Orbit.asDays(startDate)
+        self.__tickNum = 0
+
+        # 軌道要素（衛星ごとの配列）
+        self.__epoch = numpy.array([Orbit.datetimeToDays(tle.epoch_datetime) for tle in self.__tles])
+        self.__omega0 = numpy.array([tle.argumentOfPerigee_float for tle in self.__tles])
+        self.__OMEGA0 = numpy.array([tle.raan_float for tle in self.__tles])
+        self.__e = numpy.array([tle.eccentricity_float for tle in self.__tles])
+        self.__M0 = numpy.array([tle.meanAnomaly_float for tle in self.__tles])
+        self.__M1 = numpy.array([tle.meanMotion_float for tle in self.__tles])
+        self.__M2 = numpy.array([tle.firstDerivativeMeanMotion_float for tle in self.__tles])
+        inclination = numpy.radians([tle.inclination_float for tle in self.__tles])
+        self.__cos_i = numpy.cos(inclination)
+        self.__sin_i = numpy.sin(inclination)
+        self.__sqrt1me2 = numpy.sqrt(1 - self.__e ** 2)
+
+        self.reanchor()
+
+
+    ###############################################################################################
+    # プロパティ
+    ###############################################################################################
+
+    @property
+    def tles(self) -> list:
+        return self.__tles
+    @property
+    def days(self) -> float:
+        """現在の日時（基準日時からの経過日数 [day]）"""
+        return self.__start + self.__tickNum * self.__step
+    @property
+    def date(self) -> numpy.datetime64:
+        return Orbit.daysToDatetime64(self.days)
+    @property
+    def tickNum(self) -> int:
+        return self.__tickNum
+
+
+    ###############################################################################################
+    # メソッド
+    ###############################################################################################
+
+    def reanchor(self) -> None:
+        """現在の日時の状態を、元期から求め直す。回転の増分も求め直す。"""
+        days = self.days
+        delta_t = days - self.__epoch
+        self.__deltaT = delta_t
+
+        # 平均近点角 [rev]（小数部だけを保持する）
+        tmp_M = (self.__M0 / 360) + (self.__M1 * delta_t) + (0.5 * self.__M2 * (delta_t ** 2))
+        self.__M = tmp_M - numpy.floor(tmp_M)
+
+        # 軌道長半径と、ω・Ωの変化率 [deg / day]
+        orb_a = self.__semiMajorAxis(delta_t)
+        rate = (180 * 0.174) / (math.pi * ((orb_a / EARTH_RADIUS) ** 3.5))
+        omegaRate = (2 - 2.5 * (self.__sin_i ** 2)) * rate
+        OMEGARate = -self.__cos_i * rate
+        orb_omega = numpy.radians(self.__omega0 + omegaRate * delta_t)
+        orb_OMEGA = numpy.radians(self.__OMEGA0 + OMEGARate * delta_t)
+        self.__omega = numpy.stack((numpy.cos(orb_omega), numpy.sin(orb_omega)))
+        self.__OMEGA = numpy.stack((numpy.cos(orb_OMEGA), numpy.sin(orb_OMEGA)))
+        theta_G = math.radians(Orbit.siderealTime(days))
+        self.__theta = numpy.array([math.cos(theta_G), math.sin(theta_G)])
+
+        # 1刻みあたりの回転の増分
+        self.__omegaStep = numpy.stack((numpy.cos(numpy.radians(omegaRate * self.__step)), numpy.sin(numpy.radians(omegaRate * self.__step))))
+        self.__OMEGAStep = numpy.stack((numpy.cos(numpy.radians(OMEGARate * self.__step)), numpy.sin(numpy.radians(OMEGARate * self.__step))))
+        thetaStep = math.radians(SIDEREAL_RATE * self.__step)
+        self.__thetaStep = numpy.array([math.cos(thetaStep), math.sin(thetaStep)])
+
+        # 離心近点角は平均近点角を初期値として解く（NaNの初期値はMから始まる）
+        self.__E = numpy.full(len(self.__tles), numpy.nan)
+        self.__solveKepler()
+        self.__anchorTick = self.__tickNum
+        logger.debug('RealTimeTracker: reanchored at tick {}'.format(self.__tickNum))
+
+
+    def __semiMajorAxis(self, delta_t: numpy.ndarray) -> numpy.ndarray:
+        """軌道長半径a [km]"""
+        orb_Mm = self.__M1 + self.__M2 * delta_t
+        return (GM / (4.0 * (math.pi ** 2) * (orb_Mm ** 2))) ** (1.0 / 3.0)
+
+
+    def __solveKepler(self) -> None:
+        """保持している離心近点角を初期値として、ケプラー方程式を解き直す。"""
+        orb_M = self.__M * 360      # [deg]
+        # 前回の値との差が180度を超えないように、平均近点角の周回に合わせる
+        orb_E = self.__E - 360 * numpy.round((self.__E - orb_M) / 360)
+        # 反復の上限・導関数はOrbit.orbitalElementToXYZ_array()と同じ（収束しない衛星はNaN）
+        self.__E = Orbit.solveKepler_array(orb_M, self.__e, initial=orb_E, epsilon=EPSILON)
+
+
+    @staticmethod
+    def __rotate(angle: numpy.ndarray, increment: numpy.ndarray) -> None:
+        """(cos, sin) で表した角度を増分だけ回す（その場で更新する）。"""
+        c = angle[0] * increment[0] - angle[1] * increment[1]
+        angle[1] = angle[1] * increment[0] + angle[0] * increment[1]
+        angle[0] = c
+
+
+    def tick(self) -> tuple:
+        """全衛星を1刻み進め、新しい日時の経緯度を求める。
+
+        Returns:
+            phi     (ndarray)   :   緯度 [deg]、形状は (衛星数,)
+            lam     (ndarray)   :   経度 [deg]、形状は (衛星数,)
+        """
+        self.__tickNum += 1
+        if self.__tickNum - self.__anchorTick >= self.__reanchorTicks:
+            self.reanchor()
+            return self.latLon()
+
+        dt = self.__step
+        self.__M += self.__M1 * dt + self.__M2 * (self.__deltaT * dt + 0.5 * dt * dt)
+        self.__M -= numpy.floor(self.__M)
+        self.__deltaT = self.__deltaT + dt
+        self.__rotate(self.__omega, self.__omegaStep)
+        self.__rotate(self.__OMEGA, self.__OMEGAStep)
+        self.__rotate(self.__theta, self.__thetaStep)
+        self.__solveKepler()
+        return self.latLon()
+
+
+    def xyz(self) -> numpy.ndarray:
+        """現在の日時における地球中心の衛星の三次元座標（赤道座標系）を求める。
+
+        Returns:
+            (ndarray)   :   衛星の三次元座標 (x, y, z) [km]、形状は (衛星数, 3)
+        """
+        orb_a = self.__semiMajorAxis(self.__deltaT)
+        E = numpy.radians(self.__E)
+        orb_U = orb_a * (numpy.cos(E) - self.__e)
+        orb_V = orb_a * self.__sqrt1me2 * numpy.sin(E)
+        cos_omega, sin_omega = self.__omega
+        cos_OMEGA, sin_OMEGA = self.__OMEGA
+        p = orb_U * cos_omega - orb_V * sin_omega
+        q = orb_U * sin_omega + orb_V * cos_omega
+        xyz = numpy.empty((len(self.__tles), 3))
+        xyz[:, 0] = p * cos_OMEGA - q * self.__cos_i * sin_OMEGA
+        xyz[:, 1] = p * sin_OMEGA + q * self.__cos_i * cos_OMEGA
+        xyz[:, 2] = q * self.__sin_i
+        return xyz
+
+
+    def latLon(self) -> tuple:
+        """現在の日時における衛星位置の経緯度を求める。
+
+        Returns:
+            phi     (ndarray)   :   緯度 [deg]、形状は (衛星数,)
+            lam     (ndarray)   :   経度 [deg]、形状は (衛星数,)
+        """
+        xyz = self.xyz()
+        cos_G, sin_G = self.__theta
+        X = xyz[:, 0] * cos_G + xyz[:, 1] * sin_G
+        Y = -xyz[:, 0] * sin_G + xyz[:, 1] * cos_G
+        Z = xyz[:, 2]
+        phi = numpy.degrees(numpy.arcsin(Z / numpy.sqrt(X ** 2 + Y ** 2 + Z ** 2)))
+        lam = numpy.degrees(numpy.arctan2(Y, X))
+        return (phi, lam)
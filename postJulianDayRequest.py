@@ -1,125 +1,365 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
-import time
 import os
+import csv
+import json
+import time
+import hashlib
+import logging
+import argparse
+
+import JulianDayTest
+
+# pandas・matplotlib、通信に使うasyncio・urllibなどは読み込みに時間がかかるので、使う関数の中で読み込む
+
 
 ###################################################################################################
-# 関数定義（main関数用）
+# ログ設定
 ###################################################################################################
 
-def __requestAndCSV(url: str, param: dict, filepath: str) -> None:
-    """Webサイトへリクエストを送信して、結果をCSVファイルに出力する。
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+URL = 'http://eco.mtk.nao.ac.jp/cgi-bin/koyomi/cande/date2jd.cgi'   # 国立天文台 > 暦計算室 > 暦象年表 > ユリウス日
+# このWebサイトでは -4712/01/01 12:00 が最小値（ユリウス日＝0.0日）
+
+COMMON_PARAM = {
+    'hour': 12, 'min': 0, 'sec': 0,  # 時刻
+    'tsys': 1,              # 時刻系「世界時」
+    'div': 1, 'divu': 3,    # 間隔「1」「日」
+    'len': 1, 'lenu': 3,  # 期間「1」「日」
+    '表示': '表示'
+    }
+
+CACHE_DIR = os.path.join(JulianDayTest.DATA_DIR, 'JulianDay_by_NAOJ_cache')    # 応答のキャッシュ
+KEY_COLUMN = '年月日'
+
+
+###################################################################################################
+# クラス定義
+###################################################################################################
+
+class ResultTableParser:
+    """応答のHTMLから、計算結果の表（class="result"のtable）の各行のセルの文字列を取り出す。
+
+    html.parser.HTMLParserに、このクラスのメソッドをイベントの処理として渡して使う。
     """
-    # Webサイトへリクエストを送信
-    r = requests.post(url, data=param)
-    if r.status_code != 200:
-        print('エラー: {}'.format(r))
-        exit()
-
-    # Webサイトでの計算結果を抽出
-    bsObj = BeautifulSoup(r.text, 'html.parser')
-    table = bsObj.findAll('table', {'class': 'result'})[0]
-    tr = table.findAll('tr')
-    rows = []
-    for row in tr:
-        cols = []
-        for cell in row.findAll(['td', 'th']):
-            cols.append(cell.get_text())
-        rows.append(cols)
-
-    # CSVファイルに出力
-    df = pd.DataFrame(rows[1:], columns=rows[0])
-    df = df.set_index('年月日')
-    df.to_csv(filepath, mode='a', header=(not os.path.exists(filepath)))
-
-
-def __plot(df: pd.DataFrame, title: str):
-    """グラフの描画を行う。
+
+    def __init__(self):
+        import html.parser
+        self.rows = []
+        self.__depth = 0        # 計算結果の表の中でのtableの入れ子の深さ（表の外では0）
+        self.__cell = None      # 読み込み中のセルの文字列のリスト
+        self.__parser = html.parser.HTMLParser()
+        self.__parser.handle_starttag = self.handle_starttag
+        self.__parser.handle_endtag = self.handle_endtag
+        self.__parser.handle_data = self.handle_data
+
+
+    def feed(self, data: str) -> None:
+        """HTMLの文字列を読み込む。"""
+        self.__parser.feed(data)
+        self.__parser.close()
+
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table' and (self.__depth > 0 or 'result' in (dict(attrs).get('class') or '').split()):
+            self.__depth += 1
+        elif self.__depth > 0 and tag == 'tr':
+            self.rows.append([])
+        elif self.__depth > 0 and tag in ('td', 'th'):
+            self.__cell = []
+
+
+    def handle_endtag(self, tag):
+        if tag == 'table' and self.__depth > 0:
+            self.__depth -= 1
+        elif self.__depth > 0 and tag in ('td', 'th') and self.__cell is not None:
+            self.rows[-1].append(''.join(self.__cell))
+            self.__cell = None
+
+
+    def handle_data(self, data):
+        if self.__cell is not None:
+            self.__cell.append(data)
+
+
+class RateLimiter:
+    """リクエストの開始の間隔を、1秒あたりrate回以下にする（全タスクで共有する）。
     """
-    plt.figure()
-    ax = df['ユリウス日'].plot(title=title, grid=True, figsize=(16, 9))
-    ax.get_xaxis().set_major_locator(ticker.MaxNLocator(integer=True))
-    ax.get_yaxis().set_major_locator(ticker.MaxNLocator(integer=True))
-    ax.ticklabel_format(style='plain', axis='both', useOffset=False, useMathText=False)
-    ax.margins(x=0, y=0)
-    ax.set_xticks(df.index)
-    ax.set_xticklabels([df.loc[i, '年月日'] for i in df.index], rotation=30)
+
+    def __init__(self, rate: float):
+        """
+        Args:
+            rate    (float) :   1秒あたりのリクエスト数の上限。0以下の場合は制限しない
+        """
+        import asyncio
+        self.__interval = 1.0 / rate if rate > 0 else 0.0
+        self.__next = 0.0
+        self.__lock = asyncio.Lock()
+
+
+    async def wait(self) -> None:
+        """次のリクエストを開始できる時刻まで待つ。"""
+        import asyncio
+        async with self.__lock:
+            now = time.monotonic()
+            delay = self.__next - now
+            self.__next = max(now, self.__next) + self.__interval
+        if delay > 0:
+            await asyncio.sleep(delay)
 
 
 ###################################################################################################
-# main関数
+# 関数定義
 ###################################################################################################
 
-def main():
-    
-    URL = 'http://eco.mtk.nao.ac.jp/cgi-bin/koyomi/cande/date2jd.cgi'   # 国立天文台 > 暦計算室 > 暦象年表 > ユリウス日
-    # このWebサイトでは -4712/01/01 12:00 が最小値（ユリウス日＝0.0日）
-
-    COMMON_PARAM = {
-        'hour': 12, 'min': 0, 'sec': 0,  # 時刻
-        'tsys': 1,              # 時刻系「世界時」
-        'div': 1, 'divu': 3,    # 間隔「1」「日」
-        'len': 1, 'lenu': 3,  # 期間「1」「日」
-        '表示': '表示'
-        }
-    
-    DIR = 'D:/GitHub/misc/data/'
-    PREFIX = 'JulianDay_by_NAOJ_'
-    
-    # Webサイトへ渡すパラメータを用意
+def createParams() -> list:
+    """Webサイトへ渡すパラメータの一覧を作る。"""
     params = []
     # -4712/01～-4711/12
     for y in range(-4712, -4711 + 1):
         for m in range(1, 12 + 1):
-            param = {'year': y, 'month': m, 'day': 1}
-            param.update(COMMON_PARAM)
-            params.append(param)
+            params.append(dict({'year': y, 'month': m, 'day': 1}, **COMMON_PARAM))
     # -0001/01～0001/12
     for y in range(-1, 1 + 1):
         for m in range(1, 12 + 1):
-            param = {'year': y, 'month': m, 'day': 1}
-            param.update(COMMON_PARAM)
-            params.append(param)
+            params.append(dict({'year': y, 'month': m, 'day': 1}, **COMMON_PARAM))
     # 1582/10/01～1582/10/31
     for d in range(1, 31 + 1):
-        param = {'year': 1582, 'month': 10, 'day': d}
-        param.update(COMMON_PARAM)
-        params.append(param)
+        params.append(dict({'year': 1582, 'month': 10, 'day': d}, **COMMON_PARAM))
+    return params
+
+
+def cachePath(cacheDir: str, url: str, param: dict) -> str:
+    """リクエスト（URLとパラメータ）に対応するキャッシュファイルのパスを求める。"""
+    content = json.dumps([url, param], sort_keys=True, ensure_ascii=False)
+    return os.path.join(cacheDir, hashlib.sha1(content.encode('utf-8')).hexdigest() + '.html')
+
+
+def readResultTable(text: str) -> list:
+    """応答のHTMLから計算結果の表を取り出す。
+
+    Returns:
+        (list)  :   各行のセルの文字列のリスト（空の行は除く）。表が無ければ空のリスト
+    """
+    parser = ResultTableParser()
+    parser.feed(text)
+    return [row for row in parser.rows if row]
 
-    # Webサイトにリクエストし、結果をCSVへ出力
+
+def __post(url: str, param: dict, timeout: float) -> str:
+    """フォームをPOSTし、応答の本文を返す（別スレッドで実行する）。200以外の応答はHTTPErrorとする。"""
+    import urllib.error
+    import urllib.parse
+    import urllib.request
+    data = urllib.parse.urlencode(param).encode('utf-8')
+    with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=timeout) as response:
+        if response.status != 200:
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+        charset = response.headers.get_content_charset() or 'utf-8'
+        return response.read().decode(charset, errors='replace')
+
+
+async def __fetchOne(url: str, param: dict, filepath: str, semaphore: 'asyncio.Semaphore', limiter: RateLimiter,
+        retries: int, timeout: float) -> bool:
+    """1件のリクエストを送信し、応答をキャッシュファイルに保存する。
+
+    通信エラー・200以外の応答・計算結果の表が無い応答（エラーページなど）は、間隔を倍にしながらretries回まで再送する。
+    計算結果の表がある応答だけをキャッシュに保存する。
+    Returns:
+        (bool)  :   保存できた場合はTrue
+    """
+    import asyncio
+    import tempfile
+    import urllib.error
+    async with semaphore:
+        for attempt in range(retries + 1):
+            await limiter.wait()
+            try:
+                text = await asyncio.to_thread(__post, url, param, timeout)
+                if readResultTable(text):
+                    break
+                error = 'no result table in the response'
+            except (urllib.error.URLError, OSError) as e:
+                error = e
+            logger.warning('request failed ({}/{}): {}: {}'.format(attempt + 1, retries + 1, param, error))
+            if attempt == retries:
+                return False
+            await asyncio.sleep(2 ** attempt)
+
+    # 途中で止まっても壊れたファイルが残らないように、一時ファイルに書いてから置き換える
+    fd, tmppath = tempfile.mkstemp(suffix='.html', dir=os.path.dirname(filepath))
+    try:
+        with os.fdopen(fd, mode='w', encoding='utf-8') as file:
+            file.write(text)
+        os.replace(tmppath, filepath)
+    except BaseException:
+        os.remove(tmppath)
+        raise
+    logger.info('fetched: {}'.format(param))
+    return True
+
+
+async def fetchAll(
+    url         : str,
+    params      : list,
+    cacheDir    : str = CACHE_DIR,
+    concurrency : int = 4,
+    rate        : float = 1.0,
+    retries     : int = 3,
+    timeout     : float = 30.0
+    ) -> list:
+    """複数のリクエストを、同時実行数と頻度を制限しながら並行して送信し、応答をキャッシュに保存する。
+
+    キャッシュに応答があるリクエストは送信しないので、中断しても続きから再開できる。
+    Args:
+        url         (str)   :   送信先のURL
+        params      (list)  :   パラメータ（フォームの内容）の辞書のリスト
+        cacheDir    (str)   :   キャッシュのディレクトリ
+        concurrency (int)   :   同時に送信するリクエストの数
+        rate        (float) :   1秒あたりのリクエスト数の上限（Webサイトへの負荷防止）。0以下の場合は制限しない
+        retries     (int)   :   失敗したリクエストを再送する回数
+        timeout     (float) :   1回のリクエストのタイムアウト [sec]
+    Returns:
+        (list)  :   再送しても失敗したパラメータのリスト
+    """
+    import asyncio
+    if concurrency < 1:
+        raise ValueError('concurrency must be positive')
+    os.makedirs(cacheDir, exist_ok=True)
+    pending = [param for param in params if not os.path.exists(cachePath(cacheDir, url, param))]
+    logger.info('fetchAll: {} cached, {} to fetch'.format(len(params) - len(pending), len(pending)))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate)
+    results = await asyncio.gather(*(
+        __fetchOne(url, param, cachePath(cacheDir, url, param), semaphore, limiter, retries, timeout) for param in pending))
+    return [param for param, ok in zip(pending, results) if not ok]
+
+
+def parseResponses(url: str, params: list, cacheDir: str = CACHE_DIR) -> tuple:
+    """キャッシュした応答の計算結果の表をまとめて読み込み、1つの表にする。
+
+    同じ年月日の行は最初の行を使う。キャッシュに無いパラメータは飛ばす。
+    計算結果の表が無いキャッシュファイルは削除し、次のfetchAll()で取得し直す。
+    Args:
+        url～cacheDir   :   fetchAll()と同じ
+    Returns:
+        header  (list)  :   列名のリスト（先頭は年月日）
+        rows    (list)  :   各行のセルの文字列のリスト
+    """
+    header = None
+    rows = {}
     for param in params:
-        print('request: {}'.format(param))
-        __requestAndCSV(URL, param, DIR + PREFIX + 'all.csv')
-        time.sleep(1)  # Webサイトへの負荷防止
-    
-    # CSVを読み込む
-    df = pd.read_csv(DIR + PREFIX + 'all.csv')
-    for i in range(0, len(df)): # データを絞り込みやすいように年月日の列を設ける
-        ymd = df.at[i, '年月日'].split('/')
-        df.at[i, 'year'] = int(ymd[0])
-        df.at[i, 'month'] = int(ymd[1])
-        df.at[i, 'day'] = int(ymd[2])
+        filepath = cachePath(cacheDir, url, param)
+        if not os.path.exists(filepath):
+            continue
+        with open(filepath, encoding='utf-8') as file:
+            table = readResultTable(file.read())
+        if not table:
+            logger.warning('no result table; removed the cache: {}'.format(param))
+            os.remove(filepath)
+            continue
+        if header is None:
+            # 年月日の列を先頭にする
+            header = [KEY_COLUMN] + [name for name in table[0] if name != KEY_COLUMN]
+        order = [table[0].index(name) for name in header]
+        for row in table[1:]:
+            row = [row[k].strip() for k in order]
+            rows.setdefault(row[0], row)
+    return (header or [KEY_COLUMN], list(rows.values()))
+
+
+def writeReferenceCSV(filepath: str, header: list, rows: list) -> None:
+    """参照表をCSVファイルに出力する（JulianDayTest.NAOJ_JulianDayで読み込む書式）。"""
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    with open(filepath, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+###################################################################################################
+# 関数定義（main関数用）
+###################################################################################################
+
+def __plot(df: 'pandas.DataFrame', title: str):
+    """グラフの描画を行う。
+    """
+    import matplotlib.pyplot as plt
+    import matplotlib.ticker as ticker
+
+    plt.figure()
+    ax = df['ユリウス日'].plot(title=title, grid=True, figsize=(16, 9))
+    ax.get_xaxis().set_major_locator(ticker.MaxNLocator(integer=True))
+    ax.get_yaxis().set_major_locator(ticker.MaxNLocator(integer=True))
+    ax.ticklabel_format(style='plain', axis='both', useOffset=False, useMathText=False)
+    ax.margins(x=0, y=0)
+    ax.set_xticks(df.index)
+    ax.set_xticklabels([df.loc[i, '年月日'] for i in df.index], rotation=30)
+
+
+def __plotAll(filepath: str, prefix: str):
+    """参照表を読み込み、期間ごとのグラフを作成する。"""
+    import pandas as pd
+    import matplotlib.pyplot as plt
+
+    df = pd.read_csv(filepath)
+    # データを絞り込みやすいように年月日の列を設ける
+    ymd = df['年月日'].str.strip().str.split('/', expand=True).astype(int)
+    df['year'], df['month'], df['day'] = ymd[0], ymd[1], ymd[2]
     print(df)
     print(df.dtypes)
 
-    # グラフを作成する
     plotDf = df[(-4712 <= df.year) & (df.year <= -4711) & (1 <= df.month) & (df.month <= 12)]
     __plot(plotDf, '-4712/01 ~ -4711/12')
-    plt.savefig(DIR + PREFIX + '-47120101_-47111201.png')
-    
+    plt.savefig(prefix + '-47120101_-47111201.png')
+
     plotDf = df[(-1 <= df.year) & (df.year <= 1) & (1 <= df.month) & (df.month <= 12)]
     __plot(plotDf, '-0001/01 ~ 0001/12')
-    plt.savefig(DIR + PREFIX + '-00010101_00011201.png')
-    
+    plt.savefig(prefix + '-00010101_00011201.png')
+
     plotDf = df[(df.year == 1582) & (df.month == 10) & (1 <= df.day) & (df.day <= 31)]
     __plot(plotDf, '1582/10/01 ~ 1582/10/31')
-    plt.savefig(DIR + PREFIX + '15821001_15821031.png')
-    
+    plt.savefig(prefix + '15821001_15821031.png')
+
     plt.show()
 
 
+###################################################################################################
+# main関数
+###################################################################################################
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='国立天文台のWebページでユリウス日を算出し、参照表のCSVファイルを作る')
+    parser.add_argument('--url', default=URL, help='リクエストの送信先')
+    parser.add_argument('--output', default=JulianDayTest.NAOJ_CSV_PATH, help='参照表のCSVファイル')
+    parser.add_argument('--cache', default=CACHE_DIR, help='応答のキャッシュのディレクトリ')
+    parser.add_argument('--concurrency', type=int, default=4, help='同時に送信するリクエストの数')
+    parser.add_argument('--rate', type=float, default=1.0, help='1秒あたりのリクエスト数の上限')
+    parser.add_argument('--retries', type=int, default=3, help='失敗したリクエストを再送する回数')
+    parser.add_argument('--plot', action='store_true', help='グラフを作成する（pandas・matplotlibが必要）')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    # Webサイトにリクエストし、応答をキャッシュへ保存する
+    import asyncio
+    params = createParams()
+    failed = asyncio.run(fetchAll(args.url, params, args.cache, args.concurrency, args.rate, args.retries))
+
+    # キャッシュの応答をまとめて参照表にする（失敗したリクエストは、再実行すると続きから取得する）
+    header, rows = parseResponses(args.url, params, args.cache)
+    writeReferenceCSV(args.output, header, rows)
+    logger.info('wrote {} dates to {}'.format(len(rows), args.output))
+    if failed:
+        parser.exit(1, 'postJulianDayRequest: error: {} requests failed; run again to resume\n'.format(len(failed)))
+
+    if args.plot:
+        __plotAll(args.output, os.path.join(os.path.dirname(os.path.abspath(args.output)), 'JulianDay_by_NAOJ_'))
+
+
 if __name__ == '__main__':
     main()
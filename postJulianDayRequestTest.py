@@ -0,0 +1,168 @@
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+import http.server
+import urllib.parse
+
+import postJulianDayRequest
+
+
+###################################################################################################
+# ログ設定
+###################################################################################################
+
+logger = logging.getLogger(__name__)
+
+
+###################################################################################################
+# 定数
+###################################################################################################
+
+# 応答を返すまでの時間 [sec]（同時実行数の確認に使う）
+RESPONSE_DELAY = 0.05
+
+# 計算結果の表を含む応答（国立天文台のページと同じ構成の一部）
+RESULT_PAGE = '''<html><body>
+<table class="form"><tr><td>入力</td></tr></table>
+<table class="result">
+<tr><th>年月日</th><th>時分秒</th><th>ユリウス日</th></tr>
+<tr><td>{year:04}/{month:02}/{day:02}</td><td>12:00:00</td><td>{jd}</td></tr>
+</table>
+</body></html>'''
+
+# 200で返るが、計算結果の表が無い応答
+ERROR_PAGE = '<html><body><p>混雑しています。しばらくしてから再度アクセスしてください。</p></body></html>'
+
+
+###################################################################################################
+# クラス定義
+###################################################################################################
+
+class StubServer:
+    """国立天文台のページの代わりに、ローカルで応答を返すHTTPサーバー。
+
+    各日付の最初のリクエストには、日付に応じて500の応答またはエラーページ（200）を返し、再送を確認する。
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__seen = set()
+        self.requestNum = 0
+        self.active = 0
+        self.maxActive = 0
+
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8')
+                param = {key: value[0] for key, value in urllib.parse.parse_qs(body).items()}
+                status, text = stub.respond(param)
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=euc-jp')
+                self.end_headers()
+                self.wfile.write(text.encode('euc-jp'))
+
+        self.__server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+
+
+    @property
+    def url(self) -> str:
+        return 'http://{}:{}/date2jd.cgi'.format(*self.__server.server_address)
+
+
+    def respond(self, param: dict) -> tuple:
+        """リクエストに対する (ステータス, 本文) を返す。"""
+        year, month, day = int(param['year']), int(param['month']), int(param['day'])
+        with self.__lock:
+            self.requestNum += 1
+            self.active += 1
+            self.maxActive = max(self.maxActive, self.active)
+            first = (year, month, day) not in self.__seen
+            self.__seen.add((year, month, day))
+        time.sleep(RESPONSE_DELAY)
+        with self.__lock:
+            self.active -= 1
+        if first and day == 2:
+            return (500, 'Internal Server Error')
+        if first and day == 3:
+            return (200, ERROR_PAGE)
+        return (200, RESULT_PAGE.format(year=year, month=month, day=day, jd=year * 1000 + month * 40 + day))
+
+
+    def __enter__(self):
+        self.__thread.start()
+        return self
+
+
+    def __exit__(self, *args):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+
+###################################################################################################
+# 関数定義
+###################################################################################################
+
+def check(concurrency: int) -> list:
+    """スタブのサーバーに対してfetchAll()・parseResponses()を実行し、問題の一覧を返す。"""
+    problems = []
+    params = postJulianDayRequest.createParams()
+    with StubServer() as stub, tempfile.TemporaryDirectory() as cacheDir:
+        # 1回目：500・エラーページは再送され、全ての日付がそろう
+        failed = asyncio.run(postJulianDayRequest.fetchAll(stub.url, params, cacheDir, concurrency, rate=0, retries=2))
+        if failed:
+            problems.append('{} requests failed'.format(len(failed)))
+        if stub.maxActive > concurrency:
+            problems.append('{} concurrent requests (limit {})'.format(stub.maxActive, concurrency))
+        header, rows = postJulianDayRequest.parseResponses(stub.url, params, cacheDir)
+        if header != ['年月日', '時分秒', 'ユリウス日']:
+            problems.append('unexpected header {}'.format(header))
+        if len(rows) != len(params):
+            problems.append('{} rows for {} dates'.format(len(rows), len(params)))
+        for row in rows:
+            year, month, day = (int(value) for value in row[0].rsplit('/', 2))
+            if row[2] != str(year * 1000 + month * 40 + day):
+                problems.append('wrong value {}'.format(row))
+                break
+
+        # 2回目：全てキャッシュにあるので、リクエストを送らない
+        requestNum = stub.requestNum
+        asyncio.run(postJulianDayRequest.fetchAll(stub.url, params, cacheDir, concurrency, rate=0))
+        if stub.requestNum != requestNum:
+            problems.append('resumed run sent {} requests'.format(stub.requestNum - requestNum))
+
+        # 表の無いキャッシュファイルは、読み込み時に削除されて取得し直される
+        filepath = postJulianDayRequest.cachePath(cacheDir, stub.url, params[0])
+        with open(filepath, mode='w', encoding='utf-8') as file:
+            file.write(ERROR_PAGE)
+        rows = postJulianDayRequest.parseResponses(stub.url, params, cacheDir)[1]
+        failed = asyncio.run(postJulianDayRequest.fetchAll(stub.url, params, cacheDir, concurrency, rate=0))
+        if len(rows) != len(params) - 1 or failed or len(postJulianDayRequest.parseResponses(stub.url, params, cacheDir)[1]) != len(params):
+            problems.append('a cached error page was not fetched again')
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ローカルのスタブのサーバーで、postJulianDayRequestの取得・再送・再開を確認する')
+    parser.add_argument('--concurrency', type=int, default=4, help='同時に送信するリクエストの数')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    problems = check(args.concurrency)
+    for problem in problems:
+        print('FAILED: {}'.format(problem))
+    print('ok' if not problems else '{} problems'.format(len(problems)))
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()